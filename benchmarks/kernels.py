@@ -0,0 +1,249 @@
+"""
+Solver kernel micro-benchmarks
+
+Times the solver kernels in isolation on fixed network states: Algorithm B
+and TAPAS run the given number of warm-up iterations, then a seeded sample
+of their bushes is used by every kernel. Kernels that change the state run
+on a fresh copy of it in every repeat, the copy is not timed.
+
+Reports min, median and p95 over the repeats and appends them to a JSON
+lines history, printing the change of the median against the last run with
+the same settings.
+
+Usage: python -m benchmarks.kernels [--city SiouxFalls] [--repeats 20]
+       [--samples 10] [--seed 0] [--warmup 2] [--kernels ...] [--history file]
+"""
+import argparse
+import copy
+import io
+import json
+import os
+import random
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+import src.data.data as data
+from results.root import ROOT_DIR
+from src.algorithms.b.algorithm_b import AlgorithmB
+from src.algorithms.tapas.tapas import TAPAS
+from src.data.cache import load_data_for_city
+from src.shared.consts import ZERO_FLOW
+
+DEFAULT_HISTORY = os.path.join(ROOT_DIR, 'kernel-history.jsonl')
+
+# name -> (setup returning the kernel argument, timed kernel)
+Kernel = Tuple[Callable[[], object], Callable[[object], None]]
+
+
+class States:
+    """ Fixed Algorithm B and TAPAS states with a seeded sample of origins """
+
+    def __init__(
+        self,
+        city_name: str,
+        samples: int,
+        seed: int,
+        warmup: int
+    ) -> None:
+        self.city_name = city_name
+        (demands, nodes, links, _solution) = load_data_for_city(city_name)
+        with redirect_stdout(io.StringIO()):
+            self.b = AlgorithmB(nodes, links, demands, 1e-14)
+            self.tapas = TAPAS(nodes, links, demands, 1e-14)
+            for _ in range(warmup):
+                self.b.Iteration()
+                self.tapas.Iteration()
+        origins = sorted(self.b.bushes)
+        self.origins = random.Random(seed).sample(
+            origins, min(samples, len(origins)))
+        self.pas_candidates = self.FindPasCandidates()
+
+    def FindPasCandidates(self) -> List[Tuple[int, object, int]]:
+        # Used links off the shortest path, as TapasBush.Equilibrate finds them
+        candidates = []
+        for origin in self.origins:
+            bush = self.tapas.bushes[origin]
+            # The PAS search expects an acyclic bush, as after RemoveCyclicFlows
+            bush.RemoveCyclicFlows()
+            graph = bush.subgraph
+            graph.BuildMinTree()
+            incoming_links_dict = graph.GetAllIncomingLinks()
+            for (node_index, incoming_links) in incoming_links_dict.items():
+                shortest_path_link = graph.alpha_min[node_index]
+                if shortest_path_link is None:
+                    continue
+                for link in incoming_links:
+                    if (
+                        graph.bush_flow[link.id] > ZERO_FLOW and
+                        link is not shortest_path_link
+                    ):
+                        candidates.append((origin, link, node_index))
+        return candidates
+
+    def CopyB(self) -> AlgorithmB:
+        return copy.deepcopy(self.b)
+
+    def CopyTapas(self) -> TAPAS:
+        return copy.deepcopy(self.tapas)
+
+    def Subgraphs(self, algorithm) -> List:
+        return [algorithm.bushes[origin].subgraph for origin in self.origins]
+
+
+def create_kernels(states: States) -> Dict[str, Kernel]:
+    b = states.b
+    tapas = states.tapas
+
+    def build_min_tree(network) -> None:
+        for origin in states.origins:
+            network.BuildMinTree(origin)
+
+    def build_trees(subgraphs) -> None:
+        for subgraph in subgraphs:
+            subgraph.BuildTrees()
+
+    def topo_sort(subgraphs) -> None:
+        for subgraph in subgraphs:
+            subgraph.TopoSort()
+
+    def add_better_links(subgraphs) -> None:
+        for subgraph in subgraphs:
+            subgraph.AddBetterLinks()
+
+    def equalize_cost(algorithm) -> None:
+        # EqualizeCost of every bush node in the order Equilibrate uses
+        for origin in states.origins:
+            algorithm.bushes[origin].Equilibrate()
+
+    def create_pas(algorithm) -> None:
+        # The created PASs are dropped again, eviction may have dropped
+        # older ones too
+        pas_manager = algorithm.pasManager
+        pas_list = list(pas_manager.pasList)
+        evictions = pas_manager.evictions
+        for (origin, exp_link, node_index) in states.pas_candidates:
+            pas_manager.CreatePas(
+                algorithm.bushes[origin].subgraph, exp_link, node_index, False)
+        pas_manager.pasList = pas_list
+        pas_manager.evictions = evictions
+        pas_manager.RebuildPasIndex()
+
+    def move_flow(pas_manager) -> None:
+        pas_manager.ShiftFlows()
+
+    def import_matrix(city_name) -> None:
+        data.import_matrix(city_name)
+
+    return {
+        'BuildMinTree': (lambda: b.network, build_min_tree),
+        'BuildTrees': (lambda: states.Subgraphs(b), build_trees),
+        'TopoSort': (lambda: states.Subgraphs(b), topo_sort),
+        'AddBetterLinks': (
+            lambda: states.Subgraphs(states.CopyB()), add_better_links),
+        'EqualizeCost': (states.CopyB, equalize_cost),
+        'CreatePas': (lambda: tapas, create_pas),
+        'ShiftFlows': (lambda: states.CopyTapas().pasManager, move_flow),
+        'import_matrix': (lambda: states.city_name, import_matrix),
+        'GetGaps': (lambda: b, lambda algorithm: algorithm.GetGaps()),
+    }
+
+
+def time_kernel(kernel: Kernel, repeats: int) -> Dict[str, float]:
+    (setup, run) = kernel
+    times = []
+    for _ in range(repeats):
+        argument = setup()
+        start = perf_counter()
+        run(argument)
+        times.append(perf_counter() - start)
+    return {
+        'min': float(np.min(times)),
+        'median': float(np.median(times)),
+        'p95': float(np.percentile(times, 95)),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, check=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def read_last_entry(history_file: str, settings: Dict) -> Dict | None:
+    if not os.path.isfile(history_file):
+        return None
+    last_entry = None
+    with open(history_file, 'r', encoding='utf-8') as file:
+        for line in file:
+            entry = json.loads(line)
+            if entry['settings'] == settings:
+                last_entry = entry
+    return last_entry
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('--city', default='SiouxFalls')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--samples', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--kernels', nargs='+')
+    parser.add_argument('--history', default=DEFAULT_HISTORY)
+    args = parser.parse_args()
+
+    states = States(args.city, args.samples, args.seed, args.warmup)
+    kernels = create_kernels(states)
+    names = args.kernels or list(kernels)
+    settings = {
+        'city': args.city,
+        'repeats': args.repeats,
+        'samples': args.samples,
+        'seed': args.seed,
+        'warmup': args.warmup,
+    }
+    previous = read_last_entry(args.history, settings)
+    print(
+        f"{args.city}: {len(states.origins)} sampled origins, "
+        f"{len(states.pas_candidates)} PAS candidates, {args.repeats} repeats"
+    )
+    print(
+        f"{'kernel':>16} {'min ms':>10} {'median ms':>10} {'p95 ms':>10} "
+        f"{'vs last':>8}"
+    )
+    stats = {}
+    for name in names:
+        stats[name] = time_kernel(kernels[name], args.repeats)
+        change = ''
+        if previous is not None and name in previous['kernels']:
+            last_median = previous['kernels'][name]['median']
+            change = f"{(stats[name]['median'] / last_median - 1) * 100:+.1f}%"
+        print(
+            f"{name:>16} {stats[name]['min'] * 1e3:>10.3f} "
+            f"{stats[name]['median'] * 1e3:>10.3f} "
+            f"{stats[name]['p95'] * 1e3:>10.3f} {change:>8}"
+        )
+
+    entry = {
+        'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'settings': settings,
+        'kernels': stats,
+    }
+    with open(args.history, 'a', encoding='utf-8') as file:
+        file.write(json.dumps(entry) + '\n')
+    print(f"History appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
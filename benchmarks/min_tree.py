@@ -0,0 +1,87 @@
+"""
+Shortest path tree benchmark
+
+Compares Network.BuildMinTree with the previous linear-scan implementation
+for every origin of the dataset.
+
+Usage: python -m benchmarks.min_tree [city_name] [repeats]
+"""
+import math
+import sys
+from time import perf_counter
+from typing import Dict, List
+
+import src.data.data as data
+from src.shared.link import Link
+from src.shared.network import Network
+
+
+def build_min_tree_linear_scan(
+    network: Network,
+    outcoming_links_dict: Dict[int, List[Link]],
+    origin_index: int
+):
+    # Previous O(V^2) implementation, kept only as a reference point
+    unvisited_nodes = [*network.nodes]
+    pi_min = dict.fromkeys(network.nodes, math.inf)
+    alpha_min: Dict[int, Link | None] = dict.fromkeys(network.nodes, None)
+
+    pi_min[origin_index] = 0
+    current_min_node: int | None = origin_index
+    while current_min_node is not None:
+        for link in outcoming_links_dict[current_min_node]:
+            tentative_value = pi_min[current_min_node] + link.cost
+            if tentative_value < pi_min[link.dest]:
+                pi_min[link.dest] = tentative_value
+                alpha_min[link.dest] = link
+
+        unvisited_nodes.remove(current_min_node)
+        current_min_node = min(
+            unvisited_nodes, key=pi_min.__getitem__, default=None)
+    return (pi_min, alpha_min)
+
+
+def time_all_origins(build, origins, repeats: int) -> float:
+    best = math.inf
+    for _ in range(repeats):
+        start = perf_counter()
+        for origin_index, destinations in origins:
+            build(origin_index, destinations)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main(city_name: str = 'ChicagoSketch', repeats: int = 3):
+    (demands, nodes, links, _solution) = data.import_data_for_city(city_name)
+    network = Network(nodes.values.tolist(), links.values.tolist())
+    origins = [
+        (origin, demands.GetRow(origin)[0]) for origin in demands.GetOrigins()
+    ]
+    outcoming_links_dict = network.GetAllOutcomingLinks()
+    print(
+        f"{city_name}: {len(network.nodes)} nodes, {len(network.links)} links, "
+        f"{len(origins)} origins, best of {repeats}"
+    )
+
+    results = {
+        "linear scan": time_all_origins(
+            lambda origin, _dests: build_min_tree_linear_scan(
+                network, outcoming_links_dict, origin),
+            origins, repeats),
+        "binary heap": time_all_origins(
+            lambda origin, _dests: network.BuildMinTree(origin),
+            origins, repeats),
+        "binary heap, early exit": time_all_origins(
+            network.BuildMinTree, origins, repeats),
+    }
+    reference = results["linear scan"]
+    for name, elapsed in results.items():
+        print(
+            f"{name:>24}: {elapsed:.4f}s "
+            f"({elapsed / len(origins) * 1e3:.3f} ms/origin, "
+            f"x{reference / elapsed:.1f})"
+        )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2], *map(int, sys.argv[2:3]))
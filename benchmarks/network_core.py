@@ -0,0 +1,55 @@
+"""
+Network core benchmark
+
+Reports the memory held by the Network structure and the time of the
+AlgorithmB iterations for the dataset.
+
+Usage: python -m benchmarks.network_core [city_name] [iterations]
+"""
+import sys
+import tracemalloc
+from time import perf_counter
+
+import src.data.data as data
+from src.algorithms.b.algorithm_b import AlgorithmB
+from src.shared.network import Network
+
+
+def main(city_name: str = 'ChicagoSketch', iterations: int = 3):
+    (demands, nodes, links, _solution) = data.import_data_for_city(city_name)
+    nodes_list = nodes.values.tolist()
+    links_list = links.values.tolist()
+
+    tracemalloc.start()
+    start = perf_counter()
+    network = Network(nodes_list, links_list)
+    elapsed = perf_counter() - start
+    (network_memory, _peak) = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{city_name}: {len(network.nodes)} nodes, {len(network.links)} links\n"
+        f"Network: {network_memory / 1024:.1f} KiB, built in {elapsed:.4f}s"
+    )
+    if hasattr(network, 'arrays'):
+        print(
+            "CompactNetwork arrays: "
+            f"{network.arrays.MemoryUsage() / 1024:.1f} KiB")
+
+    start = perf_counter()
+    algorithm = AlgorithmB(nodes_list, links_list, demands, 1e-14)
+    print(f"AlgorithmB initialisation: {perf_counter() - start:.3f}s")
+    for iteration in range(1, iterations + 1):
+        start = perf_counter()
+        algorithm.Iteration()
+        iteration_time = perf_counter() - start
+        start = perf_counter()
+        gaps = algorithm.GetGaps()
+        gaps_time = perf_counter() - start
+        print(
+            f"iteration {iteration}: {iteration_time:.3f}s, "
+            f"gaps {gaps_time:.3f}s, max gap {gaps[1]:.6g}"
+        )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2], *map(int, sys.argv[2:3]))
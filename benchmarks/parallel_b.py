@@ -0,0 +1,61 @@
+"""
+Parallel Algorithm B benchmark
+
+Runs the sequential (Gauss-Seidel) Algorithm B and the parallel (Jacobi)
+mode with the given workers and batch size, and reports the wall-clock time
+against the gaps after every iteration.
+
+Usage:
+python -m benchmarks.parallel_b [city_name] [iterations] [workers] [batch_size]
+"""
+import sys
+from time import perf_counter
+
+import src.data.data as data
+from src.algorithms.b.algorithm_b import AlgorithmB
+
+
+def run(
+    nodes_list,
+    links_list,
+    demands,
+    iterations: int,
+    workers: int,
+    batch_size: int
+):
+    mode = "gauss-seidel"
+    if workers:
+        mode = f"jacobi {workers} workers, batch {batch_size or 'all'}"
+    start = perf_counter()
+    algorithm = AlgorithmB(
+        nodes_list, links_list, demands, 1e-14, workers, batch_size)
+    print(f"{mode}: initialisation {perf_counter() - start:.3f}s")
+    start = perf_counter()
+    try:
+        for iteration in range(1, iterations + 1):
+            algorithm.Iteration()
+            (rel_gap, max_gap, _avg_excess) = algorithm.GetGaps()
+            print(
+                f"  iteration {iteration}: {perf_counter() - start:.3f}s, "
+                f"rel gap {rel_gap:.6g}, max gap {max_gap:.6g}"
+            )
+    finally:
+        algorithm.Close()
+
+
+def main(
+    city_name: str = 'ChicagoSketch',
+    iterations: int = 5,
+    workers: int = 4,
+    batch_size: int = 0
+):
+    (demands, nodes, links, _solution) = data.import_data_for_city(city_name)
+    nodes_list = nodes.values.tolist()
+    links_list = links.values.tolist()
+    print(f"{city_name}: {iterations} iterations")
+    run(nodes_list, links_list, demands, iterations, 0, 0)
+    run(nodes_list, links_list, demands, iterations, workers, batch_size)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2], *map(int, sys.argv[2:5]))
@@ -0,0 +1,187 @@
+"""
+PAS search benchmark
+
+Compares PasManager.CreatePas with the previous implementation, which
+allocated node maps of the whole bush and used a list as the queue, on every
+used non-shortest bush link of the sampled TAPAS origins after the warm-up
+iterations. Both searches run without and with the flow check and must build
+the same PASs.
+
+Usage: python -m benchmarks.pas_search [city_name] [warmup] [origins] [repeats]
+"""
+import io
+import math
+import random
+import sys
+from contextlib import redirect_stdout
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+from src.algorithms.tapas.pas import Pas
+from src.algorithms.tapas.pas_manager import PasManager
+from src.algorithms.tapas.tapas import TAPAS
+from src.algorithms.tapas.tapas_bush_graph import TapasBushGraph
+from src.data.cache import load_data_for_city
+from src.shared.consts import DIR_TOLERANCE, ZERO_FLOW
+from src.shared.link import Link
+
+Candidate = Tuple[TapasBushGraph, Link, int]
+
+
+def create_pas_dict_queue(
+    manager: PasManager,
+    graph: TapasBushGraph,
+    exp_link: Link,
+    node_index: int,
+    check: bool
+) -> Pas | None:
+    # Previous implementation, kept only as a reference point
+    queue = [exp_link]
+    checked_nodes = dict.fromkeys(graph.nodes, False)
+    checked_links: Dict[int, Link | None] = dict.fromkeys(graph.nodes, None)
+    can_stop = False
+    shortest_path_nodes = {node_index}
+    link = graph.alpha_min[node_index]
+    while link is not None:
+        shortest_path_nodes.add(link.src)
+        link = graph.alpha_min[link.src]
+    incoming_links_dict = graph.GetAllIncomingLinks()
+    thr = manager.v * graph.bush_flow[exp_link.id]
+    created = True
+
+    while not can_stop:
+        if not queue:
+            created = False
+            break
+        first_in_queue = queue.pop(0)
+        checked_links[first_in_queue.src] = first_in_queue
+        if first_in_queue.src in shortest_path_nodes:
+            diverge_node = first_in_queue.src
+            break
+        for link in incoming_links_dict[first_in_queue.src]:
+            origin_flow = graph.bush_flow[link.id]
+            if not check or (check and origin_flow > thr):
+                node_from_index = link.src
+                if (
+                    origin_flow > ZERO_FLOW and
+                    not checked_nodes[node_from_index]
+                ):
+                    queue.append(link)
+                    checked_nodes[node_from_index] = True
+                    checked_links[node_from_index] = link
+                    if node_from_index in shortest_path_nodes:
+                        diverge_node = node_from_index
+                        can_stop = True
+                        break
+        checked_nodes[first_in_queue.src] = 0
+
+    if not created:
+        return None
+    (exp_link_ids, exp_cost) = manager.CreateExpSegment(
+        checked_links, diverge_node, node_index)  # type: ignore[arg-type]
+    (cheap_link_ids, cheap_cost) = manager.CreateCheapSegment(
+        graph, diverge_node, node_index)
+    pas = Pas(
+        manager.network.arrays,
+        cheap_link_ids, exp_link_ids, cheap_cost, exp_cost)
+    if pas.GetCostDiff() < DIR_TOLERANCE:
+        return None
+    pas.AddOrigin(graph)
+    manager.AddPas(pas)
+    return pas
+
+
+def find_candidates(tapas: TAPAS, origins: List[int]) -> List[Candidate]:
+    # Used links off the shortest path, as TapasBush.Equilibrate finds them
+    candidates = []
+    for origin in origins:
+        bush = tapas.bushes[origin]
+        bush.RemoveCyclicFlows()
+        graph = bush.subgraph
+        graph.BuildMinTree()
+        incoming_links_dict = graph.GetAllIncomingLinks()
+        for (node_index, incoming_links) in incoming_links_dict.items():
+            shortest_path_link = graph.alpha_min[node_index]
+            if shortest_path_link is None:
+                continue
+            for link in incoming_links:
+                if (
+                    graph.bush_flow[link.id] > ZERO_FLOW and
+                    link is not shortest_path_link
+                ):
+                    candidates.append((graph, link, node_index))
+    return candidates
+
+
+def run(create, manager: PasManager, candidates: List[Candidate], repeats: int):
+    # Eviction is off, so the PASs built by every repeat are the last ones
+    best = math.inf
+    segments: List[Tuple] = []
+    max_size = manager.maxSize
+    manager.maxSize = 0
+    for _ in range(repeats):
+        pas_list = list(manager.pasList)
+        pas_count = len(pas_list)
+        start = perf_counter()
+        for check in (False, True):
+            for (graph, exp_link, node_index) in candidates:
+                create(graph, exp_link, node_index, check)
+        best = min(best, perf_counter() - start)
+        segments = [
+            (
+                tuple(pas.GetSegment(0).tolist()),
+                tuple(pas.GetSegment(1).tolist())
+            )
+            for pas in manager.pasList[pas_count:]
+        ]
+        manager.pasList = pas_list
+        manager.RebuildPasIndex()
+    manager.maxSize = max_size
+    return (best, segments)
+
+
+def main(
+    city_name: str = 'SiouxFalls',
+    warmup: int = 1,
+    origins_count: int = 0,
+    repeats: int = 5
+):
+    (demands, nodes, links, _solution) = load_data_for_city(city_name)
+    with redirect_stdout(io.StringIO()):
+        tapas = TAPAS(nodes, links, demands, 1e-14)
+        for _ in range(warmup):
+            tapas.Iteration()
+    origins = sorted(tapas.bushes)
+    if 0 < origins_count < len(origins):
+        origins = random.Random(0).sample(origins, origins_count)
+    candidates = find_candidates(tapas, origins)
+    manager = tapas.pasManager
+    print(
+        f"{city_name}: {len(origins)} origins, "
+        f"{len(candidates)} candidate links, "
+        f"{warmup} warm-up iterations, best of {repeats}"
+    )
+
+    (reference, reference_segments) = run(
+        lambda *args: create_pas_dict_queue(manager, *args),
+        manager,
+        candidates,
+        repeats
+    )
+    (elapsed, segments) = run(manager.CreatePas, manager, candidates, repeats)
+    if segments != reference_segments:
+        raise AssertionError("PAS searches built different PASs.")
+    searches = 2 * len(candidates)
+    for (name, time) in (
+        ("dict maps, list queue", reference),
+        ("generation stamps, deque", elapsed)
+    ):
+        print(
+            f"{name:>26}: {time:.4f}s ({searches / time:,.0f} searches/s, "
+            f"x{reference / time:.1f})"
+        )
+    print(f"{len(segments)} PASs built per repeat")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2], *map(int, sys.argv[2:5]))
@@ -0,0 +1,247 @@
+"""
+Algorithm x dataset benchmark suite
+
+Runs every algorithm of ALGORITHMS against the datasets of DATA_LIST until
+the target gap (GAP const selects the relative or max gap) or the iteration
+limit is reached. Every case runs in a fresh process, so the peak memory is
+its own. For each case the suite records the initialisation and solve wall
+time, iterations, the time-to-gap curve, the peak resident memory and the
+final flow error against the `_flow.tntp` solution. Synthetic datasets are
+generated without one, their flow error is not recorded.
+
+Results are written as JSON and compared against a stored baseline. A case
+is flagged when its time, iterations, peak memory or flow error grows by
+more than the tolerance, or when it no longer reaches the target gap.
+Synthetic datasets are generated on first use, other datasets whose files
+are missing are skipped.
+
+Usage: python -m benchmarks.suite [--cities ...] [--algorithms ...]
+       [--gap 1e-4] [--max-iterations 100] [--output file] [--baseline file]
+       [--tolerance 0.2] [--save-baseline]
+"""
+import argparse
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import sys
+from contextlib import redirect_stdout
+from time import perf_counter
+from typing import Dict, List
+
+import numpy as np
+
+from results.root import ROOT_DIR
+from src.algorithms.calculate_equilibrium import CalculateEquilibrium
+from src.data.cache import get_city_dir, load_data_for_city
+from src.data.generator import ensure_dataset
+from src.data.test import ALGORITHMS, DATA_LIST
+from src.shared.consts import GAP
+from src.shared.network import Network
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None  # type: ignore[assignment]
+
+DEFAULT_OUTPUT = os.path.join(ROOT_DIR, 'benchmark-suite.json')
+DEFAULT_BASELINE = os.path.join(ROOT_DIR, 'benchmark-baseline.json')
+# Growth of these values beyond the tolerance is a regression
+COMPARED = (
+    'init_time', 'solve_time', 'iterations', 'peak_memory_kib', 'flow_error')
+# Differences below these are noise, whatever the tolerance
+ABSOLUTE_SLACK = {
+    'init_time': 0.05,
+    'solve_time': 0.05,
+    'iterations': 0,
+    'peak_memory_kib': 1024,
+    'flow_error': 1e-6,
+}
+
+
+def peak_memory_kib() -> int | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, KiB elsewhere
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def flow_error(solution: np.ndarray, network: Network) -> float | None:
+    # Largest difference between the link flows and the known solution
+    if not solution.size:
+        return None
+    max_diff = 0.0
+    for row in solution:
+        link = network.GetLink(row[0], row[1])
+        if link is None:
+            return math.inf
+        max_diff = max(max_diff, abs(link.flow - row[2]))
+    return max_diff
+
+
+def read_curve(results: str) -> List[List[float]]:
+    # [iteration, time, gap] of every gap check, columns as written by WriteGaps
+    curve = []
+    for line in results.splitlines():
+        (iteration, time, max_gap, rel_gap, _avg_excess) = line.split(',')
+        gap = float(max_gap if GAP else rel_gap)
+        curve.append([int(iteration), float(time), gap])
+    return curve
+
+
+def run_case(
+    city_name: str,
+    algorithm_index: int,
+    gap: float,
+    max_iterations: int
+) -> Dict:
+    (demands, nodes, links, solution) = load_data_for_city(city_name)
+    start = perf_counter()
+    algorithm = ALGORITHMS[algorithm_index](nodes, links, demands, gap)
+    init_time = perf_counter() - start
+    results = io.StringIO()
+    try:
+        start = perf_counter()
+        with redirect_stdout(io.StringIO()):
+            network = CalculateEquilibrium(
+                algorithm, gap, max_iterations).Run(results)
+        solve_time = perf_counter() - start
+    finally:
+        algorithm.Close()
+    curve = read_curve(results.getvalue())
+    return {
+        'city': city_name,
+        'algorithm': algorithm.__class__.__name__,
+        'init_time': init_time,
+        'solve_time': solve_time,
+        'iterations': curve[-1][0],
+        'final_gap': curve[-1][2],
+        'converged': curve[-1][2] <= gap,
+        'peak_memory_kib': peak_memory_kib(),
+        'flow_error': flow_error(solution, network),
+        'curve': curve,
+    }
+
+
+def dataset_exists(city_name: str) -> bool:
+    return os.path.isfile(
+        os.path.join(get_city_dir(city_name), f'{city_name}_net.tntp'))
+
+
+def run_suite(
+    cities: List[str],
+    algorithms: List[int],
+    gap: float,
+    max_iterations: int
+) -> List[Dict]:
+    cases = []
+    context = multiprocessing.get_context('spawn')
+    for city_name in cities:
+        ensure_dataset(city_name)
+        if not dataset_exists(city_name):
+            print(f"{city_name}: data files not found, skipped")
+            continue
+        for algorithm_index in algorithms:
+            with context.Pool(1) as pool:
+                case = pool.apply(
+                    run_case,
+                    (city_name, algorithm_index, gap, max_iterations))
+            print(
+                f"{case['city']} {case['algorithm']}: "
+                f"init {case['init_time']:.3f}s, "
+                f"solve {case['solve_time']:.3f}s, "
+                f"{case['iterations']} iterations, "
+                f"gap {case['final_gap']:.3g}, "
+                f"peak {case['peak_memory_kib']} KiB, "
+                f"flow error {case['flow_error']}"
+            )
+            cases.append(case)
+    return cases
+
+
+def compare(
+    cases: List[Dict],
+    baseline_cases: List[Dict],
+    tolerance: float
+) -> List[str]:
+    baseline = {
+        (case['city'], case['algorithm']): case for case in baseline_cases
+    }
+    regressions = []
+    for case in cases:
+        name = f"{case['city']} {case['algorithm']}"
+        base = baseline.get((case['city'], case['algorithm']))
+        if base is None:
+            continue
+        if base['converged'] and not case['converged']:
+            regressions.append(f"{name}: no longer reaches the target gap")
+        for key in COMPARED:
+            (value, base_value) = (case[key], base[key])
+            if value is None or base_value is None:
+                continue
+            if value > base_value * (1 + tolerance) + ABSOLUTE_SLACK[key]:
+                regressions.append(
+                    f"{name}: {key} {base_value:.6g} -> {value:.6g}")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument(
+        '--cities', nargs='+', default=list(DATA_LIST.values()))
+    parser.add_argument(
+        '--algorithms', nargs='+', type=int, default=list(ALGORITHMS))
+    parser.add_argument('--gap', type=float, default=1e-4)
+    parser.add_argument('--max-iterations', type=int, default=100)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.add_argument('--save-baseline', action='store_true')
+    args = parser.parse_args()
+
+    cases = run_suite(
+        args.cities, args.algorithms, args.gap, args.max_iterations)
+    report = {
+        'gap': args.gap,
+        'gap_type': 'max' if GAP else 'rel',
+        'max_iterations': args.max_iterations,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cases': cases,
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.isfile(args.baseline):
+        print(
+            f"No baseline at {args.baseline}, "
+            "run with --save-baseline to store one")
+        return 0
+    with open(args.baseline, 'r', encoding='utf-8') as file:
+        baseline = json.load(file)
+    baseline_gap = (baseline['gap'], baseline['gap_type'])
+    if baseline_gap != (report['gap'], report['gap_type']):
+        print("Baseline was recorded for a different target gap, not compared")
+        return 0
+    regressions = compare(cases, baseline['cases'], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(
+            f"No regressions beyond {args.tolerance:.0%} "
+            f"against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
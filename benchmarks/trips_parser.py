@@ -0,0 +1,95 @@
+"""
+Trip table parser benchmark
+
+Compares data.import_matrix with the previous literal_eval based parser for
+the dataset, then times the streaming parser on a generated dense trip table
+of the given number of zones.
+
+Usage: python -m benchmarks.trips_parser [city_name] [zones] [repeats]
+"""
+import io
+import math
+import os
+import sys
+from ast import literal_eval
+from time import perf_counter
+
+import numpy as np
+
+import src.data.data as data
+
+
+def import_matrix_literal_eval(city_name: str) -> np.ndarray:
+    # Previous implementation, kept only as a reference point
+    tripsfile = os.path.join(
+        data.get_root(), city_name, f'{city_name}_trips.tntp')
+    with open(tripsfile, 'r', encoding='utf-8') as file:
+        blocks = file.read().split('Origin')[1:]
+    matrix = {}
+    for block in blocks:
+        orig = block.split('\n')
+        destination_array = [
+            literal_eval('{' + a.replace(';', ',').replace(' ', '') + '}')
+            for a in orig[1:]
+        ]
+        destinations = {}
+        for i in destination_array:
+            destinations = {**destinations, **i}
+        matrix[int(orig[0])] = destinations
+    zones = max(matrix.keys())
+    mat = np.zeros((zones, zones))
+    for i in range(zones):
+        for j in range(zones):
+            mat[i, j] = matrix.get(i + 1, {}).get(j + 1, 0)
+    return mat
+
+
+def generate_trips(zones: int) -> str:
+    # Dense TNTP trip table with five "dest : value;" pairs per line
+    rng = np.random.default_rng(0)
+    lines = [f"<NUMBER OF ZONES> {zones}", "<END OF METADATA>", ""]
+    for origin in range(1, zones + 1):
+        lines.append(f"Origin \t{origin}")
+        demands = rng.integers(0, 1000, zones)
+        pairs = [
+            f"{dest:5d} : {demand:10.2f};"
+            for dest, demand in enumerate(demands, 1)
+        ]
+        lines.extend(
+            " ".join(pairs[start:start + 5]) for start in range(0, zones, 5))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def best_time(function, repeats: int) -> float:
+    best = math.inf
+    for _ in range(repeats):
+        start = perf_counter()
+        function()
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main(city_name: str = 'ChicagoSketch', zones: int = 2000, repeats: int = 3):
+    reference = data.import_matrix(city_name).ToDense()
+    assert np.array_equal(reference, import_matrix_literal_eval(city_name))
+    old_time = best_time(lambda: import_matrix_literal_eval(city_name), repeats)
+    new_time = best_time(lambda: data.import_matrix(city_name), repeats)
+    print(
+        f"{city_name}: {reference.shape[0]} zones, best of {repeats}\n"
+        f"{'literal_eval':>16}: {old_time:.4f}s\n"
+        f"{'streaming':>16}: {new_time:.4f}s (x{old_time / new_time:.1f})"
+    )
+
+    text = generate_trips(zones)
+    elapsed = best_time(lambda: data.read_matrix(io.StringIO(text)), repeats)
+    print(
+        f"generated: {zones} zones, {zones * zones} pairs, "
+        f"{len(text) / 2 ** 20:.1f} MiB\n"
+        f"{'streaming':>16}: {elapsed:.4f}s "
+        f"({len(text) / 2 ** 20 / elapsed:.1f} MiB/s)"
+    )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2], *map(int, sys.argv[2:4]))
@@ -1,6 +1,11 @@
 """ Base Algorithm """
 from abc import ABC, abstractmethod
+from typing import Dict
 
+from src.shared.bush_flow_store import BushFlowStore
+from src.shared.consts import BUSH_FLOW_STORE
+from src.shared.convergence import Gaps, calculate_gaps
+from src.shared.demand_matrix import DemandMatrix
 from src.shared.network import Network
 
 
@@ -13,11 +18,28 @@ class Algorithm(ABC):
     def __init__(self, nodes, links):
         super().__init__()
         self.network = Network(nodes, links)
+        self.bushes: Dict = {}
+
+    def CreateBushFlowStore(
+        self,
+        demands: DemandMatrix,
+        shared: bool = False
+    ) -> BushFlowStore:
+        # One bush is created for every origin with demand
+        origins_count = len(demands.GetOrigins())
+        # Sparse bush flows are per bush arrays and can not be shared with
+        # workers
+        mode = 'dense' if shared else BUSH_FLOW_STORE
+        return BushFlowStore(
+            len(self.network.links), origins_count, mode, shared)
 
     @abstractmethod
     def Iteration(self) -> None:
         raise NotImplementedError
 
-    @abstractmethod
-    def GetGaps(self) -> None:
-        raise NotImplementedError
+    def GetGaps(self) -> Gaps:
+        return calculate_gaps(self.network, self.bushes.values())
+
+    def Close(self) -> None:
+        # Releases resources held beyond the run, like worker processes
+        pass
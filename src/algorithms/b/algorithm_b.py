@@ -1,63 +1,94 @@
 """Algorithm B Class"""
-import math
 from typing import Dict
 
 from src.algorithms.algorithm import Algorithm
+from src.algorithms.b.bush_worker_pool import BushWorkerPool
 from src.shared.bush import Bush
+from src.shared.consts import PARALLEL_BATCH_SIZE, PARALLEL_WORKERS
+from src.shared.convergence import Gaps, gaps_from_totals
+from src.shared.demand_matrix import DemandMatrix
 from src.shared.network import Network
 
 
 class AlgorithmB(Algorithm):
-    """ Algorithm B Class """
+    """
+    Algorithm B Class
+    Bushes are processed one after another (Gauss-Seidel) or, with workers,
+    in parallel batches against a snapshot of link costs (Jacobi).
+    """
 
-    def __init__(self, nodes, links, demands, error: float) -> None:
+    def __init__(
+        self,
+        nodes,
+        links,
+        demands: DemandMatrix,
+        error: float,
+        workers: int = PARALLEL_WORKERS,
+        batch_size: int = PARALLEL_BATCH_SIZE
+    ) -> None:
         super().__init__(nodes, links)
+        self.bush_flow_store = self.CreateBushFlowStore(
+            demands, shared=workers > 0)
         self.bushes = self.CreateBushes(demands, self.network, error)
         self.error = error
         self.demands = demands
+        self.worker_pool: BushWorkerPool | None = None
+        if workers > 0:
+            self.worker_pool = BushWorkerPool(
+                self.network,
+                list(self.bushes.values()),
+                self.bush_flow_store,
+                self.ProcessBush,
+                workers,
+                batch_size
+            )
 
-    def CreateBushes(self, demands, network: Network, error: float) -> Dict[int, Bush]:
+    def CreateBushes(
+        self,
+        demands: DemandMatrix,
+        network: Network,
+        error: float
+    ) -> Dict[int, Bush]:
         bushes: Dict[int, Bush] = {}
-        for from_node, demands_array in enumerate(demands):
-            from_node_index = from_node + 1
-            if from_node_index in bushes or demands_array.max() == 0:
-                continue
+        for from_node_index in demands.GetOrigins():
             bushes[from_node_index] = Bush(
                 from_node_index,
                 network,
-                demands_array,
-                error
+                demands,
+                error,
+                self.bush_flow_store
             )
 
         return bushes
 
+    def ProcessBush(self, bush: Bush) -> None:
+        bush.UpdateTopoSort()
+        bush.Improve()
+        bush.Equilibrate()
+        bush.RemoveUnusedLinks()
+
     def Iteration(self) -> None:
+        if self.worker_pool is not None:
+            self.worker_pool.Iteration()
+            return
         for bush in self.bushes.values():
-            bush.UpdateTopoSort()
-            bush.Improve()
-            bush.Equilibrate()
-            bush.RemoveUnusedLinks()
+            self.ProcessBush(bush)
 
-    def GetGaps(self):
-        rel_gap = 0
-        max_gap = 0
+    def GetGaps(self) -> Gaps:
+        if self.worker_pool is None:
+            return super().GetGaps()
+        (min_travel_time, max_gap) = self.worker_pool.GetGaps()
+        total_demand = sum(
+            bush.subgraph.total_demand for bush in self.bushes.values())
+        return gaps_from_totals(
+            self.network.TotalTravelTime(),
+            min_travel_time,
+            max_gap,
+            total_demand
+        )
 
-        total_travel_time = 0
-        for link in self.network.links.values():
-            total_travel_time += link.flow * link.cost
-
-        min_travel_time = 0
-        for bush in self.bushes.values():
-            bush.BuildTrees()
-            self.network.BuildMinTree(bush.originIndex)
-            for node_idx, demand in enumerate(bush.subgraph.demands):
-                if demand == 0:
-                    continue
-                node = self.network.nodes[node_idx + 1]
-                min_travel_time += demand * node.pi_min
-                max_gap = max(max_gap, node.pi_max - node.pi_min)
-
-        rel_gap = 1.0 - min_travel_time / \
-            total_travel_time if total_travel_time > 1e-25 else math.inf
-
-        return (rel_gap, max_gap)
+    def Close(self) -> None:
+        # Stops the worker processes of the parallel mode
+        if self.worker_pool is not None:
+            self.worker_pool.Close()
+            self.worker_pool = None
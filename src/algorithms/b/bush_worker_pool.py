@@ -0,0 +1,157 @@
+"""
+Bush worker pool - parallel (Jacobi) iterations of Algorithm B
+
+The bushes are split into batches of consecutive origins and every worker
+process owns a fixed part of each batch. Before a batch the parent sums the
+link flows from the shared bush flow store, while all workers wait, and
+publishes them in a shared snapshot. Every worker then equilibrates its
+bushes against the same link costs and does not see the flow moved by the
+other workers until the next batch. Workers never read the store, so none
+of them reads rows another worker is writing. Bush state stays in the
+workers, only the bush flows go through the store.
+"""
+import mmap
+import multiprocessing
+from multiprocessing.connection import Connection
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+from src.shared.bush import Bush
+from src.shared.bush_flow_store import BushFlowStore
+from src.shared.consts import ZERO_FLOW
+from src.shared.convergence import bush_gaps
+from src.shared.network import Network
+
+ITERATE = 'iterate'
+GAPS = 'gaps'
+CLOSE = 'close'
+
+
+def run_worker(
+    connection: Connection,
+    network: Network,
+    link_flows: np.ndarray,
+    batches: List[List[Bush]],
+    process_bush: Callable[[Bush], None]
+) -> None:
+    while True:
+        (command, batch) = connection.recv()
+        if command == CLOSE:
+            break
+        network.arrays.SetFlows(link_flows)
+        if command == ITERATE:
+            for bush in batches[batch]:
+                process_bush(bush)
+            connection.send(None)
+        elif command == GAPS:
+            min_travel_time = 0.0
+            max_gap = 0.0
+            for batch_bushes in batches:
+                for bush in batch_bushes:
+                    (bush_min_travel_time, bush_max_gap) = bush_gaps(
+                        network, bush)
+                    min_travel_time += bush_min_travel_time
+                    max_gap = max(max_gap, bush_max_gap)
+            connection.send((min_travel_time, max_gap))
+    connection.close()
+
+
+class BushWorkerPool:
+    """
+    Worker processes sharing the bushes of an algorithm.
+    Workers are forked once the bushes exist, so they start with a copy of
+    the network and bushes and keep their own bushes up to date afterwards.
+    """
+
+    def __init__(
+        self,
+        network: Network,
+        bushes: List[Bush],
+        bush_flow_store: BushFlowStore,
+        process_bush: Callable[[Bush], None],
+        workers: int,
+        batch_size: int = 0
+    ) -> None:
+        if workers < 1:
+            raise ValueError("Bush worker pool needs at least one worker.")
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise ValueError("Parallel mode needs the fork start method.")
+        self.network = network
+        self.bush_flow_store = bush_flow_store
+        # Link flows published to the workers, anonymous mappings are shared
+        # with forked children
+        links_count = network.arrays.m
+        self.link_flows_buffer = mmap.mmap(-1, max(links_count, 1) * 8)
+        self.link_flows = np.frombuffer(
+            self.link_flows_buffer, np.float64, links_count)
+        self.PublishLinkFlows()
+        batch_size = batch_size if batch_size > 0 else max(len(bushes), 1)
+        batches = [
+            bushes[start:start + batch_size]
+            for start in range(0, len(bushes), batch_size)
+        ]
+        self.batches_count = len(batches)
+
+        context = multiprocessing.get_context('fork')
+        self.connections: List[Connection] = []
+        self.processes = []
+        for worker in range(workers):
+            (connection, worker_connection) = context.Pipe()
+            process = context.Process(
+                target=run_worker,
+                args=(
+                    worker_connection,
+                    network,
+                    self.link_flows,
+                    [batch[worker::workers] for batch in batches],
+                    process_bush
+                ),
+                daemon=True
+            )
+            process.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def PublishLinkFlows(self) -> None:
+        # Link flows are the sum of the bush flows, read while workers wait
+        link_flows = self.bush_flow_store.GetLinkFlows()
+        link_flows[link_flows <= ZERO_FLOW] = 0.0
+        self.link_flows[:] = link_flows
+        self.network.arrays.SetFlows(link_flows)
+
+    def Send(self, command: str, batch: int = 0) -> List:
+        # Workers start from the link flows published last
+        for connection in self.connections:
+            connection.send((command, batch))
+        try:
+            return [connection.recv() for connection in self.connections]
+        except EOFError as error:
+            raise RuntimeError("Bush worker stopped unexpectedly.") from error
+
+    def Iteration(self) -> None:
+        # Flows published last are current for the first batch
+        for batch in range(self.batches_count):
+            if batch > 0:
+                self.PublishLinkFlows()
+            self.Send(ITERATE, batch)
+        self.PublishLinkFlows()
+
+    def GetGaps(self) -> Tuple[float, float]:
+        # Sum of the minimal travel times and maximal gap of all bushes
+        min_travel_time = 0.0
+        max_gap = 0.0
+        for (worker_min_travel_time, worker_max_gap) in self.Send(GAPS):
+            min_travel_time += worker_min_travel_time
+            max_gap = max(max_gap, worker_max_gap)
+        return (min_travel_time, max_gap)
+
+    def Close(self) -> None:
+        for connection in self.connections:
+            connection.send((CLOSE, 0))
+            connection.close()
+        for process in self.processes:
+            process.join()
+        self.connections.clear()
+        self.processes.clear()
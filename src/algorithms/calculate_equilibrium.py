@@ -3,7 +3,12 @@ from io import TextIOWrapper
 from time import perf_counter
 
 from src.algorithms.algorithm import Algorithm
-from src.shared.consts import GAP
+from src.shared.consts import GAP, PROFILE_ITERATIONS
+from src.shared.convergence import Gaps, GapSchedule
+from src.utils.metrics import metrics, write_metrics, write_metrics_header
+from src.utils.phase_profiler import (GAPS, phase, profiler, write_phases,
+                                      write_phases_header)
+from src.utils.profile_capture import ProfileCapture
 
 
 class CalculateEquilibrium:
@@ -13,28 +18,88 @@ class CalculateEquilibrium:
         self,
         algorithm: Algorithm,
         e: float,
-        max_iteration_count: int
+        max_iteration_count: int,
+        schedule: GapSchedule | None = None,
+        profile_iterations: int = PROFILE_ITERATIONS
     ):
         self.algorithm = algorithm
         self.e = e
         self.max_iteration_count = max_iteration_count
+        self.profile_iterations = profile_iterations
+        self.schedule = schedule if schedule is not None else GapSchedule(e)
 
-    def Run(self, file: TextIOWrapper) -> None:
+    def WriteGaps(
+        self,
+        file: TextIOWrapper,
+        iteration_count: int,
+        time: float,
+        gaps: Gaps
+    ) -> None:
+        # iteration, time, max gap, rel gap, avg excess
+        file.write(f"{iteration_count},{time},{gaps[1]},{gaps[0]},{gaps[2]}\n")
+
+    @phase(GAPS)
+    def GetGaps(self) -> Gaps:
+        return self.algorithm.GetGaps()
+
+    def WriteIterationStats(
+        self,
+        iteration_count: int,
+        phases_file: TextIOWrapper | None,
+        metrics_file: TextIOWrapper | None
+    ) -> None:
+        if phases_file is not None:
+            write_phases(phases_file, iteration_count, profiler.TakeTimes())
+        if metrics_file is not None:
+            write_metrics(metrics_file, iteration_count, metrics.TakeSnapshot())
+
+    def Run(
+        self,
+        file: TextIOWrapper,
+        phases_file: TextIOWrapper | None = None,
+        metrics_file: TextIOWrapper | None = None,
+        profile: ProfileCapture | None = None
+    ) -> None:
+        # Gaps are written only for the iterations they were calculated after,
+        # the run stops after a check, so the final gaps are always exact
         iteration_count = 0
-        gaps = self.algorithm.GetGaps()
+        if profile is not None:
+            profile.Start()
+        if phases_file is not None:
+            write_phases_header(phases_file)
+        if metrics_file is not None:
+            write_metrics_header(metrics_file)
+        # Algorithm initialisation is not part of any iteration
+        profiler.TakeTimes()
+        metrics.TakeSnapshot()
+        gaps = self.GetGaps()
+        next_check = self.schedule.NextCheck(iteration_count, gaps[GAP])
         start_time = perf_counter()
+        self.WriteGaps(file, iteration_count, perf_counter() - start_time, gaps)
+        self.WriteIterationStats(iteration_count, phases_file, metrics_file)
         while (
             gaps[GAP] > self.e and
             iteration_count < self.max_iteration_count or
             iteration_count <= 0
         ):
-            file.write(
-                f"{iteration_count},{perf_counter() - start_time},{gaps[1]},{gaps[0]}\n")
             iteration_count += 1
             self.algorithm.Iteration()
-            gaps = self.algorithm.GetGaps()
-
-        file.write(
-            f"{iteration_count},{perf_counter() - start_time},{gaps[1]},{gaps[0]}\n")
+            if (
+                iteration_count >= next_check or
+                iteration_count >= self.max_iteration_count
+            ):
+                gaps = self.GetGaps()
+                next_check = self.schedule.NextCheck(
+                    iteration_count, gaps[GAP])
+                self.WriteGaps(
+                    file, iteration_count, perf_counter() - start_time, gaps)
+            self.WriteIterationStats(iteration_count, phases_file, metrics_file)
+            if (
+                profile is not None and
+                iteration_count == self.profile_iterations
+            ):
+                profile.Stop()
 
+        if profile is not None:
+            profile.Stop()
         return self.algorithm.network
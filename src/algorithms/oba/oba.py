@@ -4,30 +4,39 @@ from typing import Dict
 
 from src.algorithms.algorithm import Algorithm
 from src.shared.bush import Bush
+from src.shared.demand_matrix import DemandMatrix
 from src.shared.network import Network
 
 
 class OBA(Algorithm):
     """ OBA Class """
 
-    def __init__(self, nodes, networks, demands, error: float) -> None:
+    def __init__(
+        self,
+        nodes,
+        networks,
+        demands: DemandMatrix,
+        error: float
+    ) -> None:
         super().__init__(nodes, networks)
+        self.bush_flow_store = self.CreateBushFlowStore(demands)
         self.bushes = self.CreateBushes(demands, self.network, error)
 
-    def CreateBushes(self, demands, network: Network, error: float) -> Dict[int, Bush]:
+    def CreateBushes(
+        self,
+        demands: DemandMatrix,
+        network: Network,
+        error: float
+    ) -> Dict[int, Bush]:
         bushes: Dict[int, Bush] = {}
-        for from_node, demands_array in enumerate(demands):
-            from_node_index = from_node + 1
-            for to_node, demand in enumerate(demands_array):
-                _to_node_index = to_node + 1
-                if demand == 0 or from_node_index in bushes:
-                    continue
-                bushes[from_node_index] = Bush(
-                    from_node_index,
-                    network,
-                    demands_array,
-                    error
-                )
+        for from_node_index in demands.GetOrigins():
+            bushes[from_node_index] = Bush(
+                from_node_index,
+                network,
+                demands,
+                error,
+                self.bush_flow_store
+            )
 
         return bushes
 
@@ -49,8 +58,8 @@ class OBA(Algorithm):
         bush.BuildTrees()
 
         for link in self.network.links.values():
-            if self.network.nodes[link.src].pi_max < self.network.nodes[link.dest].pi_max:
-                bush.subgraph.links[link.index] = link
+            if bush.subgraph.pi_max[link.src] < bush.subgraph.pi_max[link.dest]:
+                bush.subgraph.AddLink(link)
                 # check if link nodes exists in bush or just dont remove them
 
         bush.UpdateTopoSort()
@@ -91,27 +100,3 @@ class OBA(Algorithm):
 
     def UpdateTotalLinkFlowsAndCosts(self):
         pass
-
-    def GetGaps(self):
-        rel_gap = 0
-        max_gap = 0
-
-        total_travel_time = 0
-        for link in self.network.links.values():
-            total_travel_time += link.flow * link.cost
-
-        min_travel_time = 0
-        for bush in self.bushes.values():
-            bush.BuildTrees()
-            self.network.BuildMinTree(bush.originIndex)
-            for node_idx, demand in enumerate(bush.subgraph.demands):
-                if demand == 0:
-                    continue
-                node = self.network.nodes[node_idx + 1]
-                min_travel_time += demand * node.pi_min
-                max_gap = max(max_gap, node.pi_max - node.pi_min)
-
-        rel_gap = 1.0 - min_travel_time / \
-            total_travel_time if total_travel_time > 1e-25 else math.inf
-
-        return (rel_gap, max_gap)
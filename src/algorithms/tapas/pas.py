@@ -1,59 +1,88 @@
 """ Pas class """
 import math
-from operator import attrgetter
-from typing import Dict, List, Literal
+import sys
+from typing import Dict, List, Literal, Tuple
+
+import numpy as np
 
 from src.algorithms.tapas.tapas_bush_graph import TapasBushGraph
-from src.shared.consts import DIR_TOLERANCE, ZERO_FLOW
-from src.shared.link import Link
+from src.shared.compact_network import CompactNetwork
+from src.shared.consts import ZERO_FLOW
 
 
 class Pas():
     """ Paired Alternative Segment """
 
-    def __init__(self) -> None:
-        self.cheapCost = 0.0
-        self.expCost = 0.0
+    def __init__(
+        self,
+        arrays: CompactNetwork,
+        cheap_link_ids: List[int],
+        exp_link_ids: List[int],
+        cheap_cost: float,
+        exp_cost: float
+    ) -> None:
+        self.arrays = arrays
+        self.cheapCost = cheap_cost
+        self.expCost = exp_cost
         self.totalShift = 0.0
         self.cheapSegment: Literal[0, 1] = 0
         self.flowMovesNumber: int = 0
-        self.relevantOrigins: List[TapasBushGraph] = []
-        self.segments: Dict[Literal[0, 1], List[Link]] = {0: [], 1: []}
+        # Value of the PasManager move clock when flow was last moved
+        self.lastMove: int = 0
+        # Bushes of the origins that use the PAS by origin index, in the
+        # order they were added
+        self.relevantOrigins: Dict[int, TapasBushGraph] = {}
+        # Link ids of segment 0, cheap when created, and then segment 1, from
+        # the diverge to the merge node. A view of the PasLinkPool array once
+        # the PAS is added to it.
+        self.linkIds: np.ndarray = np.array(
+            cheap_link_ids + exp_link_ids, dtype=np.int64)
+        # Length of segment 0
+        self.split = len(cheap_link_ids)
+        # cost_version of the network when the costs were last recalculated
+        self.costsVersion = -1
 
     def IsUnused(self):
         ret_val = self.flowMovesNumber
         self.flowMovesNumber = 0
         return ret_val < 0
 
-    def PushFrontToCheap(self, link: Link):
-        self.segments[self.cheapSegment].insert(0, link)
-        self.cheapCost += link.cost
+    def GetSegment(self, segment: Literal[0, 1]) -> np.ndarray:
+        if segment == 0:
+            return self.linkIds[:self.split]
+        return self.linkIds[self.split:]
 
-    def PushBackToExp(self, link: Link):
-        self.segments[1 - self.cheapSegment].append(link)
-        self.expCost += link.cost
+    def GetLastLinkId(self, segment: Literal[0, 1]) -> int:
+        if segment == 0:
+            return self.linkIds.item(self.split - 1)
+        return self.linkIds.item(-1)
 
-    def GetLastCheapLink(self):
-        if self.cheapSegment not in self.segments:
-            return None
-        return self.segments[self.cheapSegment][-1]
+    def GetLastCheapLinkId(self) -> int:
+        return self.GetLastLinkId(self.cheapSegment)
 
-    def GetLastExpLink(self):
-        if 1 - self.cheapSegment not in self.segments:
-            return None
-        return self.segments[1 - self.cheapSegment][-1]
+    def GetLastExpLinkId(self) -> int:
+        return self.GetLastLinkId(1 - self.cheapSegment)
 
     def AddOrigin(self, graph: TapasBushGraph):
-        self.relevantOrigins.append(graph)
-
-    def CheckIfEffective(self, cost: float, v: float, index: int, graph: TapasBushGraph):
-        return self.CheckIfCostEffective(cost) and self.CheckIfFlowEffective(v, index, graph)
+        # Reusing a PAS for the same origin again keeps a single entry
+        self.relevantOrigins.setdefault(graph.originIndex, graph)
+
+    def CheckIfEffective(
+        self,
+        cost: float,
+        v: float,
+        index: int,
+        graph: TapasBushGraph
+    ):
+        return (
+            self.CheckIfCostEffective(cost) and
+            self.CheckIfFlowEffective(v, index, graph)
+        )
 
     def CheckIfFlowEffective(self, v: float, index: int, graph: TapasBushGraph):
         min_flow = math.inf
-        exp_index = 1 - self.cheapSegment
-        for link in self.segments[exp_index]:
-            flow = graph.bush_flow[link.index]
+        for link_id in self.GetSegment(1 - self.cheapSegment).tolist():
+            flow = graph.bush_flow[link_id]
             if flow < min_flow:
                 min_flow = flow
         return min_flow >= v * graph.bush_flow[index]
@@ -61,15 +90,37 @@ class Pas():
     def CheckIfCostEffective(self, cost: float):
         return self.expCost - self.cheapCost >= cost
 
-    def MoveFlow(self):
-        self.flowMovesNumber -= 1
-        self.RecalculateCosts()
-        if self.GetCostDiff() < DIR_TOLERANCE:
-            return
+    def GetSegmentLists(self) -> Tuple[List[int], List[int]]:
+        # Link ids of the cheap and of the expensive segment
+        link_ids = self.linkIds.tolist()
+        if self.cheapSegment == 0:
+            return (link_ids[:self.split], link_ids[self.split:])
+        return (link_ids[self.split:], link_ids[:self.split])
+
+    def MoveFlow(self, newton_shift: float) -> float:
+        # MoveOriginFlow and the same shift of the link flows
+        (cheap_segment, exp_segment) = self.GetSegmentLists()
+        shift_flow = self.MoveOriginFlow(
+            newton_shift, cheap_segment, exp_segment)
+        if shift_flow:
+            self.arrays.AddSegmentFlow(cheap_segment, shift_flow)
+            self.arrays.AddSegmentFlow(exp_segment, -shift_flow)
+        return shift_flow
+
+    def MoveOriginFlow(
+        self,
+        newton_shift: float,
+        cheap_segment: List[int],
+        exp_segment: List[int]
+    ) -> float:
+        """
+        Moves flow from the expensive to the cheap segment in the bushes of
+        the relevant origins. Returns the moved flow, 0 if none was moved,
+        the link flows are left to the caller.
+        """
+        shift_flow = self.CalculateFlowShift(newton_shift, exp_segment)
         moved_flow = False
-        shift_flow = self.CalculateFlowShift()
-        exp_index = 1 - self.cheapSegment
-        for graph in self.relevantOrigins:
+        for graph in self.relevantOrigins.values():
             if self.totalShift <= 0.0:
                 continue
 
@@ -78,34 +129,25 @@ class Pas():
                 continue
 
             moved_flow = True
-            for link in self.segments[self.cheapSegment]:
-                graph.AddOriginFlowAndCreateLink(link, delta_x)
+            for link_id in cheap_segment:
+                graph.AddOriginFlowAndCreateLink(link_id, delta_x)
 
-            for link in self.segments[exp_index]:
-                if graph.bush_flow[link.index] - delta_x < ZERO_FLOW:
-                    graph.bush_flow[link.index] = 0.0
+            for link_id in exp_segment:
+                if graph.bush_flow[link_id] - delta_x < ZERO_FLOW:
+                    graph.ClearBushFlow(link_id)
                 else:
-                    graph.AddOriginFlowAndCreateLink(link, -delta_x)
+                    graph.AddOriginFlowAndCreateLink(link_id, -delta_x)
 
-        if not moved_flow:
-            return
-
-        for link in self.segments[self.cheapSegment]:
-            link.AddFlow(shift_flow)
-        for link in self.segments[exp_index]:
-            link.AddFlow(-shift_flow)
-        self.flowMovesNumber += 1
+        return shift_flow if moved_flow else 0.0
 
-    def CalculateFlowShift(self) -> float:
+    def CalculateFlowShift(
+        self,
+        newton_shift: float,
+        exp_segment: List[int]
+    ) -> float:
+        # Newton shift limited by the expensive segment flow of the origins
         self.totalShift = 0.0
-        exp_segment: List[str] = list(
-            map(
-                attrgetter('index'),
-                self.segments[1 - self.cheapSegment]
-            )
-        )
-
-        for graph in self.relevantOrigins:
+        for graph in self.relevantOrigins.values():
             min_flow_shift = math.inf
             for link_index in exp_segment:
                 bush_flow = graph.bush_flow[link_index]
@@ -115,22 +157,20 @@ class Pas():
             graph.min_shift = min_flow_shift
             self.totalShift += min_flow_shift
 
-        flow_shift = self.GetFlowShift()
-        if flow_shift > self.totalShift:
-            flow_shift = self.totalShift
-
-        return flow_shift
+        if newton_shift > self.totalShift:
+            return self.totalShift
+        return newton_shift
 
     def GetFlowShift(self) -> float:
-        return (self.expCost - self.cheapCost) / self.CalculateDisjointPathDerivative()
+        return (
+            (self.expCost - self.cheapCost) /
+            self.CalculateDisjointPathDerivative()
+        )
 
     def GetCostDiff(self) -> float:
         return self.expCost - self.cheapCost
 
-    def RecalculateCosts(self) -> float:
-        cost0 = math.fsum(map(attrgetter('cost'), self.segments[0]))
-        cost1 = math.fsum(map(attrgetter('cost'), self.segments[1]))
-
+    def SetCosts(self, cost0: float, cost1: float) -> None:
         if cost0 < cost1:
             self.cheapSegment = 0
             self.cheapCost = cost0
@@ -139,9 +179,33 @@ class Pas():
             self.cheapSegment = 1
             self.cheapCost = cost1
             self.expCost = cost0
+        self.costsVersion = self.arrays.cost_version
+
+    def RecalculateCosts(self) -> None:
+        # Costs stay valid until the flow or cost of a segment link changes
+        arrays = self.arrays
+        link_ids = self.linkIds.tolist()
+        link_version = arrays.link_version
+        if max([link_version[i] for i in link_ids]) <= self.costsVersion:
+            return
+
+        costs = arrays.GetCostList()
+        self.SetCosts(
+            math.fsum([costs[i] for i in link_ids[:self.split]]),
+            math.fsum([costs[i] for i in link_ids[self.split:]]))
 
     def CalculateDisjointPathDerivative(self) -> float:
+        cost_ders = self.arrays.GetCostDerivativeList()
+        link_ids = self.linkIds.tolist()
+        return (
+            math.fsum([cost_ders[i] for i in link_ids[:self.split]]) +
+            math.fsum([cost_ders[i] for i in link_ids[self.split:]])
+        )
+
+    def GetMemorySize(self) -> int:
+        # Approximate bytes held by the PAS, the network and bushes are shared
         return (
-            math.fsum(map(attrgetter('cost_der'), self.segments[0])) +
-            math.fsum(map(attrgetter('cost_der'), self.segments[1]))
+            sys.getsizeof(self) + sys.getsizeof(self.__dict__) +
+            sys.getsizeof(self.relevantOrigins) +
+            sys.getsizeof(self.linkIds) + self.linkIds.nbytes
         )
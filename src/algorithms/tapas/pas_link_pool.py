@@ -0,0 +1,113 @@
+""" Pas link pool """
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.algorithms.tapas.pas import Pas
+
+
+class PasLinkPool():
+    """
+    Link ids of the PAS segments in one flat array, PAS after PAS in the
+    pasList order, each PAS first segment 0 then segment 1. PASs keep a view
+    of their range, bounds hold the start and the segment split of each.
+    Every PAS also gets a round, the lowest one no PAS sharing a link with
+    it has, so the PASs of a round have no common links.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self.link_ids = np.empty(capacity, dtype=np.int64)
+        self.size = 0
+        self.bounds: List[int] = []
+        self.rounds: List[int] = []
+        # Bit mask of the rounds of the PASs using the link
+        self.link_rounds: Dict[int, int] = {}
+
+    def Add(self, pas: Pas) -> None:
+        link_ids = pas.linkIds
+        start = self.size
+        end = start + link_ids.size
+        if end > self.link_ids.size:
+            # Views of the PASs added before keep the old array until Compact
+            grown = np.empty(max(2 * self.link_ids.size, end), dtype=np.int64)
+            grown[:start] = self.link_ids[:start]
+            self.link_ids = grown
+        self.link_ids[start:end] = link_ids
+        self.size = end
+        pas.linkIds = self.link_ids[start:end]
+        self.bounds += (start, start + pas.split)
+        self.AddRound(pas.linkIds.tolist())
+
+    def AddRound(self, link_ids: List[int]) -> None:
+        link_rounds = self.link_rounds
+        used = 0
+        for link_id in link_ids:
+            used |= link_rounds.get(link_id, 0)
+        # Lowest bit not set in used
+        round_bit = ~used & (used + 1)
+        for link_id in link_ids:
+            link_rounds[link_id] = link_rounds.get(link_id, 0) | round_bit
+        self.rounds.append(round_bit.bit_length() - 1)
+
+    def Compact(self, pas_list: List[Pas]) -> None:
+        # Rebuilds the pool from the remaining PASs, in their order
+        self.link_ids = np.concatenate(
+            [pas.linkIds for pas in pas_list] or [np.empty(0, np.int64)])
+        self.size = self.link_ids.size
+        self.bounds = []
+        self.rounds = []
+        self.link_rounds = {}
+        start = 0
+        for pas in pas_list:
+            end = start + pas.linkIds.size
+            pas.linkIds = self.link_ids[start:end]
+            self.bounds += (start, start + pas.split)
+            self.AddRound(pas.linkIds.tolist())
+            start = end
+
+    def GetSegmentSums(self, values: np.ndarray) -> np.ndarray:
+        # Sums of the link values over both segments of every PAS, n x 2
+        if not self.bounds:
+            return np.empty((0, 2))
+        sums = np.add.reduceat(values[self.link_ids[:self.size]], self.bounds)
+        return sums.reshape(-1, 2)
+
+    def GetRounds(
+        self,
+        min_size: int
+    ) -> Tuple[List[Tuple[np.ndarray, np.ndarray, np.ndarray]], List[int]]:
+        """
+        Every round with at least min_size PASs as the pasList indices of its
+        PASs, their link ids one after another and the start and split of
+        each PAS in them. Then the pasList indices of all the other PASs.
+        """
+        if not self.rounds:
+            return ([], [])
+        rounds = np.array(self.rounds, dtype=np.int64)
+        round_sizes = np.bincount(rounds)
+        is_large = round_sizes[rounds] >= min_size
+        large = np.flatnonzero(is_large)
+        pas_ids = large[np.argsort(rounds[large], kind='stable')]
+
+        bounds = np.array(self.bounds, dtype=np.int64).reshape(-1, 2)
+        starts = bounds[pas_ids, 0]
+        lengths = np.diff(bounds[:, 0], append=self.size)[pas_ids]
+        new_starts = np.cumsum(lengths) - lengths
+        link_ids = self.link_ids[
+            np.arange(lengths.sum()) + np.repeat(starts - new_starts, lengths)]
+        new_bounds = np.column_stack(
+            (new_starts, new_starts + bounds[pas_ids, 1] - starts))
+
+        large_rounds = []
+        round_ends = np.cumsum(round_sizes[round_sizes >= min_size]).tolist()
+        element_ends = np.append(new_starts, link_ids.size)
+        round_start = 0
+        for round_end in round_ends:
+            (first, last) = (element_ends[round_start], element_ends[round_end])
+            large_rounds.append((
+                pas_ids[round_start:round_end],
+                link_ids[first:last],
+                new_bounds[round_start:round_end].ravel() - first
+            ))
+            round_start = round_end
+        return (large_rounds, np.flatnonzero(~is_large).tolist())
@@ -1,127 +1,311 @@
 """ Pas manager """
 import math
-from typing import Dict, List
+from collections import defaultdict, deque
+from typing import Callable, DefaultDict, List, NamedTuple, Tuple
+
+import numpy as np
 
 from src.algorithms.tapas.pas import Pas
+from src.algorithms.tapas.pas_link_pool import PasLinkPool
 from src.algorithms.tapas.tapas_bush_graph import TapasBushGraph
-from src.shared.consts import DIR_TOLERANCE, MU, ZERO_FLOW, V
+from src.shared.consts import (DIR_TOLERANCE, MAX_PAS_COUNT, METRICS, MU,
+                               PAS_EVICTION, ZERO_FLOW, V)
 from src.shared.link import Link
 from src.shared.network import Network
+from src.utils.metrics import (ADD_FLOW_CALLS, PAS_CREATED, PAS_DELETED,
+                               PAS_EVICTED, PAS_POOL_MEMORY, PAS_POOL_SIZE,
+                               PAS_REUSED, PAS_SEARCH_EXPANSIONS, metrics)
+from src.utils.phase_profiler import FLOW_SHIFT, PAS, phase
+
+# Rounds of fewer PASs are shifted one PAS at a time, NumPy call overhead
+# is not worth it for them
+SHIFT_ROUND_MIN_SIZE = 16
+# A full pool evicts this share of its size at once, so the eviction scan
+# runs once per that many new PASs
+EVICTION_BATCH = 0.1
+
+
+def recency_order(manager: 'PasManager') -> np.ndarray:
+    last_moves = np.fromiter(
+        (pas.lastMove for pas in manager.pasList), np.int64)
+    return np.argsort(last_moves, kind='stable')
+
+
+def effectiveness_order(manager: 'PasManager') -> np.ndarray:
+    # Cost differences of all PASs in one pass over the link pool
+    costs = manager.linkPool.GetSegmentSums(manager.network.arrays.GetCosts())
+    cost_diffs = np.abs(costs[:, 0] - costs[:, 1])
+    origin_counts = np.fromiter(
+        (len(pas.relevantOrigins) for pas in manager.pasList), np.int64)
+    last_moves = np.fromiter(
+        (pas.lastMove for pas in manager.pasList), np.int64)
+    return np.lexsort((last_moves, origin_counts, cost_diffs))
+
+
+# Order of the pasList indices, PASs first in it are evicted first
+EVICTION_ORDERS = {
+    'lru': recency_order,
+    'least_effective': effectiveness_order,
+}
+
+
+class PasPoolStats(NamedTuple):
+    """ PAS pool state, hits and evictions count from the start """
+    size: int
+    max_size: int  # 0 - unbounded
+    hits: int
+    evictions: int
+    memory: int  # approximate bytes held by the PASs
 
 
 class PasManager():
     """ Pas manager class """
 
-    def __init__(self, net: Network) -> None:
+    def __init__(
+        self,
+        net: Network,
+        max_size: int = MAX_PAS_COUNT,
+        eviction: str = PAS_EVICTION
+    ) -> None:
+        if eviction not in EVICTION_ORDERS:
+            raise ValueError(f"Unknown PAS eviction policy: {eviction}.")
         self.network: Network = net
         self.pasList: List[Pas] = []
+        self.maxSize = max_size
+        self.evictionOrder: Callable[[PasManager], np.ndarray] = (
+            EVICTION_ORDERS[eviction])
+        self.linkPool = PasLinkPool()
+        # Counts flow moves, orders the PASs by recency
+        self.moveClock = 0
+        self.hits = 0
+        self.evictions = 0
+        # PASs by their pair of last links, in pasList order
+        self.pasIndex: DefaultDict[Tuple[int, int], List[Pas]] = (
+            defaultdict(list))
         self.iteration_number: int = 1
         self.mu = MU
         self.v = V
+        # Scratch labels of the PAS search indexed by node index, shared by
+        # all bushes. A node is marked when its label equals the generation
+        # of the current search, so they never need clearing.
+        self.search_generation = 0
+        self.checked_nodes: List[int] = net.CreateNodeLabels(0)
+        self.shortest_path_nodes: List[int] = net.CreateNodeLabels(0)
+        self.checked_links: List[Link | None] = net.CreateNodeLabels(None)
+
+    @staticmethod
+    def GetPasKey(first_link_id: int, second_link_id: int) -> Tuple[int, int]:
+        # Same key whichever segment is cheap, so swapping segments keeps it
+        if first_link_id < second_link_id:
+            return (first_link_id, second_link_id)
+        return (second_link_id, first_link_id)
+
+    def IndexPas(self, pas: Pas) -> None:
+        key = self.GetPasKey(pas.GetLastLinkId(0), pas.GetLastLinkId(1))
+        self.pasIndex[key].append(pas)
+
+    def AddPas(self, pas: Pas) -> None:
+        pas.lastMove = self.moveClock
+        self.pasList.append(pas)
+        self.linkPool.Add(pas)
+        self.IndexPas(pas)
+        if self.maxSize and len(self.pasList) > self.maxSize:
+            self.EvictPas()
 
-    def RecalculatePASCosts(self):
+    def EvictPas(self) -> None:
+        # Drops the lowest ranked PASs, their flow stays in the bushes. The
+        # PAS added last is kept, its creator still uses it.
+        evicted_count = (
+            len(self.pasList) - self.maxSize +
+            int(self.maxSize * EVICTION_BATCH)
+        )
+        order = self.evictionOrder(self)
+        order = order[order != len(self.pasList) - 1]
+        kept = np.ones(len(self.pasList), dtype=bool)
+        kept[order[:evicted_count]] = False
+        self.pasList = [
+            pas for (pas, is_kept) in zip(self.pasList, kept.tolist())
+            if is_kept
+        ]
+        self.RebuildPasIndex()
+        self.evictions += evicted_count
+        if METRICS:
+            metrics.Add(PAS_EVICTED, evicted_count)
+
+    def GetPoolStats(self) -> PasPoolStats:
+        return PasPoolStats(
+            len(self.pasList),
+            self.maxSize,
+            self.hits,
+            self.evictions,
+            sum(pas.GetMemorySize() for pas in self.pasList)
+        )
+
+    def RebuildPasIndex(self) -> None:
+        self.linkPool.Compact(self.pasList)
+        self.pasIndex.clear()
         for pas in self.pasList:
-            pas.RecalculateCosts()
+            self.IndexPas(pas)
 
     def PasExist(self, cheapLink: Link, expLink: Link) -> Pas | None:
-        for pas in self.pasList:
-            if pas.GetLastExpLink() is expLink and pas.GetLastCheapLink() is cheapLink:
+        if cheapLink is None or expLink is None:
+            return None
+        key = self.GetPasKey(cheapLink.id, expLink.id)
+        for pas in self.pasIndex.get(key, ()):
+            # Which segment is cheap depends on the current costs
+            pas.RecalculateCosts()
+            if (
+                pas.GetLastExpLinkId() == expLink.id and
+                pas.GetLastCheapLinkId() == cheapLink.id
+            ):
                 return pas
         return None
 
-    def CreateExpSegment(self, pas: Pas, checked_links: Dict[int, Link | None], diverge_node: int, node_index: int):
+    def CreateExpSegment(
+        self,
+        checked_links: List[Link | None],
+        diverge_node: int,
+        node_index: int
+    ) -> Tuple[List[int], float]:
+        # Link ids from the diverge node to node_index and their cost
+        link_ids = []
+        cost = 0.0
         start = diverge_node
         while start != node_index:
             link = checked_links[start]
-            pas.PushBackToExp(link)
-            pas.expCost += link.cost
+            link_ids.append(link.id)
+            cost += link.cost
             start = link.dest
+        return link_ids, cost
 
-    def CreateCheapSegment(self, pas: Pas, diverge_node: int, node_index: int):
-        link = self.network.nodes[node_index].alpha_min
-        next_dest = link.src
+    def CreateCheapSegment(
+        self,
+        graph: TapasBushGraph,
+        diverge_node: int,
+        node_index: int
+    ) -> Tuple[List[int], float]:
+        # Link ids of the shortest path from the diverge node to node_index
+        # and their cost, summed from node_index back
+        alpha_min = graph.alpha_min
+        link_ids = []
+        cost = 0.0
+        link = alpha_min[node_index]
         while link is not None:
-            pas.PushFrontToCheap(link)
-            next_dest = link.src
-            if next_dest == diverge_node:
-                return
-            link = self.network.nodes[next_dest].alpha_min
-
-    def GetShortestPathNodes(self, graph: TapasBushGraph, node_index: int):
-        shortest_path = {node_index}
-        link = graph.nodes[node_index].alpha_min
-        while link is not None:
-            shortest_path.add(link.src)
-            link = graph.nodes[link.src].alpha_min
+            link_ids.append(link.id)
+            cost += link.cost
+            if link.src == diverge_node:
+                break
+            link = alpha_min[link.src]
+        link_ids.reverse()
+        return link_ids, cost
 
-        return shortest_path
+    def MarkShortestPathNodes(
+        self,
+        graph: TapasBushGraph,
+        node_index: int,
+        generation: int
+    ):
+        alpha_min = graph.alpha_min
+        shortest_path_nodes = self.shortest_path_nodes
+        shortest_path_nodes[node_index] = generation
+        link = alpha_min[node_index]
+        while link is not None:
+            shortest_path_nodes[link.src] = generation
+            link = alpha_min[link.src]
 
-    def CreatePas(self, graph: TapasBushGraph, exp_link: Link, node_index: int, check: bool):
-        queue = [exp_link]
-        checked_nodes = dict.fromkeys(graph.nodes, False)
-        checked_links: Dict[int, Link | None] = dict.fromkeys(graph.nodes, None)
-        can_stop = False
-        shortest_path_nodes = self.GetShortestPathNodes(graph, node_index)
+    def CreatePas(
+        self,
+        graph: TapasBushGraph,
+        exp_link: Link,
+        node_index: int,
+        check: bool
+    ):
+        self.search_generation += 1
+        generation = self.search_generation
+        checked_nodes = self.checked_nodes
+        checked_links = self.checked_links
+        shortest_path_nodes = self.shortest_path_nodes
+        self.MarkShortestPathNodes(graph, node_index, generation)
         incoming_links_dict = graph.GetAllIncomingLinks()
-        thr = self.v * graph.bush_flow[exp_link.index]
-        created = True
+        bush_flow = graph.bush_flow
+        thr = self.v * bush_flow[exp_link.id]
+        queue = deque((exp_link,))
+        diverge_node = None
 
-        while not can_stop:
-            if not queue:
-                created = False
-                break
-            first_in_queue = queue.pop(0)
+        # Breadth first search backwards over the used bush links until the
+        # shortest path to node_index is reached
+        while queue and diverge_node is None:
+            first_in_queue = queue.popleft()
             checked_links[first_in_queue.src] = first_in_queue
+            if METRICS:
+                metrics.Add(PAS_SEARCH_EXPANSIONS)
 
-            if first_in_queue.src in shortest_path_nodes:
+            if shortest_path_nodes[first_in_queue.src] == generation:
                 diverge_node = first_in_queue.src
                 break
 
             for link in incoming_links_dict[first_in_queue.src]:
-                origin_flow = graph.bush_flow[link.index]
-                if not check or (check and origin_flow > thr):
+                origin_flow = bush_flow[link.id]
+                if not check or origin_flow > thr:
                     node_from_index = link.src
-                    if origin_flow > ZERO_FLOW and not checked_nodes[node_from_index]:
+                    if (
+                        origin_flow > ZERO_FLOW and
+                        checked_nodes[node_from_index] != generation
+                    ):
                         queue.append(link)
-                        checked_nodes[node_from_index] = True
+                        checked_nodes[node_from_index] = generation
                         checked_links[node_from_index] = link
 
-                        if node_from_index in shortest_path_nodes:
+                        if shortest_path_nodes[node_from_index] == generation:
                             diverge_node = node_from_index
-                            can_stop = True
                             break
 
             checked_nodes[first_in_queue.src] = 0
 
-        if not created:
+        if diverge_node is None:
             return None
 
-        pas = Pas()
-        self.CreateExpSegment(pas, checked_links, diverge_node, node_index)
-        self.CreateCheapSegment(pas, diverge_node, node_index)
+        (exp_link_ids, exp_cost) = self.CreateExpSegment(
+            checked_links, diverge_node, node_index)
+        (cheap_link_ids, cheap_cost) = self.CreateCheapSegment(
+            graph, diverge_node, node_index)
+        pas = Pas(
+            self.network.arrays,
+            cheap_link_ids, exp_link_ids, cheap_cost, exp_cost)
         if pas.GetCostDiff() < DIR_TOLERANCE:
             del pas
             pas = None
         else:
             pas.AddOrigin(graph)
-            self.pasList.append(pas)
+            self.AddPas(pas)
+            if METRICS:
+                metrics.Add(PAS_CREATED)
 
         return pas
 
-    def CalculateReducedCost(self, exp_link: Link):
-        return self.network.nodes[exp_link.src].pi_min + exp_link.cost - self.network.nodes[exp_link.dest].pi_min
+    def CalculateReducedCost(self, graph: TapasBushGraph, exp_link: Link):
+        pi_min = graph.pi_min
+        return pi_min[exp_link.src] + exp_link.cost - pi_min[exp_link.dest]
 
     def CalcThreshold(self):
         return 10.0 * math.pow(10, -self.iteration_number)
 
-    def CreateNewPAS(self, graph: TapasBushGraph, expLink: Link, mergingNodeIndex: int):
-        found_pas = self.PasExist(
-            self.network.nodes[mergingNodeIndex].alpha_min, expLink)
+    @phase(PAS)
+    def CreateNewPAS(
+        self,
+        graph: TapasBushGraph,
+        expLink: Link,
+        mergingNodeIndex: int
+    ):
+        found_pas = self.PasExist(graph.alpha_min[mergingNodeIndex], expLink)
         is_effective = False
-        reduced_cost = self.CalculateReducedCost(expLink)
-        exp_index = expLink.index
+        reduced_cost = self.CalculateReducedCost(graph, expLink)
+        exp_index = expLink.id
         red_val = self.mu * reduced_cost
         if found_pas is not None:
+            self.hits += 1
+            if METRICS:
+                metrics.Add(PAS_REUSED)
             found_pas.AddOrigin(graph)
             is_effective = found_pas.CheckIfEffective(
                 red_val, self.v, exp_index, graph)
@@ -134,12 +318,99 @@ class PasManager():
         if reduced_cost > self.CalcThreshold() and not is_effective:
             self.CreatePas(graph, expLink, mergingNodeIndex, True)
 
+    @phase(FLOW_SHIFT)
+    def MoveFlow(self) -> None:
+        # Every PAS, shifting only the PASs of the equilibrated origin makes
+        # TAPAS slower to reach a gap even with extra full sweeps
+        self.ShiftFlows()
+
+    def ShiftFlows(self) -> None:
+        # One flow shift of every PAS, rounds of PASs without common links
+        # at once, PASs of the small rounds one by one
+        for pas in self.pasList:
+            pas.flowMovesNumber -= 1
+        (rounds, other_pas_ids) = self.linkPool.GetRounds(SHIFT_ROUND_MIN_SIZE)
+        for (pas_ids, link_ids, bounds) in rounds:
+            self.ShiftRound(pas_ids, link_ids, bounds)
+        for pas_id in other_pas_ids:
+            self.ShiftPas(self.pasList[pas_id])
+
+    def ShiftRound(
+        self,
+        pas_ids: np.ndarray,
+        link_ids: np.ndarray,
+        bounds: np.ndarray
+    ) -> None:
+        """
+        Shifts the flow of PASs that have no common links. Costs, derivatives
+        and Newton shifts are summed over the segments at once and the link
+        flows of all moves are added at once.
+        """
+        arrays = self.network.arrays
+        costs = np.add.reduceat(
+            arrays.GetCosts()[link_ids], bounds).reshape(-1, 2)
+        cost_ders = np.add.reduceat(
+            arrays.GetCostDerivatives()[link_ids], bounds[::2])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            newton_shifts = np.abs(costs[:, 0] - costs[:, 1]) / cost_ders
+
+        shifts = np.zeros(pas_ids.size)
+        for (index, pas_id, segment_costs, newton_shift) in zip(
+            range(pas_ids.size), pas_ids.tolist(), costs.tolist(),
+            newton_shifts.tolist()
+        ):
+            pas = self.pasList[pas_id]
+            pas.SetCosts(*segment_costs)
+            if pas.GetCostDiff() < DIR_TOLERANCE:
+                continue
+            shift = pas.MoveOriginFlow(newton_shift, *pas.GetSegmentLists())
+            if shift:
+                shifts[index] = shift
+                self.RecordMove(pas)
+
+        if not shifts.any():
+            return
+        # Segment 0 and 1 of the PASs alternate in link_ids
+        segment_lengths = np.diff(bounds, append=link_ids.size)
+        in_segment_1 = np.repeat(
+            np.tile((False, True), pas_ids.size), segment_lengths)
+        pas_lengths = segment_lengths[::2] + segment_lengths[1::2]
+        to_cheap = in_segment_1 == np.repeat(
+            costs[:, 0] >= costs[:, 1], pas_lengths)
+        element_shifts = np.repeat(shifts, pas_lengths)
+        moved = element_shifts != 0.0
+        arrays.AddFlows(
+            link_ids[moved],
+            np.where(to_cheap, element_shifts, -element_shifts)[moved])
+        if METRICS:
+            metrics.Add(ADD_FLOW_CALLS, int(moved.sum()))
+
+    def ShiftPas(self, pas: Pas) -> None:
+        pas.RecalculateCosts()
+        if pas.GetCostDiff() < DIR_TOLERANCE:
+            return
+        if not pas.MoveFlow(pas.GetFlowShift()):
+            return
+        if METRICS:
+            metrics.Add(ADD_FLOW_CALLS, pas.linkIds.size)
+        self.RecordMove(pas)
+
+    def RecordMove(self, pas: Pas) -> None:
+        pas.flowMovesNumber += 1
+        self.moveClock += 1
+        pas.lastMove = self.moveClock
+
+    @phase(FLOW_SHIFT)
     def DeleteUnusedPASAndMoveFlow(self) -> None:
         self.iteration_number += 1
         print(self.iteration_number)
 
-        def filter_pas(pas: Pas):
-            pas.MoveFlow()
-            return not pas.IsUnused()
-
-        self.pasList = list(filter(filter_pas, self.pasList))
+        self.ShiftFlows()
+        pas_count = len(self.pasList)
+        self.pasList = [pas for pas in self.pasList if not pas.IsUnused()]
+        self.RebuildPasIndex()
+        if METRICS:
+            metrics.Add(PAS_DELETED, pas_count - len(self.pasList))
+            stats = self.GetPoolStats()
+            metrics.Set(PAS_POOL_SIZE, stats.size)
+            metrics.Set(PAS_POOL_MEMORY, stats.memory)
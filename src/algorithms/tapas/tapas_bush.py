@@ -1,11 +1,15 @@
 """ TAPAS Bush class """
-from typing import List, Set
+from typing import Dict, List, Set
 
 from src.algorithms.tapas.pas_manager import PasManager
 from src.algorithms.tapas.tapas_bush_graph import TapasBushGraph
-from src.shared.consts import ZERO_FLOW
+from src.shared.bush_flow_store import BushFlowStore
+from src.shared.consts import METRICS, ZERO_FLOW
+from src.shared.demand_matrix import DemandMatrix
 from src.shared.link import Link
 from src.shared.network import Network
+from src.utils.metrics import CYCLES_REMOVED, metrics
+from src.utils.phase_profiler import TOPO_SORT, phase
 
 
 class TapasBush():
@@ -15,17 +19,22 @@ class TapasBush():
         self,
         originIndex: int,
         network: Network,
-        demands,
+        demands: DemandMatrix,
         error: float,
-        pasManager: PasManager
+        pasManager: PasManager,
+        bush_flow_store: BushFlowStore
     ):
         self.originIndex = originIndex
-        self.subgraph = TapasBushGraph(network, originIndex, demands)
+        self.subgraph = TapasBushGraph(
+            network, originIndex, demands, bush_flow_store)
         self.error = error
         self.m = len(self.subgraph.nodes) - 1
         self.pasManager = pasManager
         self.topo_order = []
         self.clock = 1
+        # DFS visit times of the bush nodes
+        self.pre: Dict[int, int] = dict()
+        self.post: Dict[int, int] = dict()
 
     def RemoveCyclicFlows(self):
         while True:
@@ -36,35 +45,34 @@ class TapasBush():
         self.subgraph.BuildTrees()
 
     def Equilibrate(self) -> None:
-        self.subgraph.network.BuildMinTree(self.originIndex)
-        self.pasManager.RecalculatePASCosts()
+        self.subgraph.BuildMinTree()
 
         incoming_links_dict = self.subgraph.GetAllIncomingLinks()
-        for node_index, node in self.subgraph.nodes.items():
-            shortest_path_link = node.alpha_min
+        alpha_min = self.subgraph.alpha_min
+        for node_index in self.subgraph.nodes:
+            shortest_path_link = alpha_min[node_index]
             if shortest_path_link is None:
                 continue
             incoming_links = incoming_links_dict[node_index]
             for link in incoming_links:
                 if (
-                    self.subgraph.bush_flow[link.index] <= ZERO_FLOW or
+                    self.subgraph.bush_flow[link.id] <= ZERO_FLOW or
                     link is shortest_path_link
                 ):
                     continue
                 self.pasManager.CreateNewPAS(self.subgraph, link, node_index)
 
-        for pas in self.pasManager.pasList:
-            pas.MoveFlow()
+        self.pasManager.MoveFlow()
 
     # Should have one topo sort
+    @phase(TOPO_SORT)
     def TopologicalSort(self):
         self.clock = 1
         self.topo_order.clear()
         visited = set()
         explored_links = []
-        for node in self.subgraph.nodes.values():
-            node.pre = 0
-            node.post = 0
+        self.pre = dict.fromkeys(self.subgraph.nodes, 0)
+        self.post = dict.fromkeys(self.subgraph.nodes, 0)
 
         for index in self.subgraph.nodes:
             if index not in visited:
@@ -74,7 +82,12 @@ class TapasBush():
 
         return False
 
-    def Explore(self, vertex: int, visited: Set[int], explored_links: List[Link]):
+    def Explore(
+        self,
+        vertex: int,
+        visited: Set[int],
+        explored_links: List[Link]
+    ):
         visited.add(vertex)
         self.PreVisit(vertex)
         links_list = self.subgraph.GetOutcomingLinks(vertex)
@@ -83,19 +96,19 @@ class TapasBush():
         detected = False
         for link in links_list:
             index = link.dest
-            if self.subgraph.bush_flow[link.index] > ZERO_FLOW:
+            if self.subgraph.bush_flow[link.id] > ZERO_FLOW:
                 explored_links.append(link)
-                if self.subgraph.nodes[index].pre == 0:
+                if self.pre[index] == 0:
                     detected = self.Explore(index, visited, explored_links)
                     if detected:
                         return True
-                if self.subgraph.nodes[index].pre > 0 and self.subgraph.nodes[index].post == 0:
+                if self.pre[index] > 0 and self.post[index] == 0:
                     return self.HandleBackEdge(link, explored_links)
         self.PostVisit(vertex)
         return False
 
     def HandleBackEdge(self, link: Link, explored_links: List[Link]):
-        link_index = link.index
+        link_index = link.id
         next_node = link.src
         term_node = link.dest
         next_link = None
@@ -104,7 +117,7 @@ class TapasBush():
         min_flow = self.subgraph.bush_flow[link_index]
         for next_link in explored_links:
             if next_link.dest == next_node:
-                flow = self.subgraph.bush_flow[next_link.index]
+                flow = self.subgraph.bush_flow[next_link.id]
                 cycle.append(next_link)
                 if flow < min_flow:
                     min_flow = flow
@@ -114,17 +127,20 @@ class TapasBush():
 
         link_tmp = None
         link_tmp_index = -1
-        for link_tmp in cycle:
-            link_tmp_index = link_tmp.index
-            self.subgraph.AddFlowToBushFlow(link_tmp_index, -min_flow)
-            link_tmp.AddFlow(-min_flow)
+        with self.subgraph.network.arrays.DeferredCosts():
+            for link_tmp in cycle:
+                link_tmp_index = link_tmp.id
+                self.subgraph.AddFlowToBushFlow(link_tmp_index, -min_flow)
+                link_tmp.AddFlow(-min_flow)
+        if METRICS:
+            metrics.Add(CYCLES_REMOVED)
         return True
 
     def PreVisit(self, vertex: int):
-        self.subgraph.nodes[vertex].pre = self.clock
+        self.pre[vertex] = self.clock
         self.clock += 1
 
     def PostVisit(self, vertex: int):
-        self.subgraph.nodes[vertex].post = self.clock
+        self.post[vertex] = self.clock
         self.clock += 1
         self.topo_order.insert(0, vertex)
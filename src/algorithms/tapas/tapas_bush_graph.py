@@ -1,17 +1,29 @@
 """ TAPAS Bush graph class """
+from src.shared.bush_flow_store import BushFlowStore
 from src.shared.bush_graph import BushGraph
-from src.shared.link import Link
+from src.shared.demand_matrix import DemandMatrix
 from src.shared.network import Network
 
 
 class TapasBushGraph(BushGraph):
     """ Bush graph for the TAPAS algorithm """
 
-    def __init__(self, network: Network, originIndex: int, demands) -> None:
-        super().__init__(network, originIndex, demands)
+    def __init__(
+        self,
+        network: Network,
+        originIndex: int,
+        demands: DemandMatrix,
+        bush_flow_store: BushFlowStore
+    ) -> None:
+        super().__init__(network, originIndex, demands, bush_flow_store)
         self.min_shift = 0.0
 
-    def AddOriginFlowAndCreateLink(self, link: Link, delta_x: float):
-        if link.index not in self.links:
-            self.links[link.index] = link
-        self.AddFlowToBushFlow(link.index, delta_x)
+    def BuildMinTree(self) -> None:
+        # Min labels of TAPAS come from the shortest path tree of the network
+        (self.pi_min, self.alpha_min) = self.network.BuildMinTree(
+            self.originIndex)
+
+    def AddOriginFlowAndCreateLink(self, link_id: int, delta_x: float):
+        if link_id not in self.links:
+            self.AddLink(self.network.links[link_id])
+        self.AddFlowToBushFlow(link_id, delta_x)
@@ -0,0 +1,143 @@
+"""
+Dataset cache
+
+The TNTP files of a city are compiled once into raw .npy arrays stored in
+the `.cache` folder next to the data files. Later runs memory-map the arrays
+without parsing or importing pandas. The cache is rebuilt whenever the
+modification time or size of any source file changes.
+"""
+import json
+import os
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from src.data.generator import ensure_dataset
+from src.shared.consts import DATA_CACHE
+from src.shared.demand_matrix import DemandMatrix
+
+CACHE_DIR = '.cache'
+CACHE_VERSION = 1
+META_FILE = 'meta.json'
+SOURCE_SUFFIXES = ('net', 'node', 'trips', 'flow')
+OPTIONAL_SUFFIXES = ('flow',)
+ARRAY_NAMES = (
+    'nodes', 'links', 'solution',
+    'demand_offsets', 'demand_destinations', 'demand_values',
+)
+
+CityArrays = Tuple[DemandMatrix, np.ndarray, np.ndarray, np.ndarray]
+
+
+def get_city_dir(city_name: str) -> str:
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)), city_name)
+
+
+def get_sources_stamp(city_name: str) -> Dict[str, List[int] | None]:
+    # Modification time and size of every source file, None for a missing
+    # optional one
+    city_dir = get_city_dir(city_name)
+    stamp: Dict[str, List[int] | None] = {}
+    for suffix in SOURCE_SUFFIXES:
+        file_name = os.path.join(city_dir, f'{city_name}_{suffix}.tntp')
+        if suffix in OPTIONAL_SUFFIXES and not os.path.isfile(file_name):
+            stamp[suffix] = None
+            continue
+        file_stat = os.stat(file_name)
+        stamp[suffix] = [file_stat.st_mtime_ns, file_stat.st_size]
+    return stamp
+
+
+def compile_city(city_name: str) -> CityArrays:
+    # pandas is needed only to compile the cache
+    # pylint: disable=import-outside-toplevel
+    import src.data.data as data
+
+    (demands, nodes, network, solution) = data.import_data_for_city(city_name)
+    return (
+        demands,
+        nodes.values.astype(np.float64),
+        network.values.astype(np.float64),
+        solution.values.astype(np.float64),
+    )
+
+
+def read_cache(
+    cache_dir: str,
+    stamp: Dict[str, List[int] | None]
+) -> CityArrays | None:
+    try:
+        meta_file = os.path.join(cache_dir, META_FILE)
+        with open(meta_file, 'r', encoding='utf-8') as file:
+            meta = json.load(file)
+        if meta.get('version') != CACHE_VERSION or meta.get('sources') != stamp:
+            return None
+        arrays = {
+            name: np.load(os.path.join(cache_dir, f'{name}.npy'), mmap_mode='r')
+            for name in ARRAY_NAMES
+        }
+    except (OSError, ValueError):
+        return None
+    demands = DemandMatrix(
+        meta['zones'],
+        arrays['demand_offsets'],
+        arrays['demand_destinations'],
+        arrays['demand_values']
+    )
+    return (demands, arrays['nodes'], arrays['links'], arrays['solution'])
+
+
+def write_cache(
+    cache_dir: str,
+    stamp: Dict[str, List[int] | None],
+    city: CityArrays
+) -> None:
+    (demands, nodes, links, solution) = city
+    arrays = {
+        'nodes': nodes,
+        'links': links,
+        'solution': solution,
+        'demand_offsets': demands.offsets,
+        'demand_destinations': demands.destinations,
+        'demand_values': demands.values,
+    }
+    meta_file = os.path.join(cache_dir, META_FILE)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Without the meta file a half written cache is never read
+        if os.path.exists(meta_file):
+            os.remove(meta_file)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(cache_dir, f'{name}.npy'), arrays[name])
+        with open(meta_file, 'w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    'version': CACHE_VERSION,
+                    'sources': stamp,
+                    'zones': demands.zones,
+                },
+                file
+            )
+    except OSError:
+        # A read-only data folder only means the next run compiles again
+        pass
+
+
+def load_data_for_city(
+    city_name: str,
+    use_cache: bool = DATA_CACHE
+) -> CityArrays:
+    """
+    Returns (demands, nodes, links, solution) of the city, the last three as
+    float64 arrays with the columns of the TNTP files.
+    """
+    ensure_dataset(city_name)
+    if not use_cache:
+        return compile_city(city_name)
+    stamp = get_sources_stamp(city_name)
+    cache_dir = os.path.join(get_city_dir(city_name), CACHE_DIR)
+    city = read_cache(cache_dir, stamp)
+    if city is None:
+        city = compile_city(city_name)
+        write_cache(cache_dir, stamp, city)
+    return city
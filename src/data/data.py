@@ -1,12 +1,24 @@
 """Data"""
 
 import os
-from ast import literal_eval
+import re
+from io import TextIOBase
+from typing import Dict, Iterator, List, Tuple
 
 import numpy as np
 import pandas as pd
 
+from src.data.generator import ensure_dataset
+from src.shared.demand_matrix import DemandMatrix
+
 PYCACHE = '__pycache__'
+SOLUTION_COLUMNS = ['from', 'to', 'volume', 'cost']
+
+TRIPS_CHUNK_SIZE = 1 << 20
+METADATA_PATTERN = re.compile(r'<([^>]+)>(.*)')
+COMMENT_PATTERN = re.compile(r'~[^\n]*')
+# "dest : value;" pairs become plain whitespace separated numbers
+TRIPS_SEPARATORS = str.maketrans(':;', '  ')
 
 COL_DEF: dict[str, int] = {
     "init_node": 0,
@@ -53,7 +65,8 @@ def get_network_for_city(city_name: str) -> pd.DataFrame:
     net = pd.read_csv(netfile, skiprows=8, sep='\t')
     trimmed = [s.strip().lower() for s in net.columns]
     net.columns = trimmed
-    # This is an unresolved issue with pandas: https://github.com/PyCQA/pylint/issues/4577
+    # This is an unresolved issue with pandas:
+    # https://github.com/PyCQA/pylint/issues/4577
     # pylint: disable=no-member
     net.drop(['~', ';'], axis=1, inplace=True)
 
@@ -72,45 +85,118 @@ def get_nodes_for_city(city_name: str) -> pd.DataFrame:
     return nodes
 
 
-def import_matrix(city_name: str):
+def read_metadata(file: TextIOBase) -> Tuple[Dict[str, str], str]:
+    """
+    Reads "<NAME> value" lines up to and including <END OF METADATA>. Stops
+    early at the first line that is neither metadata nor a comment and
+    returns it with the metadata, so the caller can parse it as data.
+    """
+    metadata = {}
+    for line in file:
+        stripped = line.strip()
+        if not stripped or stripped.startswith('~'):
+            continue
+        match = METADATA_PATTERN.match(stripped)
+        if match is None:
+            return (metadata, line)
+        if match.group(1) == 'END OF METADATA':
+            break
+        metadata[match.group(1)] = match.group(2).strip()
+    return (metadata, '')
+
+
+def read_origin_blocks(
+    file: TextIOBase,
+    chunk_size: int = TRIPS_CHUNK_SIZE,
+    first_line: str = ''
+) -> Iterator[str]:
+    """
+    Streams the trip table in chunks and yields the text of every origin
+    block (origin number followed by its "dest : value;" pairs). The table
+    starts with first_line, when it was already read from the file.
+    """
+    buffer = first_line
+    preamble = True
+    while True:
+        chunk = file.read(chunk_size)
+        buffer += chunk
+        blocks = buffer.split('Origin')
+        # The last block may continue in the next chunk
+        if chunk:
+            buffer = blocks.pop()
+        if preamble and blocks:
+            # Text before the first origin holds only comments
+            blocks.pop(0)
+            preamble = False
+        yield from blocks
+        if not chunk:
+            return
+
+
+def parse_origin_block(block: str) -> Tuple[int, np.ndarray, np.ndarray]:
+    if '~' in block:
+        block = COMMENT_PATTERN.sub('', block)
+    (origin, _, pairs) = block.partition('\n')
+    if not pairs.strip():
+        return (int(origin), np.empty(0, dtype=np.int64), np.empty(0))
+    values = np.fromstring(pairs.translate(TRIPS_SEPARATORS), sep=' ')
+    if values.size % 2:
+        raise ValueError(f"Malformed trips of origin {origin.strip()}.")
+    values = values.reshape((-1, 2))
+    return (int(origin), values[:, 0].astype(np.int64), values[:, 1])
+
+
+def read_matrix(file: TextIOBase) -> DemandMatrix:
+    """
+    Reads the sparse demand matrix of a TNTP trips file. The number of zones
+    comes from <NUMBER OF ZONES>, without it from the largest origin.
+    """
+    (metadata, first_line) = read_metadata(file)
+    zones_value = metadata.get('NUMBER OF ZONES')
+    zones = int(zones_value) if zones_value else 0
+    rows: List[Tuple[int, np.ndarray, np.ndarray]] = []
+    for block in read_origin_blocks(file, first_line=first_line):
+        (origin, destinations, demands) = parse_origin_block(block)
+        if zones and (not 1 <= origin <= zones or destinations.size and (
+            destinations.max() > zones or destinations.min() < 1
+        )):
+            raise ValueError(
+                f"Trips of origin {origin} refer to zones outside 1-{zones}.")
+        # Zero demands are dropped right away, memory grows with OD pairs only
+        rows.append((origin, *DemandMatrix.CompactRow(destinations, demands)))
+
+    if not zones and rows:
+        # Without metadata destinations above the largest origin are dropped
+        zones = max(origin for (origin, _, _) in rows)
+        for (position, (origin, destinations, demands)) in enumerate(rows):
+            inside = (destinations >= 1) & (destinations <= zones)
+            rows[position] = (origin, destinations[inside], demands[inside])
+    return DemandMatrix.FromRows(zones, rows)
+
+
+def import_matrix(city_name: str) -> DemandMatrix:
     root = get_root()
     tripsfile = os.path.join(root, city_name, f'{city_name}_trips.tntp')
     with open(tripsfile, 'r', encoding='utf-8') as file:
-        all_rows = file.read()
-        blocks = all_rows.split('Origin')[1:]
-        matrix = {}
-        for index, _ in enumerate(blocks):
-            orig = blocks[index].split('\n')
-            dests = orig[1:]
-            orig = int(orig[0])
-
-            destination_array = [literal_eval('{'+a.replace(';', ',').replace(' ', '') + '}')
-                                 for a in dests]
-            destinations = {}
-            for i in destination_array:
-                destinations = {**destinations, **i}
-            matrix[orig] = destinations
-        zones = max(matrix.keys())
-        mat = np.zeros((zones, zones))
-        for i in range(zones):
-            for j in range(zones):
-                # We map values to a index i-1, as Numpy is base 0
-                mat[i, j] = matrix.get(i+1, {}).get(j+1, 0)
-
-        index = np.arange(zones) + 1
-        return mat
+        return read_matrix(file)
 
 
 def get_solution_for_city(city_name: str):
     root = get_root()
     solutionfile = os.path.join(root, city_name, f'{city_name}_flow.tntp')
-    solution = pd.read_csv(solutionfile, skiprows=0, delimiter=r"\s+")
+    if not os.path.isfile(solutionfile):
+        # Generated datasets may come without a reference flow
+        return pd.DataFrame(columns=SOLUTION_COLUMNS, dtype=float)
+    # Generated reference flows start with a ~ line stating their gap
+    solution = pd.read_csv(
+        solutionfile, skiprows=0, delimiter=r"\s+", comment='~')
     trimmed = [s.strip().lower() for s in solution.columns]
     solution.columns = trimmed
     return solution
 
 
 def import_data_for_city(city_name):
+    ensure_dataset(city_name)
     demands = import_matrix(city_name)
     nodes = get_nodes_for_city(city_name)
     network = get_network_for_city(city_name)
@@ -0,0 +1,309 @@
+"""
+Synthetic dataset generator
+
+Writes TNTP datasets (net, node, trips and optionally a reference flow) of
+parametrised grid and random planar networks into `src/data/<name>`, so they
+load like the bundled ones. Grids connect every node to its neighbours in
+both directions. Planar networks jitter the grid nodes and add a diagonal in
+a random direction to random cells until the link count is reached, at most
+one per cell so the network stays planar. Zones are a seeded sample of the
+nodes numbered 1..zones and every zone pair gets demand with the given
+density. The reference flow is written only when Algorithm B reaches the
+given relative gap, the gap and iteration count go to its `~` header line.
+
+Datasets of SYNTHETIC_DATASETS are generated on first use.
+
+Usage: python -m src.data.generator <name> [--kind grid|planar] [--rows 50]
+       [--cols 50] [--links 0] [--zones 100] [--density 0.2] [--demand 50]
+       [--seed 0] [--flow-gap 0] [--flow-max-iterations 1000]
+"""
+import argparse
+import os
+from typing import List, Literal, NamedTuple, Tuple
+
+import numpy as np
+
+LINK_B = 0.15
+LINK_POWER = 4
+CAPACITY_RANGE = (500.0, 2500.0)
+NODE_JITTER = 0.3
+FLOW_MAX_ITERATIONS = 1000
+
+
+class SyntheticSpec(NamedTuple):
+    """ Parameters of a generated dataset """
+    kind: Literal['grid', 'planar']
+    rows: int
+    cols: int
+    zones: int
+    density: float  # share of the OD pairs with demand
+    demand: float  # mean demand of an OD pair
+    links: int = 0  # planar only, grid links plus diagonals up to this count
+    seed: int = 0
+
+
+SYNTHETIC_DATASETS = {
+    'SyntheticGrid1k': SyntheticSpec('grid', 16, 16, 64, 0.5, 50.0),
+    'SyntheticGrid10k': SyntheticSpec('grid', 50, 50, 250, 0.2, 50.0),
+    'SyntheticGrid100k': SyntheticSpec('grid', 159, 159, 1000, 0.05, 50.0),
+    'SyntheticPlanar10k': SyntheticSpec(
+        'planar', 45, 45, 250, 0.2, 50.0, 10000),
+    'SyntheticPlanar100k': SyntheticSpec(
+        'planar', 130, 130, 1000, 0.05, 50.0, 100000),
+}
+
+# (x, y) of the nodes, (src, dest, capacity, length) of the links
+Network = Tuple[np.ndarray, np.ndarray]
+
+
+def get_dataset_dir(name: str) -> str:
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)), name)
+
+
+def grid_edges(rows: int, cols: int) -> np.ndarray:
+    # Undirected edges between neighbouring nodes, node r, c is r * cols + c
+    nodes = np.arange(rows * cols).reshape((rows, cols))
+    horizontal = np.column_stack((nodes[:, :-1].ravel(), nodes[:, 1:].ravel()))
+    vertical = np.column_stack((nodes[:-1, :].ravel(), nodes[1:, :].ravel()))
+    return np.concatenate((horizontal, vertical))
+
+
+def diagonal_edges(
+    rows: int,
+    cols: int,
+    count: int,
+    rng: np.random.Generator
+) -> np.ndarray:
+    # One diagonal in a random direction for count random cells
+    nodes = np.arange(rows * cols).reshape((rows, cols))
+    cells = rng.choice((rows - 1) * (cols - 1), size=count, replace=False)
+    (row, col) = np.divmod(cells, cols - 1)
+    falling = rng.random(count) < 0.5
+    src = nodes[row, col + np.where(falling, 0, 1)]
+    dest = nodes[row + 1, col + np.where(falling, 1, 0)]
+    return np.column_stack((src, dest))
+
+
+def create_network(spec: SyntheticSpec, rng: np.random.Generator) -> Network:
+    (row, col) = np.divmod(np.arange(spec.rows * spec.cols), spec.cols)
+    coordinates = np.column_stack((col, row)).astype(np.float64)
+    edges = grid_edges(spec.rows, spec.cols)
+    if spec.kind == 'planar':
+        coordinates += rng.uniform(
+            -NODE_JITTER, NODE_JITTER, coordinates.shape)
+        cells = (spec.rows - 1) * (spec.cols - 1)
+        diagonals = min(max(spec.links - 2 * len(edges), 0) // 2, cells)
+        edges = np.concatenate((
+            edges, diagonal_edges(spec.rows, spec.cols, diagonals, rng)))
+    elif spec.kind != 'grid':
+        raise ValueError(f"Unknown network kind: {spec.kind}.")
+
+    # Both directions of every edge share capacity and length
+    capacity = rng.uniform(*CAPACITY_RANGE, len(edges))
+    length = np.linalg.norm(
+        coordinates[edges[:, 0]] - coordinates[edges[:, 1]], axis=1)
+    links = np.concatenate((
+        np.column_stack((edges[:, 0], edges[:, 1], capacity, length)),
+        np.column_stack((edges[:, 1], edges[:, 0], capacity, length)),
+    ))
+    return (coordinates, links)
+
+
+def number_nodes(
+    node_count: int,
+    zones: int,
+    rng: np.random.Generator
+) -> np.ndarray:
+    # TNTP number of every node, zones are a random sample numbered first
+    if not 1 <= zones <= node_count:
+        raise ValueError(f"Zones must be between 1 and {node_count}.")
+    is_zone = np.zeros(node_count, dtype=bool)
+    is_zone[rng.choice(node_count, size=zones, replace=False)] = True
+    order = np.concatenate((np.flatnonzero(is_zone), np.flatnonzero(~is_zone)))
+    numbers = np.empty(node_count, dtype=np.int64)
+    numbers[order] = np.arange(1, node_count + 1)
+    return numbers
+
+
+def create_demands(
+    zones: int,
+    density: float,
+    demand: float,
+    rng: np.random.Generator
+) -> List[Tuple[int, np.ndarray, np.ndarray]]:
+    rows = []
+    for origin in range(1, zones + 1):
+        count = rng.binomial(zones - 1, density)
+        destinations = rng.choice(zones - 1, size=count, replace=False) + 1
+        destinations[destinations >= origin] += 1
+        destinations.sort()
+        demands = np.round(rng.uniform(0.0, 2.0 * demand, count), 1)
+        rows.append((origin, destinations, demands))
+    return rows
+
+
+def write_net(
+    file_name: str,
+    zones: int,
+    node_count: int,
+    links: np.ndarray
+) -> None:
+    columns = (
+        "init_node\tterm_node\tcapacity\tlength\tfree_flow_time\tb\tpower"
+        "\tspeed\ttoll\tlink_type"
+    )
+    with open(file_name, 'w', encoding='utf-8') as file:
+        file.write(
+            f"<NUMBER OF ZONES> {zones}\n"
+            f"<NUMBER OF NODES> {node_count}\n"
+            f"<FIRST THRU NODE> 1\n"
+            f"<NUMBER OF LINKS> {len(links)}\n"
+            f"<ORIGINAL HEADER>~ \t{columns}\t;\n"
+            "<END OF METADATA>\n\n\n"
+            f"~\t{columns}\t;\n"
+        )
+        # Free flow time is the length at unit speed
+        file.writelines(
+            f"\t{int(src)}\t{int(dest)}\t{capacity:.6f}"
+            f"\t{length:.6f}\t{length:.6f}"
+            f"\t{LINK_B}\t{LINK_POWER}\t0\t0\t1\t;\n"
+            for (src, dest, capacity, length) in links.tolist()
+        )
+
+
+def write_nodes(file_name: str, coordinates: np.ndarray) -> None:
+    with open(file_name, 'w', encoding='utf-8') as file:
+        file.write("Node\tX\tY\t;\n")
+        file.writelines(
+            f"{number}\t{x:.6f}\t{y:.6f}\t;\n"
+            for (number, (x, y)) in enumerate(coordinates.tolist(), start=1)
+        )
+
+
+def write_trips(
+    file_name: str,
+    zones: int,
+    rows: List[Tuple[int, np.ndarray, np.ndarray]]
+) -> None:
+    total = sum(float(demands.sum()) for (_origin, _dests, demands) in rows)
+    with open(file_name, 'w', encoding='utf-8') as file:
+        file.write(
+            f"<NUMBER OF ZONES> {zones}\n"
+            f"<TOTAL OD FLOW> {total:.1f}\n"
+            "<END OF METADATA>\n\n\n"
+        )
+        for (origin, destinations, demands) in rows:
+            file.write(f"Origin \t{origin}\n")
+            pairs = [
+                f"{destination:5d} : {demand:8.1f};"
+                for (destination, demand)
+                in zip(destinations.tolist(), demands.tolist())
+            ]
+            for start in range(0, len(pairs), 5):
+                file.write(f"{' '.join(pairs[start:start + 5])}\n")
+            file.write("\n")
+
+
+def write_flow(name: str, gap: float, max_iterations: int) -> None:
+    # Reference flow of Algorithm B at the given relative gap
+    # pylint: disable=import-outside-toplevel
+    from src.algorithms.b.algorithm_b import AlgorithmB
+    from src.data.cache import compile_city
+
+    (demands, nodes, links, _solution) = compile_city(name)
+    algorithm = AlgorithmB(nodes, links, demands, 0.0)
+    try:
+        iterations = 0
+        rel_gap = algorithm.GetGaps().rel_gap
+        while rel_gap > gap and iterations < max_iterations:
+            algorithm.Iteration()
+            iterations += 1
+            rel_gap = algorithm.GetGaps().rel_gap
+    finally:
+        algorithm.Close()
+    if rel_gap > gap:
+        raise ValueError(
+            f"Algorithm B reached relative gap {rel_gap:.3g} after "
+            f"{iterations} iterations, not {gap:.3g}. "
+            "No reference flow written.")
+
+    file_name = os.path.join(get_dataset_dir(name), f'{name}_flow.tntp')
+    with open(file_name, 'w', encoding='utf-8') as file:
+        file.write(
+            f"~ Algorithm B, relative gap {rel_gap:.3g} "
+            f"after {iterations} iterations\n"
+            "From \tTo \tVolume \tCost\n"
+        )
+        file.writelines(
+            f"{link.src} \t{link.dest} \t{link.flow} \t{link.cost}\n"
+            for link in algorithm.network.links.values()
+        )
+
+
+def generate_dataset(
+    name: str,
+    spec: SyntheticSpec,
+    flow_gap: float = 0.0,
+    flow_max_iterations: int = FLOW_MAX_ITERATIONS
+) -> None:
+    rng = np.random.default_rng(spec.seed)
+    (coordinates, links) = create_network(spec, rng)
+    node_count = len(coordinates)
+    numbers = number_nodes(node_count, spec.zones, rng)
+    links[:, :2] = numbers[links[:, :2].astype(np.int64)]
+    links = links[np.lexsort((links[:, 1], links[:, 0]))]
+    ordered_coordinates = np.empty_like(coordinates)
+    ordered_coordinates[numbers - 1] = coordinates
+    rows = create_demands(spec.zones, spec.density, spec.demand, rng)
+
+    dataset_dir = get_dataset_dir(name)
+    os.makedirs(dataset_dir, exist_ok=True)
+    file_prefix = os.path.join(dataset_dir, name)
+    write_net(f'{file_prefix}_net.tntp', spec.zones, node_count, links)
+    write_nodes(f'{file_prefix}_node.tntp', ordered_coordinates)
+    write_trips(f'{file_prefix}_trips.tntp', spec.zones, rows)
+    if os.path.isfile(f'{file_prefix}_flow.tntp'):
+        # The flow of an earlier dataset of the same name no longer matches
+        os.remove(f'{file_prefix}_flow.tntp')
+    if flow_gap > 0:
+        write_flow(name, flow_gap, flow_max_iterations)
+
+
+def ensure_dataset(name: str) -> None:
+    # Generates a registered synthetic dataset the first time it is used
+    spec = SYNTHETIC_DATASETS.get(name)
+    if spec is not None and not os.path.isfile(
+        os.path.join(get_dataset_dir(name), f'{name}_net.tntp')
+    ):
+        print(f"Generating {name}...")
+        generate_dataset(name, spec)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.split('\n\n', maxsplit=1)[0])
+    parser.add_argument('name')
+    parser.add_argument('--kind', choices=('grid', 'planar'), default='grid')
+    parser.add_argument('--rows', type=int, default=50)
+    parser.add_argument('--cols', type=int, default=50)
+    parser.add_argument('--links', type=int, default=0)
+    parser.add_argument('--zones', type=int, default=100)
+    parser.add_argument('--density', type=float, default=0.2)
+    parser.add_argument('--demand', type=float, default=50.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--flow-gap', type=float, default=0.0)
+    parser.add_argument(
+        '--flow-max-iterations', type=int, default=FLOW_MAX_ITERATIONS)
+    args = parser.parse_args()
+
+    spec = SYNTHETIC_DATASETS.get(args.name) or SyntheticSpec(
+        args.kind, args.rows, args.cols, args.zones, args.density,
+        args.demand, args.links, args.seed
+    )
+    generate_dataset(
+        args.name, spec, args.flow_gap, args.flow_max_iterations)
+    print(f"{args.name} written to {get_dataset_dir(args.name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,17 @@
 """ Testing funtion """
 import os
+from contextlib import nullcontext
 
-import src.data.data as data
 from results.root import ROOT_DIR
 from src.algorithms.algorithm import Algorithm
 from src.algorithms.b.algorithm_b import AlgorithmB
 from src.algorithms.calculate_equilibrium import CalculateEquilibrium
 from src.algorithms.oba.oba import OBA
 from src.algorithms.tapas.tapas import TAPAS
+from src.data.cache import load_data_for_city
+from src.shared.consts import METRICS, PROFILE, PROFILE_PHASES, PROFILE_TOP
 from src.utils.logger import Logger
+from src.utils.profile_capture import ProfileCapture
 
 DATA_LIST = {
     1: 'FourNodes',
@@ -19,6 +22,11 @@ DATA_LIST = {
     6: 'SiouxFalls2',
     7: 'SiouxFalls21',
     8: 'SiouxFalls3',
+    9: 'SyntheticGrid1k',
+    10: 'SyntheticGrid10k',
+    11: 'SyntheticGrid100k',
+    12: 'SyntheticPlanar10k',
+    13: 'SyntheticPlanar100k',
 }
 ALGORITHMS = {
     1: AlgorithmB,
@@ -34,12 +42,18 @@ def run_test(
     max_iteration_count: int,
     compare_solution: bool = False
 ):
+    profile = ProfileCapture(PROFILE_TOP) if PROFILE else None
+    if profile is not None and PROFILE == 'all':
+        profile.Start()
     try:
         current_city = DATA_LIST[city_index]
         print(current_city)
         print(f"Importing {current_city} data...")
-        (demands, nodes, network, solution) = data.import_data_for_city(current_city)
-        print("Data imported.")
+        (demands, nodes, network, solution) = load_data_for_city(current_city)
+        print(
+            f"Data imported. {demands.values.size} OD pairs, "
+            f"demands {demands.MemoryUsage() / 1024:.1f} KiB"
+        )
     except (IndexError, ValueError):
         print("Error during data importing...")
         return
@@ -47,8 +61,8 @@ def run_test(
     print("Creating algorithm and data structures...")
     try:
         algorithm: Algorithm = ALGORITHMS[algorithmIndex](
-            nodes.values.tolist(),
-            network.values.tolist(),
+            nodes,
+            network,
             demands,
             max_error
         )
@@ -56,19 +70,52 @@ def run_test(
         print(f"Error during algorithm initialisation...\n{error}\n")
         return
     print("Created algorithm.")
+    bush_flow_store = getattr(algorithm, 'bush_flow_store', None)
+    if bush_flow_store is not None:
+        print(
+            f"Bush flows ({bush_flow_store.mode}): "
+            f"{bush_flow_store.MemoryUsage() / 1024:.1f} KiB"
+        )
     print(f"Test started for {current_city}...")
     file_name = f"results-{algorithm.__class__.__name__}-{current_city}.csv"
     full_result_file_name = os.path.join(ROOT_DIR, file_name)
-    with open(full_result_file_name, 'w+', encoding="utf-8") as file:
-        network = CalculateEquilibrium(
-            algorithm,
-            max_error,
-            max_iteration_count
-        ).Run(file)
+    phases_file_name = full_result_file_name.replace('.csv', '-phases.csv')
+    metrics_file_name = full_result_file_name.replace(
+        '.csv', f'-metrics.{METRICS}')
+    phases = nullcontext()
+    if PROFILE_PHASES:
+        phases = open(phases_file_name, 'w+', encoding="utf-8")
+    counters = nullcontext()
+    if METRICS:
+        counters = open(metrics_file_name, 'w+', encoding="utf-8")
+    try:
+        with (
+            open(full_result_file_name, 'w+', encoding="utf-8") as file,
+            phases as phases_file,
+            counters as metrics_file
+        ):
+            network = CalculateEquilibrium(
+                algorithm,
+                max_error,
+                max_iteration_count
+            ).Run(file, phases_file, metrics_file, profile)
 
-        if compare_solution:
-            Logger.TestSolution(solution, network)
+            if compare_solution:
+                Logger.TestSolution(solution, network)
+    finally:
+        algorithm.Close()
 
     print(f"The results are available at: {full_result_file_name}")
+    if PROFILE_PHASES:
+        print(f"Phase times are available at: {phases_file_name}")
+    if METRICS:
+        print(f"Operation counters are available at: {metrics_file_name}")
+    if profile is not None:
+        (profile_file_name, summary_file_name) = profile.Write(
+            f"profile-{algorithm.__class__.__name__}-{current_city}")
+        print(
+            f"Profile is available at: {profile_file_name}, "
+            f"summary: {summary_file_name}"
+        )
 
     return
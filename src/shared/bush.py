@@ -2,17 +2,28 @@
 import math
 from typing import List
 
+from src.shared.bush_flow_store import BushFlowStore
 from src.shared.bush_graph import BushGraph
 from src.shared.consts import DIR_TOLERANCE, MULTI_STEP, ZERO_FLOW
+from src.shared.demand_matrix import DemandMatrix
 from src.shared.network import Network
+from src.utils.phase_profiler import FLOW_SHIFT, phase
 
 
 class Bush:
     """ Bush Class """
 
-    def __init__(self, originIndex: int, network: Network, demands, error: float) -> None:
+    def __init__(
+        self,
+        originIndex: int,
+        network: Network,
+        demands: DemandMatrix,
+        error: float,
+        bush_flow_store: BushFlowStore
+    ) -> None:
         self.originIndex = originIndex
-        self.subgraph = BushGraph(network, originIndex, demands)
+        self.subgraph = BushGraph(
+            network, originIndex, demands, bush_flow_store)
         self.error = error
         self.m = len(self.subgraph.nodes) - 1
         self.topoSortUpToDate = True
@@ -37,6 +48,7 @@ class Bush:
             self.UpdateTopoSort()
             self.BuildTrees()
 
+    @phase(FLOW_SHIFT)
     def Equilibrate(self) -> None:
         for node_index in reversed(self.subgraph.nodesOrder):
             self.EqualizeCost(node_index)
@@ -45,17 +57,17 @@ class Bush:
         self,
         j: int,
     ) -> None:
-        node = self.subgraph.nodes[j]
+        subgraph = self.subgraph
+        alpha_min = subgraph.alpha_min
+        alpha_max = subgraph.alpha_max
+        min_link = alpha_min[j]
+        max_link = alpha_max[j]
         if (
-            node.alpha_max is None or
-            node.alpha_min is None or
-            node.pi_max - node.pi_min <= DIR_TOLERANCE
+            max_link is None or
+            min_link is None or
+            subgraph.pi_max[j] - subgraph.pi_min[j] <= DIR_TOLERANCE
         ):
             return
-        min_link = node.alpha_min
-        max_link = node.alpha_max
-        if min_link is None or max_link is None:
-            return
         min_path: List[int] = []
         max_path: List[int] = []
         min_dist = 0
@@ -63,30 +75,31 @@ class Bush:
         min_node = min_link.src
         max_node = max_link.src
         if min_node != max_node:
-            min_path.append(min_link.index)
+            min_path.append(min_link.id)
             min_dist += min_link.cost
-            max_path.append(max_link.index)
+            max_path.append(max_link.id)
             max_dist += max_link.cost
-        elif min_link.index != max_link.index:
-            min_path.append(min_link)
+        elif min_link.id != max_link.id:
+            min_path.append(min_link.id)
             min_dist += min_link.cost
-            max_path.append(max_link.index)
+            max_path.append(max_link.id)
             max_dist += max_link.cost
 
+        nodes_rank = self.subgraph.nodesRank
         while True:
             if min_node == max_node:
                 break
-            if self.subgraph.nodesOrder.index(min_node) > self.subgraph.nodesOrder.index(max_node):
-                min_link = self.subgraph.nodes[min_node].alpha_min
+            if nodes_rank[min_node] > nodes_rank[max_node]:
+                min_link = alpha_min[min_node]
                 if min_link is not None:
                     min_node = min_link.src
-                    min_path.append(min_link.index)
+                    min_path.append(min_link.id)
                     min_dist += min_link.cost
             else:
-                max_link = self.subgraph.nodes[max_node].alpha_max
+                max_link = alpha_max[max_node]
                 if max_link is not None:
                     max_node = max_link.src
-                    max_path.append(max_link.index)
+                    max_path.append(max_link.id)
                     max_dist += max_link.cost
 
         if not min_path or not max_path or max_dist - min_dist <= DIR_TOLERANCE:
@@ -105,19 +118,21 @@ class Bush:
             if delta_x <= ZERO_FLOW:
                 break
 
-            min_dist = 0
             for link_index in min_path:
                 self.subgraph.links[link_index].AddFlow(delta_x)
                 self.subgraph.AddFlowToBushFlow(link_index, delta_x)
-                min_dist += self.subgraph.links[link_index].cost
 
-            max_dist = 0
             for link_index in max_path:
                 self.subgraph.links[link_index].AddFlow(-delta_x)
                 self.subgraph.AddFlowToBushFlow(link_index, -delta_x)
-                max_dist += self.subgraph.links[link_index].cost
 
-            if not MULTI_STEP or max_dist <= min_dist:
+            if not MULTI_STEP:
+                break
+
+            links = self.subgraph.links
+            min_dist = sum(links[link_index].cost for link_index in min_path)
+            max_dist = sum(links[link_index].cost for link_index in max_path)
+            if max_dist <= min_dist:
                 break
 
             min_path_distance = min_dist
@@ -0,0 +1,149 @@
+""" Bush flow store """
+import mmap
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, Literal
+
+import numpy as np
+
+from src.shared.consts import BUSH_FLOW_STORE
+
+
+class SparseBushFlow:
+    """
+    Origin flow of a bush indexed by link id, links not stored carry no flow.
+    Sorted link ids and their flows are kept in two typed arrays, 12 bytes
+    per link with flow, and looked up by binary search.
+    """
+
+    __slots__ = ('link_ids', 'flows')
+
+    def __init__(self) -> None:
+        self.link_ids = array('i')
+        self.flows = array('d')
+
+    def __len__(self) -> int:
+        return len(self.link_ids)
+
+    def __getitem__(self, link_id: int) -> float:
+        link_ids = self.link_ids
+        position = bisect_left(link_ids, link_id)
+        if position < len(link_ids) and link_ids[position] == link_id:
+            return self.flows[position]
+        return 0.0
+
+    def __setitem__(self, link_id: int, flow: float) -> None:
+        link_ids = self.link_ids
+        position = bisect_left(link_ids, link_id)
+        if position < len(link_ids) and link_ids[position] == link_id:
+            self.flows[position] = flow
+        else:
+            link_ids.insert(position, link_id)
+            self.flows.insert(position, flow)
+
+    def Remove(self, link_id: int) -> None:
+        link_ids = self.link_ids
+        position = bisect_left(link_ids, link_id)
+        if position < len(link_ids) and link_ids[position] == link_id:
+            del link_ids[position]
+            del self.flows[position]
+
+    def MemoryUsage(self) -> int:
+        return (
+            sys.getsizeof(self) + sys.getsizeof(self.link_ids) +
+            sys.getsizeof(self.flows)
+        )
+
+
+class BushFlowStore:
+    """
+    Origin flows of all bushes of an algorithm.
+    dense - one row of an origins x links NumPy array per bush
+    sparse - sorted link id and flow arrays per bush, only links with flow
+    A shared dense store lives in shared memory, so processes forked after its
+    creation see each other's bush flows.
+    """
+
+    def __init__(
+        self,
+        links_count: int,
+        origins_count: int,
+        mode: Literal['dense', 'sparse'] = BUSH_FLOW_STORE,
+        shared: bool = False
+    ) -> None:
+        if mode not in ('dense', 'sparse'):
+            raise ValueError(f"Unknown bush flow store mode: {mode}")
+        if shared and mode != 'dense':
+            raise ValueError("Only the dense bush flow store can be shared.")
+        self.mode = mode
+        self.links_count = links_count
+        self.origins_count = origins_count
+        self.flows: np.ndarray | None = None
+        if shared:
+            # Anonymous mappings are zero filled and shared with forked children
+            size = origins_count * links_count
+            self.buffer = mmap.mmap(-1, max(size, 1) * 8)
+            self.flows = np.frombuffer(self.buffer, np.float64, size).reshape(
+                (origins_count, links_count))
+        elif mode == 'dense':
+            self.flows = np.zeros((origins_count, links_count))
+        self.bush_flows: List[memoryview | SparseBushFlow] = []
+
+    def CreateBushFlow(self) -> memoryview | SparseBushFlow:
+        if self.flows is None:
+            bush_flow: memoryview | SparseBushFlow = SparseBushFlow()
+        else:
+            if len(self.bush_flows) == self.origins_count:
+                raise ValueError("Bush flow store is full.")
+            # Indexing a memoryview gives Python floats, NumPy scalars are
+            # much slower in the bush and PAS loops
+            bush_flow = memoryview(self.flows[len(self.bush_flows)])
+        self.bush_flows.append(bush_flow)
+        return bush_flow
+
+    def GetBushFlowIndex(self, bush_flow: memoryview | SparseBushFlow) -> int:
+        return next(
+            index for (index, row) in enumerate(self.bush_flows)
+            if row is bush_flow)
+
+    def __getstate__(self) -> Dict:
+        # Memoryviews can not be copied, the rows are taken again from the
+        # copy of the array
+        state = self.__dict__.copy()
+        if self.flows is not None:
+            state['bush_flows'] = len(self.bush_flows)
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        if self.flows is not None:
+            self.bush_flows = [
+                memoryview(row) for row in self.flows[:state['bush_flows']]]
+
+    def ClearFlow(
+        self,
+        bush_flow: memoryview | SparseBushFlow,
+        link_id: int
+    ) -> None:
+        if self.flows is None:
+            bush_flow.Remove(link_id)
+        else:
+            bush_flow[link_id] = 0.0
+
+    def GetLinkFlows(self) -> np.ndarray:
+        # Total flow of every link summed over all bushes
+        if self.flows is not None:
+            return self.flows.sum(axis=0)
+        link_flows = np.zeros(self.links_count)
+        for bush_flow in self.bush_flows:
+            if bush_flow:
+                # Link ids of a bush are unique, so the += does not drop any
+                link_flows[np.frombuffer(bush_flow.link_ids, np.int32)] += \
+                    np.frombuffer(bush_flow.flows, np.float64)
+        return link_flows
+
+    def MemoryUsage(self) -> int:
+        if self.flows is not None:
+            return self.flows.nbytes
+        return sum(bush_flow.MemoryUsage() for bush_flow in self.bush_flows)
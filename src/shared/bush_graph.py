@@ -1,92 +1,139 @@
 """ BushGraph """
 import math
-from typing import Dict, List, Set, Tuple
+from collections import defaultdict
+from typing import DefaultDict, Dict, List, Set, Tuple
 
-from src.shared.consts import ZERO_FLOW
+from src.shared.bush_flow_store import BushFlowStore
+from src.shared.consts import METRICS, ZERO_FLOW
+from src.shared.demand_matrix import DemandMatrix
 from src.shared.graph import Graph
 from src.shared.link import Link
 from src.shared.network import Network
 from src.shared.node import Node
-from src.utils.link_utils import create_link_key
+from src.utils.metrics import BUSH_LINKS_ADDED, BUSH_LINKS_REMOVED, metrics
+from src.utils.phase_profiler import IMPROVE, TOPO_SORT, TREES, phase
 
 
 class BushGraph(Graph):
     """Class implementing sub-graph structure for bush """
 
-    def __init__(self, network: Network, originIndex: int, demands) -> None:
+    def __init__(
+        self,
+        network: Network,
+        originIndex: int,
+        demands: DemandMatrix,
+        bush_flow_store: BushFlowStore
+    ) -> None:
         super().__init__()
         self.network = network
         self.originIndex = originIndex
-        self.demands = demands
-        self.bush_flow = self.CreateBushFlowDict()
+        # Destinations with non-zero demand and their demands
+        (self.destinations, self.demands) = demands.GetRow(originIndex)
+        self.total_demand: float = sum(self.demands)
+        self.bush_flow_store = bush_flow_store
+        self.bush_flow = bush_flow_store.CreateBushFlow()
+        # Labels of the bush trees indexed by node index, owned by the bush
+        self.pi_max: List[float] = network.CreateNodeLabels(-math.inf)
+        self.pi_min: List[float] = network.CreateNodeLabels(math.inf)
+        self.alpha_max: List[Link | None] = network.CreateNodeLabels(None)
+        self.alpha_min: List[Link | None] = network.CreateNodeLabels(None)
         (nodes, links) = self.InitialAsignment()
         self.nodes = nodes
         self.links = links
-        self.nodesOrder = self.TopoSort()
+        # Kept up to date by AddLink and RemoveEmptyLinks
+        self.incoming_links: DefaultDict[int, List[Link]] = defaultdict(list)
+        self.outcoming_links: DefaultDict[int, List[Link]] = defaultdict(list)
+        for link in links.values():
+            self.AddToAdjacency(link)
+        self.nodesRank: Dict[int, int] = dict()
+        self.UpdateTopoSort()
         self.p2Cont: List[Link] = []
         self.BuildTrees()
 
-    def InitialAsignment(self) -> Tuple[Dict[int, Node], Dict[str, Link]]:
-        self.network.BuildMinTree(self.originIndex)
-        links: Dict[str, Link] = dict()
+    def __getstate__(self) -> Dict:
+        # A dense store row is a memoryview, the copy takes it from the copy
+        # of the store
+        state = self.__dict__.copy()
+        if isinstance(self.bush_flow, memoryview):
+            state['bush_flow'] = self.bush_flow_store.GetBushFlowIndex(
+                self.bush_flow)
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        if isinstance(self.bush_flow, int):
+            self.bush_flow = self.bush_flow_store.bush_flows[self.bush_flow]
+
+    def InitialAsignment(self) -> Tuple[Dict[int, Node], Dict[int, Link]]:
+        (_pi_min, alpha_min) = self.network.BuildMinTree(self.originIndex)
+        links: Dict[int, Link] = dict()
         nodes: Dict[int, Node] = dict()
-        for key, demand in enumerate(self.demands):
-            node_key = key + 1
-            link = self.network.nodes[node_key].alpha_min
-            if node_key not in nodes:
-                nodes[node_key] = self.network.nodes[node_key]
-            while link is not None:
-                link.AddFlow(demand)
-                self.AddFlowToBushFlow(link.index, demand)
-                links[link.index] = link
-                link = self.network.nodes[link.src].alpha_min
+        # Links close to the origin get flow for many destinations
+        with self.network.arrays.DeferredCosts():
+            for node_key, demand in zip(self.destinations, self.demands):
+                link = alpha_min[node_key]
+                if node_key not in nodes:
+                    nodes[node_key] = self.network.nodes[node_key]
+                while link is not None:
+                    link.AddFlow(demand)
+                    self.AddFlowToBushFlow(link.id, demand)
+                    links[link.id] = link
+                    link = alpha_min[link.src]
 
         for node in self.network.nodes.values():
             if node.index in nodes:
                 continue
-            link = node.alpha_min
+            link = alpha_min[node.index]
             while link:
-                links[link.index] = link
+                links[link.id] = link
                 if link.src not in nodes:
                     nodes[link.src] = self.network.nodes[link.src]
                 if link.dest not in nodes:
                     nodes[link.dest] = self.network.nodes[link.dest]
-                link = self.network.nodes[link.src].alpha_min
+                link = alpha_min[link.src]
             nodes[node.index] = node
 
         return (nodes, links)
 
-    def CreateBushFlowDict(self):
-        return dict(
-            map(
-                lambda link: (link.index, 0.0),
-                self.network.links.values()
-            )
-        )
-
-    def AddFlowToBushFlow(self, link_index: str, flow: float):
+    def AddFlowToBushFlow(self, link_index: int, flow: float):
         new_flow = self.bush_flow[link_index] + flow
-        self.bush_flow[link_index] = new_flow if new_flow > ZERO_FLOW else 0.0
+        if new_flow > ZERO_FLOW:
+            self.bush_flow[link_index] = new_flow
+        else:
+            self.bush_flow_store.ClearFlow(self.bush_flow, link_index)
+
+    def ClearBushFlow(self, link_index: int):
+        self.bush_flow_store.ClearFlow(self.bush_flow, link_index)
 
     def RemoveEmptyLinks(self):
         removed_link = False
-        incoming_links_dict = self.GetAllIncomingLinksLength()
         for link_key, link in self.links.copy().items():
-            if self.bush_flow[link_key] <= ZERO_FLOW and incoming_links_dict[link.dest] > 1:
+            if (
+                self.bush_flow[link_key] <= ZERO_FLOW and
+                len(self.incoming_links[link.dest]) > 1
+            ):
                 del self.links[link_key]
-                incoming_links_dict[link.dest] -= 1
+                self.RemoveFromAdjacency(link)
+                if METRICS:
+                    metrics.Add(BUSH_LINKS_REMOVED)
                 if not removed_link:
                     removed_link = True
         return removed_link
 
+    @phase(IMPROVE)
     def AddBetterLinks(self) -> bool:
         was_improved = False
         new_link_added = False
         self.p2Cont.clear()
+        cost = self.network.arrays.GetCostList()
+        reverse_link = self.network.arrays.reverse_link_list
         for link_key, link in self.network.links.items():
-            if link_key in self.links and create_link_key(link.dest, link.src) not in self.links:
+            if (
+                link_key in self.links and
+                reverse_link[link_key] not in self.links
+            ):
                 continue
-            if self.IsReachable(link) and self.WorthAdding(link):
+            if self.IsReachable(link) and self.WorthAdding(link, cost[link.id]):
                 if self.AddLink(link):
                     new_link_added = True
                 was_improved = True
@@ -99,12 +146,10 @@ class BushGraph(Graph):
     def IsReachable(self, link: Link) -> bool:
         return link.src in self.nodes and link.dest in self.nodes
 
-    def WorthAdding(self, link: Link) -> bool:
-        src_node = self.nodes[link.src]
-        dest_node = self.nodes[link.dest]
-        if src_node.pi_max + link.cost < dest_node.pi_max:
+    def WorthAdding(self, link: Link, cost: float) -> bool:
+        if self.pi_max[link.src] + cost < self.pi_max[link.dest]:
             self.p2Cont.append(link)
-            if src_node.pi_min + link.cost < dest_node.pi_min:
+            if self.pi_min[link.src] + cost < self.pi_min[link.dest]:
                 return True
 
         return False
@@ -117,11 +162,14 @@ class BushGraph(Graph):
         return added
 
     def AddLink(self, link: Link):
-        if link.index in self.links:
+        if link.id in self.links:
             return False
         src_node_index = link.src
         dest_node_index = link.dest
-        self.links[link.index] = link
+        self.links[link.id] = link
+        self.AddToAdjacency(link)
+        if METRICS:
+            metrics.Add(BUSH_LINKS_ADDED)
 
         if src_node_index not in self.nodes:
             new_node = self.network.nodes[src_node_index]
@@ -133,8 +181,41 @@ class BushGraph(Graph):
 
         return True
 
+    def AddToAdjacency(self, link: Link) -> None:
+        self.incoming_links[link.dest].append(link)
+        self.outcoming_links[link.src].append(link)
+
+    def RemoveFromAdjacency(self, link: Link) -> None:
+        self.incoming_links[link.dest].remove(link)
+        self.outcoming_links[link.src].remove(link)
+
+    def GetAllNeighbors(self):
+        all_neighbors = defaultdict(list)
+        for node_index, links in self.outcoming_links.items():
+            all_neighbors[node_index] = [link.dest for link in links]
+        return all_neighbors
+
+    def GetIncomingLinks(self, node_index: int) -> List[Link]:
+        return self.incoming_links[node_index]
+
+    def GetAllIncomingLinks(self) -> Dict[int, List[Link]]:
+        # Live index, callers must not modify it
+        return self.incoming_links
+
+    def GetAllIncomingLinksLength(self) -> Dict[int, int]:
+        return {
+            node_index: len(links)
+            for node_index, links in self.incoming_links.items()
+        }
+
+    def GetOutcomingLinks(self, node_index: int) -> List[Link]:
+        return self.outcoming_links[node_index]
+
     def GetDemand(self, index: int) -> float:
-        return self.demands[index - 1] if self.demands.size > index - 1 else 0.0
+        for destination, demand in zip(self.destinations, self.demands):
+            if destination == index:
+                return demand
+        return 0.0
 
     def TopoSort(self):
         visited: Set[int] = set()
@@ -154,37 +235,44 @@ class BushGraph(Graph):
 
         return stack + order[::-1]
 
+    @phase(TOPO_SORT)
     def UpdateTopoSort(self):
+        # Any topological order of the same bush gives the same trees
         self.nodesOrder = self.TopoSort()
+        # Position of every node in the topological order
+        self.nodesRank = {
+            node_index: rank for rank, node_index in enumerate(self.nodesOrder)
+        }
 
+    @phase(TREES)
     def BuildTrees(self) -> None:
-        for node in self.nodes.values():
-            node.pi_max = 0
-            node.pi_min = math.inf
-            node.alpha_max = None
-            node.alpha_min = None
+        # Fresh label lists are cheaper than resetting the bush nodes one by one
+        self.pi_max = pi_max = self.network.CreateNodeLabels(0)
+        self.pi_min = pi_min = self.network.CreateNodeLabels(math.inf)
+        self.alpha_max = alpha_max = self.network.CreateNodeLabels(None)
+        self.alpha_min = alpha_min = self.network.CreateNodeLabels(None)
 
-        self.nodes[self.originIndex].pi_min = 0
+        pi_min[self.originIndex] = 0
 
         incoming_links_list = self.GetAllIncomingLinks()
+        cost = self.network.arrays.GetCostList()
 
         for node_index in self.nodesOrder:
             if node_index not in incoming_links_list:
                 continue
 
-            dest_node = self.nodes[node_index]
             for link in incoming_links_list[node_index]:
-                src_node = self.nodes[link.src]
-                cij = link.cost
+                src_index = link.src
+                cij = cost[link.id]
 
                 # min distance
-                new_cost = src_node.pi_min + cij
-                if new_cost < dest_node.pi_min:
-                    dest_node.pi_min = new_cost
-                    dest_node.alpha_min = link
+                new_cost = pi_min[src_index] + cij
+                if new_cost < pi_min[node_index]:
+                    pi_min[node_index] = new_cost
+                    alpha_min[node_index] = link
 
                 # max distance
-                new_cost = src_node.pi_max + cij
-                if new_cost >= dest_node.pi_max:
-                    dest_node.pi_max = new_cost
-                    dest_node.alpha_max = link
+                new_cost = pi_max[src_index] + cij
+                if new_cost >= pi_max[node_index]:
+                    pi_max[node_index] = new_cost
+                    alpha_max[node_index] = link
@@ -0,0 +1,329 @@
+""" Compact Network """
+import sys
+from contextlib import contextmanager
+from typing import Iterator, List, Set, Tuple
+
+import numpy as np
+
+from src.shared.consts import ZERO_FLOW
+from src.shared.link_cost import bpr_link_cost, bpr_link_costs
+
+# Columns of the TNTP network file (see COL_DEF in src/data/data.py)
+INIT_NODE = 0
+TERM_NODE = 1
+CAPACITY = 2
+FREE_FLOW_TIME = 4
+B = 5
+POWER = 6
+
+# Up to this many dirty links are refreshed one by one instead of vectorized
+SCALAR_REFRESH_LIMIT = 16
+
+
+class CompactNetwork:
+    """
+    Array backed network storage.
+    Nodes get dense 0-based ids in input order, links are numbered in input
+    order. Link parameters and state live in contiguous NumPy arrays and the
+    adjacency is stored in CSR form in both directions.
+    Flow, cost and cost derivative are also kept in plain lists. Single link
+    updates write only the lists, the arrays catch up on the next bulk read.
+    """
+
+    def __init__(self, nodes, links) -> None:
+        node_index = np.asarray(nodes, dtype=np.float64)[:, 0].astype(np.int64)
+        link_data = np.asarray(links, dtype=np.float64)
+
+        self.n: int = node_index.size
+        self.m: int = link_data.shape[0]
+        self.node_index = node_index
+        node_id = np.full(node_index.max() + 1, -1, dtype=np.int32)
+        node_id[node_index] = np.arange(self.n, dtype=np.int32)
+        self.node_id = node_id
+
+        link_src_index = link_data[:, INIT_NODE].astype(np.int64)
+        link_dest_index = link_data[:, TERM_NODE].astype(np.int64)
+        if (
+            link_src_index.max() >= node_id.size or
+            link_dest_index.max() >= node_id.size or
+            (node_id[link_src_index] < 0).any() or
+            (node_id[link_dest_index] < 0).any()
+        ):
+            raise ValueError("Network links refer to nodes that do not exist.")
+        self.link_src = node_id[link_src_index]
+        self.link_dest = node_id[link_dest_index]
+
+        self.fft = np.ascontiguousarray(link_data[:, FREE_FLOW_TIME])
+        self.b = np.ascontiguousarray(link_data[:, B])
+        self.capacity = np.ascontiguousarray(link_data[:, CAPACITY])
+        self.power = np.ascontiguousarray(link_data[:, POWER])
+        self.flow = np.zeros(self.m)
+        self.cost = self.fft.copy()
+        self.cost_der = self.fft.copy()
+        self.flow_list: List[float] = self.flow.tolist()
+        self.cost_list: List[float] = self.cost.tolist()
+        self.cost_der_list: List[float] = self.cost_der.tolist()
+        # fft, b, capacity and power of every link
+        self.link_params: List[Tuple[float, float, float, float]] = list(zip(
+            self.fft.tolist(), self.b.tolist(), self.capacity.tolist(),
+            self.power.tolist()))
+        self.deferred = False
+        self.dirty_links: Set[int] = set()
+        # Links updated on the scalar path only, not yet copied to the arrays
+        self.stale_links: Set[int] = set()
+        # Changes with every flow or cost update
+        self.cost_version = 0
+        # cost_version of the last flow or cost update of every link
+        self.link_version: List[int] = [0] * self.m
+
+        (self.out_offsets, self.out_links) = self.CreateCSR(self.link_src)
+        (self.in_offsets, self.in_links) = self.CreateCSR(self.link_dest)
+        self.reverse_link = self.CreateReverseLinks()
+        self.reverse_link_list: List[int] = self.reverse_link.tolist()
+
+    def CreateCSR(
+        self,
+        link_nodes: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Stable sort keeps links of each node in the input order
+        order = np.argsort(link_nodes, kind='stable')
+        offsets = np.zeros(self.n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(link_nodes, minlength=self.n), out=offsets[1:])
+        return (offsets, order.astype(np.int32))
+
+    def CreateReverseLinks(self) -> np.ndarray:
+        # Id of the dest -> src link for every link, -1 if there is none
+        keys = self.link_src.astype(np.int64) * self.n + self.link_dest
+        reverse_keys = self.link_dest.astype(np.int64) * self.n + self.link_src
+        order = np.argsort(keys, kind='stable')
+        positions = np.searchsorted(keys[order], reverse_keys)
+        positions[positions == self.m] = 0
+        found = keys[order][positions] == reverse_keys
+        return np.where(found, order[positions], -1).astype(np.int32)
+
+    def GetLinkId(self, src_id: int, dest_id: int) -> int:
+        for link_id in self.GetOutcomingLinks(src_id).tolist():
+            if self.link_dest[link_id] == dest_id:
+                return link_id
+        return -1
+
+    def GetOutcomingLinks(self, node_id: int) -> np.ndarray:
+        return self.out_links[
+            self.out_offsets[node_id]:self.out_offsets[node_id + 1]]
+
+    def GetIncomingLinks(self, node_id: int) -> np.ndarray:
+        return self.in_links[
+            self.in_offsets[node_id]:self.in_offsets[node_id + 1]]
+
+    def AddFlow(self, link_id: int, delta_flow: float) -> None:
+        # Add flow to the link and update cost and cost derivative
+        new_flow = self.flow_list[link_id] + delta_flow
+        if new_flow <= ZERO_FLOW:
+            new_flow = 0.0
+        self.flow_list[link_id] = new_flow
+        self.cost_version += 1
+        self.link_version[link_id] = self.cost_version
+        self.stale_links.add(link_id)
+        if self.deferred:
+            self.dirty_links.add(link_id)
+            return
+        (self.cost_list[link_id], self.cost_der_list[link_id]) = bpr_link_cost(
+            new_flow, *self.link_params[link_id])
+
+    def AddSegmentFlow(self, link_ids: List[int], delta_flow: float) -> None:
+        # AddFlow of the same flow to every link of a segment
+        flow_list = self.flow_list
+        self.cost_version += 1
+        cost_version = self.cost_version
+        link_version = self.link_version
+        self.stale_links.update(link_ids)
+        if self.deferred:
+            for link_id in link_ids:
+                new_flow = flow_list[link_id] + delta_flow
+                flow_list[link_id] = new_flow if new_flow > ZERO_FLOW else 0.0
+                link_version[link_id] = cost_version
+            self.dirty_links.update(link_ids)
+            return
+        cost_list = self.cost_list
+        cost_der_list = self.cost_der_list
+        link_params = self.link_params
+        for link_id in link_ids:
+            new_flow = flow_list[link_id] + delta_flow
+            if new_flow <= ZERO_FLOW:
+                new_flow = 0.0
+            flow_list[link_id] = new_flow
+            link_version[link_id] = cost_version
+            (cost_list[link_id], cost_der_list[link_id]) = bpr_link_cost(
+                new_flow, *link_params[link_id])
+
+    def AddFlows(self, link_ids: np.ndarray, delta_flows: np.ndarray) -> None:
+        # AddFlow of several distinct links at once
+        if link_ids.size <= SCALAR_REFRESH_LIMIT:
+            for (link_id, delta_flow) in zip(
+                link_ids.tolist(), delta_flows.tolist()
+            ):
+                self.AddFlow(link_id, delta_flow)
+            return
+        self.SyncArrays()
+        new_flows = self.flow[link_ids] + delta_flows
+        new_flows[new_flows <= ZERO_FLOW] = 0.0
+        self.flow[link_ids] = new_flows
+        flow_list = self.flow_list
+        for (link_id, flow) in zip(link_ids.tolist(), new_flows.tolist()):
+            flow_list[link_id] = flow
+        if self.deferred:
+            self.cost_version += 1
+            link_version = self.link_version
+            for link_id in link_ids.tolist():
+                link_version[link_id] = self.cost_version
+            self.dirty_links.update(link_ids.tolist())
+            self.stale_links.update(link_ids.tolist())
+            return
+        self.UpdateCosts(link_ids)
+
+    def SetFlows(self, flows: np.ndarray) -> None:
+        # Replaces the flow of every link, costs of the changed links are
+        # recalculated at once. Like AddFlow, links whose flow stays keep
+        # their cost derivative, fft until a link first carries flow.
+        self.SyncArrays()
+        changed = np.flatnonzero(self.flow != flows)
+        self.flow[:] = flows
+        self.flow_list[:] = self.flow.tolist()
+        self.UpdateCosts(changed)
+
+    def UpdateCosts(self, link_ids: np.ndarray | None = None) -> None:
+        # Recalculate costs of the given links (all links by default) at once
+        self.SyncArrays()
+        self.cost_version += 1
+        if link_ids is None:
+            self.link_version[:] = [self.cost_version] * self.m
+            (self.cost[:], self.cost_der[:]) = bpr_link_costs(
+                self.flow, self.fft, self.b, self.capacity, self.power)
+            self.cost_list[:] = self.cost.tolist()
+            self.cost_der_list[:] = self.cost_der.tolist()
+            return
+        (costs, cost_ders) = bpr_link_costs(
+            self.flow[link_ids],
+            self.fft[link_ids],
+            self.b[link_ids],
+            self.capacity[link_ids],
+            self.power[link_ids]
+        )
+        self.cost[link_ids] = costs
+        self.cost_der[link_ids] = cost_ders
+        link_version = self.link_version
+        cost_list = self.cost_list
+        cost_der_list = self.cost_der_list
+        for (link_id, cost, cost_der) in zip(
+            link_ids.tolist(), costs.tolist(), cost_ders.tolist()
+        ):
+            link_version[link_id] = self.cost_version
+            cost_list[link_id] = cost
+            cost_der_list[link_id] = cost_der
+
+    def SyncArrays(self) -> None:
+        # Copies the links updated on the scalar path into the arrays
+        if self.dirty_links:
+            self.RefreshCosts()
+        stale_links = self.stale_links
+        if not stale_links:
+            return
+        link_ids = np.fromiter(stale_links, np.int64, len(stale_links))
+        stale_links.clear()
+        self.flow[link_ids] = [self.flow_list[i] for i in link_ids.tolist()]
+        self.cost[link_ids] = [self.cost_list[i] for i in link_ids.tolist()]
+        self.cost_der[link_ids] = [
+            self.cost_der_list[i] for i in link_ids.tolist()]
+
+    @contextmanager
+    def DeferredCosts(self) -> Iterator[None]:
+        """
+        Flow changes made inside only mark links as dirty, their costs are
+        recalculated once, when any cost is read next time.
+        """
+        deferred = self.deferred
+        self.deferred = True
+        try:
+            yield
+        finally:
+            self.deferred = deferred
+
+    def RefreshCosts(self) -> None:
+        # Costs of the dirty links from their flows, one link at a time
+        flow_list = self.flow_list
+        cost_list = self.cost_list
+        cost_der_list = self.cost_der_list
+        link_params = self.link_params
+        for link_id in self.dirty_links:
+            (cost_list[link_id], cost_der_list[link_id]) = bpr_link_cost(
+                flow_list[link_id], *link_params[link_id])
+        self.stale_links.update(self.dirty_links)
+        self.dirty_links.clear()
+
+    def GetCost(self, link_id: int) -> float:
+        if self.dirty_links:
+            self.RefreshCosts()
+        return self.cost_list[link_id]
+
+    def GetCostDerivative(self, link_id: int) -> float:
+        if self.dirty_links:
+            self.RefreshCosts()
+        return self.cost_der_list[link_id]
+
+    def GetFlows(self) -> np.ndarray:
+        self.SyncArrays()
+        return self.flow
+
+    def GetCosts(self) -> np.ndarray:
+        self.SyncArrays()
+        return self.cost
+
+    def GetCostDerivatives(self) -> np.ndarray:
+        self.SyncArrays()
+        return self.cost_der
+
+    def GetCostList(self) -> List[float]:
+        # Plain list of the link costs, much faster to index from Python
+        if self.dirty_links:
+            self.RefreshCosts()
+        return self.cost_list
+
+    def GetCostDerivativeList(self) -> List[float]:
+        if self.dirty_links:
+            self.RefreshCosts()
+        return self.cost_der_list
+
+    def CostFormula(self, link_id: int, x: float) -> float:
+        return bpr_link_cost(x, *self.link_params[link_id])[0]
+
+    def CostDerivativeFormula(self, link_id: int, x: float) -> float:
+        return bpr_link_cost(x, *self.link_params[link_id])[1]
+
+    def TotalTravelTime(self) -> float:
+        return float(np.dot(self.GetFlows(), self.GetCosts()))
+
+    def GetArrays(self) -> List[np.ndarray]:
+        return [
+            self.node_index, self.node_id, self.link_src, self.link_dest,
+            self.fft, self.b, self.capacity, self.power,
+            self.flow, self.cost, self.cost_der,
+            self.out_offsets, self.out_links, self.in_offsets, self.in_links,
+            self.reverse_link,
+        ]
+
+    def GetLists(self) -> List[list]:
+        return [
+            self.flow_list, self.cost_list, self.cost_der_list,
+            self.link_params, self.link_version, self.reverse_link_list,
+        ]
+
+    def MemoryUsage(self) -> int:
+        # Lists hold pointers, the objects they point to are added per link
+        per_link = (
+            7 * sys.getsizeof(0.0) + sys.getsizeof((0.0,) * 4) +
+            2 * sys.getsizeof(self.m)
+        )
+        return (
+            sum(array.nbytes for array in self.GetArrays()) +
+            sum(map(sys.getsizeof, self.GetLists())) + self.m * per_link
+        )
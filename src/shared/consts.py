@@ -16,6 +16,28 @@ MAX_ERROR = float(os.getenv('MAX_ERROR', '1e-14'))
 ZERO_FLOW = float(os.getenv('ZERO_FLOW', '1e-15'))
 DIR_TOLERANCE = float(os.getenv('DIR_TOLERANCE', '1e-15'))
 COMPARE_SOLUTION = strtobool(os.getenv("COMPARE_SOLUTION", 'False'))
+PROFILE_PHASES = strtobool(os.getenv("PROFILE_PHASES", 'False'))  # phases CSV
+PROFILE: Literal['', 'solve', 'all'] = os.getenv(
+    "PROFILE", '')  # cProfile of the run, 'all' includes data loading
+PROFILE_ITERATIONS = int(os.getenv("PROFILE_ITERATIONS", '0'))  # 0 - whole run
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", '30'))  # functions in the summary
+METRICS: Literal['', 'csv', 'json'] = os.getenv(
+    "METRICS", '')  # per iteration operation counters, '' - off
+DATA_CACHE = strtobool(os.getenv(
+    "DATA_CACHE", 'True'))  # compiled .npy datasets
 GAP: Literal[0, 1] = int(os.getenv("GAP", '1'))  # REL: 0, MAX: 1
+GAP_CHECK: Literal['every', 'adaptive'] = os.getenv(
+    "GAP_CHECK", 'every')  # fixed or convergence rate based gap checks
+GAP_CHECK_INTERVAL = int(os.getenv(
+    "GAP_CHECK_INTERVAL", '1'))  # max for adaptive
 MU: float = float(os.getenv("MU", '0.5'))  # used in TAPAS
 V: float = float(os.getenv("V", '0.25'))  # used in TAPAS
+MAX_PAS_COUNT = int(os.getenv(
+    "MAX_PAS_COUNT", '0'))  # TAPAS PAS pool size, 0 - unbounded
+PAS_EVICTION: Literal['lru', 'least_effective'] = os.getenv(
+    "PAS_EVICTION", 'lru')  # PASs dropped first when the pool is full
+BUSH_FLOW_STORE: Literal['dense', 'sparse'] = os.getenv(
+    "BUSH_FLOW_STORE", 'dense')  # origins x links array or sorted link arrays
+PARALLEL_WORKERS = int(os.getenv("PARALLEL_WORKERS", '0'))  # 0 - sequential
+PARALLEL_BATCH_SIZE = int(os.getenv(
+    "PARALLEL_BATCH_SIZE", '0'))  # 0 - one batch
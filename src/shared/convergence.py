@@ -0,0 +1,122 @@
+"""
+Convergence - gap measures shared by the origin based algorithms
+
+rel gap = 1 - SPTT / TSTT
+max gap = largest difference between the longest used and the shortest path
+          cost of any OD pair
+avg excess = (TSTT - SPTT) / total demand
+
+TSTT is the total travel time over all links and SPTT the travel time when
+all demand uses the current shortest paths.
+
+Exact gaps cost about as much as an iteration, GapSchedule decides after
+which iterations they are calculated.
+"""
+import math
+from typing import Iterable, NamedTuple, Tuple
+
+import numpy as np
+
+from src.shared.consts import GAP_CHECK, GAP_CHECK_INTERVAL
+from src.shared.network import Network
+
+
+class Gaps(NamedTuple):
+    """ Gap measures, indexed by the GAP const: REL: 0, MAX: 1 """
+    rel_gap: float
+    max_gap: float
+    avg_excess: float
+
+
+def bush_gaps(network: Network, bush) -> Tuple[float, float]:
+    """
+    Shortest path travel time of the bush demand and the max gap of its
+    destinations.
+    """
+    subgraph = bush.subgraph
+    if not subgraph.destinations:
+        return (0.0, 0.0)
+    subgraph.BuildTrees()
+    (pi_min, _alpha_min) = network.BuildMinTree(
+        bush.originIndex, subgraph.destinations)
+    destinations = np.asarray(subgraph.destinations)
+    destinations_pi_min = np.asarray(pi_min)[destinations]
+    destinations_pi_max = np.asarray(subgraph.pi_max)[destinations]
+    min_travel_time = float(np.dot(subgraph.demands, destinations_pi_min))
+    max_gap = float(np.max(destinations_pi_max - destinations_pi_min))
+    return (min_travel_time, max(max_gap, 0.0))
+
+
+def gaps_from_totals(
+    total_travel_time: float,
+    min_travel_time: float,
+    max_gap: float,
+    total_demand: float
+) -> Gaps:
+    rel_gap = 1.0 - min_travel_time / \
+        total_travel_time if total_travel_time > 1e-25 else math.inf
+    avg_excess = (total_travel_time - min_travel_time) / \
+        total_demand if total_demand > 0 else math.inf
+    return Gaps(rel_gap, max_gap, avg_excess)
+
+
+def calculate_gaps(network: Network, bushes: Iterable) -> Gaps:
+    min_travel_time = 0.0
+    max_gap = 0.0
+    total_demand = 0.0
+    for bush in bushes:
+        (bush_min_travel_time, bush_max_gap) = bush_gaps(network, bush)
+        min_travel_time += bush_min_travel_time
+        max_gap = max(max_gap, bush_max_gap)
+        total_demand += bush.subgraph.total_demand
+    return gaps_from_totals(
+        network.TotalTravelTime(), min_travel_time, max_gap, total_demand)
+
+
+class GapSchedule:
+    """
+    Iterations after which the exact gaps are calculated.
+    'every' checks after every interval iterations. 'adaptive' assumes linear
+    convergence, estimates the rate per iteration from the last two checks
+    and skips the iterations in which the gap is not expected to reach the
+    error, at most interval of them.
+    """
+
+    def __init__(
+        self,
+        error: float,
+        mode: str = GAP_CHECK,
+        interval: int = GAP_CHECK_INTERVAL
+    ) -> None:
+        if mode not in ('every', 'adaptive'):
+            raise ValueError(f"Unknown gap check mode: {mode}.")
+        if interval < 1:
+            raise ValueError("Gap check interval must be at least 1.")
+        self.error = error
+        self.mode = mode
+        self.interval = interval
+        self.last_iteration = 0
+        self.last_gap = math.inf
+
+    def NextCheck(self, iteration: int, gap: float) -> int:
+        """ Iteration of the next check, given the gap checked at iteration """
+        steps = self.interval
+        if self.mode == 'adaptive':
+            steps = min(self.EstimateSteps(iteration, gap), self.interval)
+        self.last_iteration = iteration
+        self.last_gap = gap
+        return iteration + steps
+
+    def EstimateSteps(self, iteration: int, gap: float) -> int:
+        # Without a measurable decrease the gap is checked again right away
+        if (
+            iteration <= self.last_iteration or
+            not 0.0 < gap < self.last_gap < math.inf or
+            self.error <= 0.0
+        ):
+            return 1
+        steps = iteration - self.last_iteration
+        rate = (gap / self.last_gap) ** (1.0 / steps)
+        if rate <= 0.0:
+            return 1
+        return max(1, math.ceil(math.log(self.error / gap) / math.log(rate)))
@@ -0,0 +1,123 @@
+""" Demand matrix """
+from typing import List, Tuple
+
+import numpy as np
+
+
+class DemandMatrix:
+    """
+    Sparse OD demand matrix in CSR form.
+    Only non-zero OD pairs are stored. Row o - 1 holds the demand of origin o,
+    destinations are 1-based zone indexes sorted in ascending order.
+    """
+
+    def __init__(
+        self,
+        zones: int,
+        offsets: np.ndarray,
+        destinations: np.ndarray,
+        values: np.ndarray
+    ) -> None:
+        if offsets.size != zones + 1 or destinations.size != values.size:
+            raise ValueError("Demand matrix arrays do not match.")
+        self.zones = zones
+        self.offsets = offsets
+        self.destinations = destinations
+        self.values = values
+
+    @classmethod
+    def FromRows(
+        cls,
+        zones: int,
+        rows: List[Tuple[int, np.ndarray, np.ndarray]]
+    ) -> 'DemandMatrix':
+        """
+        Builds the matrix from (origin, destinations, demands) rows. A later
+        row of the same origin replaces the earlier one and a later demand
+        of the same destination replaces the earlier one.
+        """
+        last_rows = {
+            origin: (destinations, demands)
+            for (origin, destinations, demands) in rows
+        }
+        counts = np.zeros(zones + 1, dtype=np.int64)
+        kept = []
+        for origin in sorted(last_rows):
+            (destinations, demands) = cls.CompactRow(*last_rows[origin])
+            kept.append((destinations, demands))
+            counts[origin] = destinations.size
+
+        offsets = np.cumsum(counts)
+        if kept:
+            destinations = np.concatenate(
+                [row[0] for row in kept]).astype(np.int32)
+            values = np.concatenate(
+                [row[1] for row in kept]).astype(np.float64)
+        else:
+            destinations = np.empty(0, dtype=np.int32)
+            values = np.empty(0)
+        return cls(zones, offsets, destinations, values)
+
+    @staticmethod
+    def CompactRow(
+        destinations: np.ndarray,
+        demands: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        # Sorted unique destinations with non-zero demand, the last demand wins
+        # np.unique keeps the first occurrence, reversing keeps the last one
+        (destinations, positions) = np.unique(
+            destinations[::-1], return_index=True)
+        demands = demands[::-1][positions]
+        non_zero = demands != 0
+        return (destinations[non_zero], demands[non_zero])
+
+    @classmethod
+    def FromDense(cls, matrix: np.ndarray) -> 'DemandMatrix':
+        (origins, destinations) = np.nonzero(matrix)
+        counts = np.bincount(origins, minlength=matrix.shape[0])
+        offsets = np.zeros(matrix.shape[0] + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(
+            matrix.shape[0],
+            offsets,
+            (destinations + 1).astype(np.int32),
+            matrix[origins, destinations].astype(np.float64)
+        )
+
+    def GetOrigins(self) -> List[int]:
+        # Origins with at least one non-zero demand
+        return (np.flatnonzero(np.diff(self.offsets)) + 1).tolist()
+
+    def GetRow(self, origin_index: int) -> Tuple[List[int], List[float]]:
+        start = self.offsets[origin_index - 1]
+        end = self.offsets[origin_index]
+        return (
+            self.destinations[start:end].tolist(),
+            self.values[start:end].tolist()
+        )
+
+    def GetDemand(self, origin_index: int, destination_index: int) -> float:
+        if not 1 <= origin_index <= self.zones:
+            return 0.0
+        start = self.offsets[origin_index - 1]
+        end = self.offsets[origin_index]
+        position = start + np.searchsorted(
+            self.destinations[start:end], destination_index)
+        if position < end and self.destinations[position] == destination_index:
+            return self.values.item(position)
+        return 0.0
+
+    def Total(self) -> float:
+        return float(self.values.sum())
+
+    def ToDense(self) -> np.ndarray:
+        matrix = np.zeros((self.zones, self.zones))
+        origins = np.repeat(np.arange(self.zones), np.diff(self.offsets))
+        matrix[origins, self.destinations - 1] = self.values
+        return matrix
+
+    def MemoryUsage(self) -> int:
+        return (
+            self.offsets.nbytes + self.destinations.nbytes +
+            self.values.nbytes
+        )
@@ -13,15 +13,14 @@ class Graph(ABC):
     """
 
     def __init__(self):
-        self.links: Dict[str, Link] = dict()
+        self.links: Dict[int, Link] = dict()
         self.nodes: Dict[int, Node] = dict()
         self.nodesOrder: List[int] = list()
 
     def GetAllNeighbors(self):
         all_neighbors = defaultdict(list)
-        for link in self.links:
-            [src, dest] = link.split('_')
-            all_neighbors[int(src)].append(int(dest))
+        for link in self.links.values():
+            all_neighbors[link.src].append(link.dest)
         return all_neighbors
 
     def GetIncomingLinks(self, node_index: int) -> List[Link]:
@@ -1,53 +1,86 @@
 """Link"""
-import math
+from typing import TYPE_CHECKING
 
-from src.shared.consts import ZERO_FLOW
-from src.utils.link_utils import create_link_key
+from src.shared.compact_network import CompactNetwork
+from src.shared.consts import METRICS
+from src.utils.metrics import ADD_FLOW_CALLS, metrics
+
+if TYPE_CHECKING:
+    from src.shared.node import Node
 
 
 class Link:
-    """Link class"""
+    """
+    Link class
+    View of a single link of the CompactNetwork, link data is stored in the
+    network arrays.
+    """
+    __slots__ = ('arrays', 'id', 'src', 'dest', 'src_id', 'dest_id')
 
     def __init__(
         self,
-        init_node: int | float,
-        term_node: int | float,
-        capacity: float,
-        _length: float,
-        free_flow_time: float,
-        b: float,
-        power: float,
-        _speed_limit: float,
-        _toll: float,
-        _link_type: float,
+        arrays: CompactNetwork,
+        link_id: int,
+        src_node: 'Node',
+        dest_node: 'Node'
     ):
-        self.src = int(init_node)
-        self.dest = int(term_node)
-        self.index = create_link_key(self.src, self.dest)
-        self.fft = free_flow_time
-        self.b = b
-        self.k = capacity
-        self.p = power
-        self.flow = 0.0
-        self.cost = free_flow_time
-        self.cost_der = free_flow_time
+        self.arrays = arrays
+        self.id = link_id
+        self.src_id = src_node.id
+        self.dest_id = dest_node.id
+        self.src = src_node.index
+        self.dest = dest_node.index
+
+    @property
+    def fft(self) -> float:
+        return self.arrays.link_params[self.id][0]
+
+    @property
+    def b(self) -> float:
+        return self.arrays.link_params[self.id][1]
+
+    @property
+    def k(self) -> float:
+        return self.arrays.link_params[self.id][2]
+
+    @property
+    def p(self) -> float:
+        return self.arrays.link_params[self.id][3]
+
+    @property
+    def flow(self) -> float:
+        return self.arrays.flow_list[self.id]
+
+    @property
+    def cost(self) -> float:
+        arrays = self.arrays
+        if arrays.dirty_links:
+            arrays.RefreshCosts()
+        return arrays.cost_list[self.id]
+
+    @property
+    def cost_der(self) -> float:
+        arrays = self.arrays
+        if arrays.dirty_links:
+            arrays.RefreshCosts()
+        return arrays.cost_der_list[self.id]
+
+    @property
+    def reverse_id(self) -> int:
+        return self.arrays.reverse_link_list[self.id]
 
     def AddFlow(self, delta_flow: float):
         # Add flow to the link and update cost and cost derivative
-        new_flow = self.flow + delta_flow
-        if new_flow <= ZERO_FLOW:
-            self.flow = 0.0
-            self.cost = self.fft
-            self.cost_der = 0.0
-            return
-        self.flow = new_flow
-        self.cost = self.CostFormula(new_flow)
-        self.cost_der = self.CostDerivativeFormula(new_flow)
+        if METRICS:
+            metrics.Add(ADD_FLOW_CALLS)
+        self.arrays.AddFlow(self.id, delta_flow)
 
     def CostFormula(self, x: float) -> float:
-        # Use only when calculating new link cost or checking link cost for new flow
-        return self.fft * (1 + self.b * math.pow(x / self.k, self.p))
+        # Use only when calculating new link cost or checking link cost for
+        # new flow
+        return self.arrays.CostFormula(self.id, x)
 
     def CostDerivativeFormula(self, x: float) -> float:
-        # Use only when calculating new link cost derivative or checking link cost derivative for new flow
-        return self.fft * self.b * self.p * math.pow(x / self.k, self.p - 1)
+        # Use only when calculating new link cost derivative or checking link
+        # cost derivative for new flow
+        return self.arrays.CostDerivativeFormula(self.id, x)
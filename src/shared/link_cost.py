@@ -0,0 +1,69 @@
+"""
+Link cost - BPR link performance function
+
+cost(x) = fft * (1 + b * (x / capacity) ^ power)
+cost'(x) = fft * b * power * (x / capacity) ^ (power - 1)
+
+The scalar and the vectorized versions evaluate the same expressions in the
+same order. The most common power 4 is evaluated with multiplications
+instead of pow, there both give bit-identical results. Other powers may
+differ in the last bit, as math.pow and np.power round differently.
+"""
+import math
+from typing import Tuple
+
+import numpy as np
+
+from src.shared.consts import ZERO_FLOW
+
+
+def bpr_link_cost(
+    flow: float,
+    fft: float,
+    b: float,
+    capacity: float,
+    power: float
+) -> Tuple[float, float]:
+    if flow <= ZERO_FLOW:
+        return (fft, 0.0)
+    ratio = flow / capacity
+    if power == 4:
+        ratio_2 = ratio * ratio
+        ratio_p = ratio_2 * ratio_2
+        ratio_p_1 = ratio_2 * ratio
+    else:
+        ratio_p = math.pow(ratio, power)
+        ratio_p_1 = math.pow(ratio, power - 1)
+    return (fft * (1 + b * ratio_p), fft * b * power * ratio_p_1)
+
+
+def bpr_link_costs(
+    flow: np.ndarray,
+    fft: np.ndarray,
+    b: np.ndarray,
+    capacity: np.ndarray,
+    power: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    ratio = flow / capacity
+    power_4 = power == 4
+    # Empty links are overwritten below, pow of zero may warn for power < 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if power_4.all():
+            ratio_2 = ratio * ratio
+            ratio_p = ratio_2 * ratio_2
+            ratio_p_1 = ratio_2 * ratio
+        else:
+            ratio_p = np.power(ratio, power)
+            ratio_p_1 = np.power(ratio, power - 1)
+            if power_4.any():
+                ratio_2 = ratio[power_4] * ratio[power_4]
+                ratio_p[power_4] = ratio_2 * ratio_2
+                ratio_p_1[power_4] = ratio_2 * ratio[power_4]
+
+        cost = fft * (1 + b * ratio_p)
+        cost_der = fft * b * power * ratio_p_1
+
+    empty = flow <= ZERO_FLOW
+    cost[empty] = fft[empty]
+    cost_der[empty] = 0.0
+    return (cost, cost_der)
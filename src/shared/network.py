@@ -1,77 +1,156 @@
 """ Graph Class """
 import math
-from collections import defaultdict
-from operator import attrgetter
-from typing import Dict, List
+from heapq import heappop, heappush
+from typing import Any, Dict, Iterable, List, Tuple
 
+from src.shared.compact_network import CompactNetwork
+from src.shared.consts import METRICS
 from src.shared.graph import Graph
 from src.shared.link import Link
 from src.shared.node import Node
-from src.utils.link_utils import create_link_key
+from src.utils.metrics import (DIJKSTRA_CALLS, LINKS_SCANNED, NODES_SETTLED,
+                               metrics)
+from src.utils.phase_profiler import SHORTEST_PATHS, phase
 
 
 class Network(Graph):
     """
     Class used to store all graph info
+    Link and node data is kept in the CompactNetwork arrays, links and nodes
+    dicts are views over it.
     """
 
     def __init__(self, nodes, links):
         super().__init__()
-        self.links = self.CreateLinksDict(links)
-        self.nodes = self.CreateNodesDict(nodes)
-        self.n: int = int(nodes[-1][0])
-        self.outcoming_links_dict = self.GetAllOutcomingLinks()
-
-    def CreateLinksDict(self, links) -> Dict[str, Link]:
-        return dict(
-            map(lambda link: (
-                create_link_key(link[0], link[1]),
-                Link(*link)
-            ), links)
-        )
-
-    def CreateNodesDict(self, nodes) -> Dict[int, Node]:
-        return dict(
-            map(lambda node: (
-                int(node[0]),
-                Node(node[0])
-            ), nodes)
-        )
-
-    def BuildMinTree(self, origin_index: int = 1):
-        unvisited_nodes = [*self.nodes]
-        for node in self.nodes.values():
-            node.pi_min = math.inf
-            node.alpha_min = None
-
-        self.nodes[origin_index].pi_min = 0
-        current_min_node = self.nodes[origin_index]
-        while current_min_node is not None:
-            outcoming_links = self.outcoming_links_dict[current_min_node.index]
-            for link in outcoming_links:
-                tentative_value = current_min_node.pi_min + link.cost
-                neighbour = self.nodes[link.dest]
-                if tentative_value < neighbour.pi_min:
-                    neighbour.pi_min = tentative_value
-                    neighbour.alpha_min = link
-
-            unvisited_nodes.remove(current_min_node.index)
-            current_min_node = self.GetCurrentMinNode(unvisited_nodes)
-
-        return
-
-    def GetCurrentMinNode(self, unvisited_nodes: List[int]):
-        current_min_node = min(
-            [self.nodes[i] for i in unvisited_nodes],
-            key=attrgetter('pi_min'),
-            default=None
-        )
-
-        return current_min_node
+        self.arrays = CompactNetwork(nodes, links)
+        self.nodes_by_id = self.CreateNodesList()
+        self.links = self.CreateLinksDict()
+        self.nodes = self.CreateNodesDict()
+        self.n: int = int(self.arrays.node_index[-1])
+        # Plain list copies of the arrays read by SearchMinTree, they are much
+        # faster to index from a Python loop
+        self.search_out_offsets: List[int] = self.arrays.out_offsets.tolist()
+        self.search_out_links: List[int] = self.arrays.out_links.tolist()
+        self.search_link_dest: List[int] = self.arrays.link_dest.tolist()
+        self.search_link_dest_index: List[int] = (
+            self.arrays.node_index[self.arrays.link_dest].tolist())
+        self.search_node_index: List[int] = self.arrays.node_index.tolist()
+        # Links dict is keyed by the link id in order
+        self.search_links: List[Link] = list(self.links.values())
 
-    def GetAllOutcomingLinks(self) -> Dict[int, List[Link]]:
-        all_links = defaultdict(list)
-        for link in self.links.values():
-            all_links[link.src].append(link)
+    def CreateNodesList(self) -> List[Node]:
+        return [
+            Node(node_index, node_id)
+            for node_id, node_index in enumerate(
+                self.arrays.node_index.tolist())
+        ]
+
+    def CreateLinksDict(self) -> Dict[int, Link]:
+        nodes_by_id = self.nodes_by_id
+        return {
+            link_id: Link(
+                self.arrays, link_id, nodes_by_id[src_id], nodes_by_id[dest_id])
+            for (link_id, src_id, dest_id) in zip(
+                range(self.arrays.m),
+                self.arrays.link_src.tolist(),
+                self.arrays.link_dest.tolist()
+            )
+        }
+
+    def CreateNodesDict(self) -> Dict[int, Node]:
+        return {node.index: node for node in self.nodes_by_id}
+
+    def CreateNodeLabels(self, value: Any) -> List[Any]:
+        # Per node label list indexed directly by the node index
+        return [value] * self.arrays.node_id.size
+
+    @phase(SHORTEST_PATHS)
+    def BuildMinTree(
+        self,
+        origin_index: int = 1,
+        destinations: Iterable[int] | None = None
+    ) -> Tuple[List[float], List[Link | None]]:
+        """
+        Dijkstra's algorithm on a binary heap with lazy deletion.
+        Returns the pi_min and alpha_min labels indexed by the node index.
+        When destinations are given the search stops as soon as all of them
+        are settled. Labels of the nodes reached but not settled by then are
+        tentative, labels of the nodes not reached are left unset.
+        """
+        pi_min: List[float] = self.CreateNodeLabels(math.inf)
+        alpha_min: List[Link | None] = self.CreateNodeLabels(None)
+        remaining = None
+        if destinations is not None:
+            remaining = {self.nodes[index].id for index in destinations}
+
+        if remaining is None or remaining:
+            self.SearchMinTree(
+                self.nodes[origin_index].id, pi_min, alpha_min, remaining)
+        return (pi_min, alpha_min)
+
+    def SearchMinTree(
+        self,
+        origin_id: int,
+        pi_min: List[float],
+        alpha_min: List[Link | None],
+        remaining: set | None
+    ) -> None:
+        # Heap entries hold node ids, labels are indexed by the node index
+        cost = self.arrays.GetCostList()
+        out_offsets = self.search_out_offsets
+        out_links = self.search_out_links
+        link_dest = self.search_link_dest
+        link_dest_index = self.search_link_dest_index
+        node_index = self.search_node_index
+        links = self.search_links
+        pi_min[node_index[origin_id]] = 0
+        heap: List[Tuple[float, int]] = [(0, origin_id)]
+        if METRICS:
+            metrics.Add(DIJKSTRA_CALLS)
+        while heap:
+            node_pi, node_id = heappop(heap)
+            if node_pi > pi_min[node_index[node_id]]:
+                # stale heap entry, node was already settled with lower label
+                continue
 
-        return all_links
+            if METRICS:
+                metrics.Add(NODES_SETTLED)
+            if remaining is not None:
+                remaining.discard(node_id)
+                if not remaining:
+                    return
+
+            if METRICS:
+                metrics.Add(
+                    LINKS_SCANNED,
+                    out_offsets[node_id + 1] - out_offsets[node_id])
+
+            for position in range(
+                    out_offsets[node_id], out_offsets[node_id + 1]):
+                link_id = out_links[position]
+                tentative_value = node_pi + cost[link_id]
+                dest_index = link_dest_index[link_id]
+                if tentative_value < pi_min[dest_index]:
+                    pi_min[dest_index] = tentative_value
+                    alpha_min[dest_index] = links[link_id]
+                    heappush(heap, (tentative_value, link_dest[link_id]))
+
+    def GetLink(self, src: int | float, dest: int | float) -> Link | None:
+        src_node = self.nodes.get(int(src))
+        dest_node = self.nodes.get(int(dest))
+        if src_node is None or dest_node is None:
+            return None
+        link_id = self.arrays.GetLinkId(src_node.id, dest_node.id)
+        return self.links[link_id] if link_id >= 0 else None
+
+    def TotalTravelTime(self) -> float:
+        return self.arrays.TotalTravelTime()
+
+    def GetAllOutcomingLinks(self) -> Dict[int, List[Link]]:
+        return {
+            node.index: [
+                self.links[link_id]
+                for link_id in self.arrays.GetOutcomingLinks(node.id).tolist()
+            ]
+            for node in self.nodes_by_id
+        }
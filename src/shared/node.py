@@ -1,20 +1,17 @@
 """Node"""
 
 
-import math
-
-from src.shared.link import Link
-
-
 class Node:
-    """Node class"""
+    """
+    Node class
+    Holds only the identity of the node, shortest path labels are kept per
+    bush (see BushGraph) or returned by Network.BuildMinTree.
+    """
+    __slots__ = ('index', 'id')
 
-    def __init__(self, index: int | float):
+    def __init__(self, index: int | float, node_id: int):
         self.index = int(index)
-        self.pi_max: float = -math.inf
-        self.pi_min: float = math.inf
-        self.alpha_max: Link | None = None
-        self.alpha_min: Link | None = None
+        self.id = node_id
 
     def __getitem__(self, item: str):
         return getattr(self, item)
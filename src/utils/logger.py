@@ -2,11 +2,13 @@
 import logging
 import math
 from io import TextIOWrapper
-from typing import Any, Dict, Literal
+from typing import Dict, Literal
 
-from src.shared.graph import Graph
+import numpy as np
+
+from src.shared.bush_graph import BushGraph
 from src.shared.link import Link
-from src.shared.node import Node
+from src.shared.network import Network
 from src.utils.link_utils import create_link_key
 
 
@@ -16,28 +18,38 @@ class Logger:
     @staticmethod
     def LogFlow(links: Dict[int, Link]) -> None:
         logging.basicConfig(level=logging.DEBUG)
-        for key, link in links.items():
-            logging.debug("%s: %s", key, link.flow)
+        for link in links.values():
+            logging.debug(
+                "%s: %s", create_link_key(link.src, link.dest), link.flow)
 
     @staticmethod
     def LogCosts(links: Dict[int, Link]) -> None:
         logging.basicConfig(level=logging.DEBUG)
-        for key, link in links.items():
-            logging.debug("%s: %s", key, link.cost)
+        for link in links.values():
+            logging.debug(
+                "%s: %s", create_link_key(link.src, link.dest), link.cost)
 
     @staticmethod
     def LogGraphLinks(links: Dict[int, Link]) -> None:
         logging.basicConfig(level=logging.DEBUG)
         logging.debug("Links:")
         logging.debug("source_target: c(flow) = cost")
-        for key, link in links.items():
-            logging.debug("%s: c(%s) = %s", key, link.flow, link.cost)
+        for link in links.values():
+            logging.debug(
+                "%s: c(%s) = %s",
+                create_link_key(link.src, link.dest),
+                link.flow,
+                link.cost
+            )
         logging.debug("\n")
 
     @staticmethod
-    def LogGraphNodes(nodes: Dict[int, Node]) -> None:
+    def LogGraphNodes(graph: BushGraph) -> None:
         logging.basicConfig(level=logging.DEBUG)
-        log_string = "{node_index}: max: {alpha_max} ({pi_max}), min: {alpha_min} ({pi_min})"
+        log_string = (
+            "{node_index}: max: {alpha_max} ({pi_max}), "
+            "min: {alpha_min} ({pi_min})"
+        )
         default_message_params = {
             "node_index": -1,
             "pi_max": -1,
@@ -47,17 +59,19 @@ class Logger:
         }
         logging.debug(
             "node_index: max: alpha_max (pi_max), min: alpha_min (pi_min)")
-        for node in nodes.values():
+        for node_index in graph.nodes:
             message_params = default_message_params
-            message_params["node_index"] = node.index
-            message_params["pi_max"] = node.pi_max
-            message_params["pi_min"] = node.pi_min
-            alpha_max = node.alpha_max
-            alpha_min = node.alpha_min
+            message_params["node_index"] = node_index
+            message_params["pi_max"] = graph.pi_max[node_index]
+            message_params["pi_min"] = graph.pi_min[node_index]
+            alpha_max = graph.alpha_max[node_index]
+            alpha_min = graph.alpha_min[node_index]
             if alpha_max:
-                message_params["alpha_max"] = f"{node.alpha_max.src}_{node.alpha_max.dest}"
+                message_params["alpha_max"] = (
+                    f"{alpha_max.src}_{alpha_max.dest}")
             if alpha_min:
-                message_params["alpha_min"] = f"{node.alpha_min.src}_{node.alpha_min.dest}"
+                message_params["alpha_min"] = (
+                    f"{alpha_min.src}_{alpha_min.dest}")
             logging.debug(
                 log_string,
                 message_params["node_index"],
@@ -69,31 +83,29 @@ class Logger:
 
     @staticmethod
     def LogPaths(
-        nodes: Dict[int, Node],
+        graph: BushGraph,
         path_prop: Literal["min", "max"],
         origin_index: int = 1
     ) -> None:
-        path_prop_name = f"alpha_{path_prop}"
-        for node in nodes.values():
-            current_node = node
-            origin_node = nodes[origin_index]
+        alpha = graph.alpha_min if path_prop == "min" else graph.alpha_max
+        for node_index in graph.nodes:
+            current_index = node_index
             path = []
-            while current_node.index != origin_node.index:
-                path.append(current_node.index)
-                if current_node[path_prop_name] is None:
+            while current_index != origin_index:
+                path.append(current_index)
+                path_link: Link | None = alpha[current_index]
+                if path_link is None:
                     break
-                path_link: Link = current_node[path_prop_name]
-                next_index = path_link.src
-                current_node = nodes[next_index]
+                current_index = path_link.src
             path.append(origin_index)
-            logging.debug("%s.NODE %s path: %s", node.index, path_prop, path)
+            logging.debug("%s.NODE %s path: %s", node_index, path_prop, path)
         logging.debug("\n")
 
     @staticmethod
-    def LogSolution(solution: Any) -> None:
+    def LogSolution(solution: np.ndarray) -> None:
         logging.basicConfig(level=logging.DEBUG)
         logging.debug("Solution:")
-        for link in solution.values:
+        for link in solution:
             logging.debug(
                 "%s_%s: c(%s = %s)",
                 int(link[0]),
@@ -103,15 +115,18 @@ class Logger:
             )
 
     @staticmethod
-    def CompareSolution(solution: Any, graph: Graph) -> None:
+    def CompareSolution(solution: np.ndarray, graph: Network) -> None:
         logging.basicConfig(level=logging.DEBUG)
         logging.debug("Compare Solution:")
         logging.debug(
-            "source_target: c(calculated_flow | solution_flow) = calculated_cost | solution_cost")
-        for link in solution.values:
-            link_key = f"{int(link[0])}_{int(link[1])}"
-            graph_link = graph.links[link_key]
-            if abs(graph_link.flow - link[2]) > 1:
+            "source_target: c(calculated_flow | solution_flow) = "
+            "calculated_cost | solution_cost")
+        for link in solution:
+            link_key = create_link_key(link[0], link[1])
+            graph_link = graph.GetLink(link[0], link[1])
+            if graph_link is None:
+                logging.debug("%s: missing from the network", link_key)
+            elif abs(graph_link.flow - link[2]) > 1:
                 logging.debug(
                     "%s: %s c(%s | %s)",
                     link_key,
@@ -121,23 +136,33 @@ class Logger:
                 )
 
     @staticmethod
-    def CompareSolutionToFile(solution: Any, graph: Graph, file: TextIOWrapper) -> None:
-        for link in solution.values:
-            link_key = f"{int(link[0])}_{int(link[1])}"
-            graph_link = graph.links[link_key]
-            file.write(
-                f"{link_key},{math.fabs(graph_link.flow - link[2])}\n")
+    def CompareSolutionToFile(
+        solution: np.ndarray,
+        graph: Network,
+        file: TextIOWrapper
+    ) -> None:
+        for link in solution:
+            link_key = create_link_key(link[0], link[1])
+            graph_link = graph.GetLink(link[0], link[1])
+            # A link missing from the network differs infinitely
+            diff = math.inf
+            if graph_link is not None:
+                diff = math.fabs(graph_link.flow - link[2])
+            file.write(f"{link_key},{diff}\n")
 
     @staticmethod
-    def TestSolution(solution: Any, graph: Graph) -> None:
+    def TestSolution(solution: np.ndarray, graph: Network) -> None:
         logging.basicConfig(level=logging.DEBUG)
         logging.debug("Testing solution...")
         max_dif = 0
-        error_message = "Expected link ({src}_{dest}) flow to be {flow_calc}, got {flow}."
+        error_message = (
+            "Expected link ({src}_{dest}) flow to be {flow_calc}, got {flow}.")
         try:
-            for link in solution.values:
-                link_key = create_link_key(link[0], link[1])
-                graph_link = graph.links[link_key]
+            for link in solution:
+                graph_link = graph.GetLink(link[0], link[1])
+                assert graph_link is not None, (
+                    f"Link ({create_link_key(link[0], link[1])}) "
+                    "is missing from the network.")
                 diff = abs(graph_link.flow - link[2])
                 max_dif = max(max_dif, diff)
                 error_message_params = {
@@ -156,10 +181,10 @@ class Logger:
         )
 
     @staticmethod
-    def LogNodesDifference(nodes: Dict[int, Node]) -> None:
+    def LogNodesDifference(graph: BushGraph) -> None:
         logging.basicConfig(level=logging.DEBUG)
-        for node in nodes.values():
-            pi_max = node.pi_max
-            pi_min = node.pi_min
+        for node_index in graph.nodes:
+            pi_max = graph.pi_max[node_index]
+            pi_min = graph.pi_min[node_index]
             diff = pi_max - pi_min
-            logging.debug("%s: %s - %s = %s", node.index, pi_max, pi_min, diff)
+            logging.debug("%s: %s - %s = %s", node_index, pi_max, pi_min, diff)
@@ -0,0 +1,77 @@
+"""
+Metrics - hot path operation counters
+
+Call sites guard the counting with the METRICS const, so with metrics off
+the only cost is a check of a module constant:
+
+    if METRICS:
+        metrics.Add(DIJKSTRA_CALLS)
+
+Gauges are set once per iteration instead, to the value at its end.
+Counters and gauges are reported per iteration as CSV rows or JSON lines.
+"""
+import json
+from io import TextIOWrapper
+from typing import Dict
+
+from src.shared.consts import METRICS
+
+DIJKSTRA_CALLS = 'dijkstra_calls'
+NODES_SETTLED = 'nodes_settled'
+LINKS_SCANNED = 'links_scanned'
+ADD_FLOW_CALLS = 'add_flow_calls'
+PAS_CREATED = 'pas_created'
+PAS_REUSED = 'pas_reused'
+PAS_DELETED = 'pas_deleted'
+PAS_EVICTED = 'pas_evicted'
+PAS_SEARCH_EXPANSIONS = 'pas_search_expansions'
+CYCLES_REMOVED = 'cycles_removed'
+BUSH_LINKS_ADDED = 'bush_links_added'
+BUSH_LINKS_REMOVED = 'bush_links_removed'
+PAS_POOL_SIZE = 'pas_pool_size'
+PAS_POOL_MEMORY = 'pas_pool_memory'
+COUNTERS = (
+    DIJKSTRA_CALLS, NODES_SETTLED, LINKS_SCANNED, ADD_FLOW_CALLS,
+    PAS_CREATED, PAS_REUSED, PAS_DELETED, PAS_EVICTED, PAS_SEARCH_EXPANSIONS,
+    CYCLES_REMOVED, BUSH_LINKS_ADDED, BUSH_LINKS_REMOVED,
+    PAS_POOL_SIZE, PAS_POOL_MEMORY,
+)
+
+
+class Metrics:
+    """ Counters since the last TakeSnapshot call and the last set gauges """
+
+    def __init__(self) -> None:
+        self.counters: Dict[str, int] = dict.fromkeys(COUNTERS, 0)
+
+    def Add(self, name: str, value: int = 1) -> None:
+        self.counters[name] += value
+
+    def Set(self, name: str, value: int) -> None:
+        self.counters[name] = value
+
+    def TakeSnapshot(self) -> Dict[str, int]:
+        counters = self.counters
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        return counters
+
+
+metrics = Metrics()
+
+
+def write_metrics_header(file: TextIOWrapper) -> None:
+    if METRICS == 'csv':
+        file.write(f"iteration,{','.join(COUNTERS)}\n")
+
+
+def write_metrics(
+    file: TextIOWrapper,
+    iteration_count: int,
+    counters: Dict[str, int]
+) -> None:
+    if METRICS == 'json':
+        file.write(
+            json.dumps({'iteration': iteration_count, **counters}) + '\n')
+    else:
+        values = ','.join(str(counters[name]) for name in COUNTERS)
+        file.write(f"{iteration_count},{values}\n")
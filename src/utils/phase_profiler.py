@@ -0,0 +1,92 @@
+"""
+Phase profiler - wall time of the solver phases per iteration
+
+Methods decorated with `phase` report into the shared `profiler`. Time is
+charged to the innermost running phase, so the phases of an iteration add up
+to its duration and time outside of every phase is counted as `other`.
+Absorbing phases are the exception: everything timed inside them, like the
+shortest paths and trees of the gap evaluation, is charged to them.
+With PROFILE_PHASES off the decorator returns the method unchanged.
+"""
+from functools import wraps
+from io import TextIOWrapper
+from time import perf_counter
+from typing import Callable, Dict, List, TypeVar
+
+from src.shared.consts import PROFILE_PHASES
+
+SHORTEST_PATHS = 'shortest_paths'
+TREES = 'trees'
+TOPO_SORT = 'topo_sort'
+IMPROVE = 'improve'
+FLOW_SHIFT = 'flow_shift'
+PAS = 'pas'
+GAPS = 'gaps'
+OTHER = 'other'
+PHASES = (
+    SHORTEST_PATHS, TREES, TOPO_SORT, IMPROVE, FLOW_SHIFT, PAS, GAPS, OTHER)
+ABSORBING_PHASES = frozenset((GAPS,))
+
+Function = TypeVar('Function', bound=Callable)
+
+
+class PhaseProfiler:
+    """ Times of the phases since the last TakeTimes call """
+
+    def __init__(self) -> None:
+        self.times: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.running: List[str] = [OTHER]
+        self.mark = perf_counter()
+
+    def Charge(self) -> None:
+        now = perf_counter()
+        self.times[self.running[-1]] += now - self.mark
+        self.mark = now
+
+    def Enter(self, name: str) -> None:
+        self.Charge()
+        if self.running[-1] in ABSORBING_PHASES:
+            name = self.running[-1]
+        self.running.append(name)
+
+    def Exit(self) -> None:
+        self.Charge()
+        self.running.pop()
+
+    def TakeTimes(self) -> Dict[str, float]:
+        self.Charge()
+        times = self.times
+        self.times = dict.fromkeys(PHASES, 0.0)
+        return times
+
+
+profiler = PhaseProfiler()
+
+
+def phase(name: str) -> Callable[[Function], Function]:
+    def decorator(function: Function) -> Function:
+        if not PROFILE_PHASES:
+            return function
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            profiler.Enter(name)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.Exit()
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+
+def write_phases_header(file: TextIOWrapper) -> None:
+    file.write(f"iteration,{','.join(PHASES)}\n")
+
+
+def write_phases(
+    file: TextIOWrapper,
+    iteration_count: int,
+    times: Dict[str, float]
+) -> None:
+    values = ','.join(str(times[name]) for name in PHASES)
+    file.write(f"{iteration_count},{values}\n")
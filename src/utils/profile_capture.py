@@ -0,0 +1,52 @@
+"""
+Profile capture - cProfile of a single run
+
+Collects a cProfile profile across Start/Stop pairs and writes it as
+`<name>.prof`, for snakeviz, together with a `<name>.txt` summary of the
+hottest functions.
+"""
+import cProfile
+import io
+import os
+import pstats
+from typing import Tuple
+
+PROFILE_DIR = os.path.join(
+    os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.realpath(__file__)))),
+    'tmp'
+)
+
+
+class ProfileCapture:
+    """ cProfile profile that can be paused and resumed """
+
+    def __init__(self, top: int = 30) -> None:
+        self.profile = cProfile.Profile()
+        self.top = top
+        self.running = False
+
+    def Start(self) -> None:
+        if not self.running:
+            self.profile.enable()
+            self.running = True
+
+    def Stop(self) -> None:
+        if self.running:
+            self.profile.disable()
+            self.running = False
+
+    def Write(self, name: str, directory: str = PROFILE_DIR) -> Tuple[str, str]:
+        """ Writes the profile and its summary, returns both file names """
+        self.Stop()
+        os.makedirs(directory, exist_ok=True)
+        profile_file_name = os.path.join(directory, f'{name}.prof')
+        summary_file_name = os.path.join(directory, f'{name}.txt')
+        self.profile.dump_stats(profile_file_name)
+        summary = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=summary).strip_dirs()
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        with open(summary_file_name, 'w', encoding='utf-8') as file:
+            file.write(summary.getvalue())
+        return (profile_file_name, summary_file_name)
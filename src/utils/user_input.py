@@ -8,7 +8,8 @@ def wrong_option():
 
 class UserInput:
     """
-    Class used for the getting user input and displaying initial messages to the user.
+    Class used for the getting user input and displaying initial messages to
+    the user.
     """
     @staticmethod
     def GetAlgorithm() -> int:
@@ -0,0 +1,73 @@
+""" Bush flow store """
+import copy
+import random
+import unittest
+
+import numpy as np
+
+from src.shared.bush_flow_store import BushFlowStore
+
+LINKS = 40
+ORIGINS = 5
+
+
+class BushFlowStoreTest(unittest.TestCase):
+    """ The sparse store holds the same flows as the dense one """
+
+    def setUp(self):
+        self.dense = BushFlowStore(LINKS, ORIGINS, 'dense')
+        self.sparse = BushFlowStore(LINKS, ORIGINS, 'sparse')
+        self.dense_flows = [
+            self.dense.CreateBushFlow() for _ in range(ORIGINS)]
+        self.sparse_flows = [
+            self.sparse.CreateBushFlow() for _ in range(ORIGINS)]
+
+    def assert_same_flows(self):
+        for (dense_flow, sparse_flow) in zip(
+                self.dense_flows, self.sparse_flows):
+            for link_id in range(LINKS):
+                self.assertEqual(sparse_flow[link_id], dense_flow[link_id])
+                self.assertIs(type(dense_flow[link_id]), float)
+        np.testing.assert_array_equal(
+            self.sparse.GetLinkFlows(), self.dense.GetLinkFlows())
+
+    def test_random_updates(self):
+        generator = random.Random(7)
+        for _ in range(2000):
+            origin = generator.randrange(ORIGINS)
+            link_id = generator.randrange(LINKS)
+            if generator.random() < 0.2:
+                self.dense.ClearFlow(self.dense_flows[origin], link_id)
+                self.sparse.ClearFlow(self.sparse_flows[origin], link_id)
+            else:
+                flow = generator.uniform(0.0, 100.0)
+                self.dense_flows[origin][link_id] = flow
+                self.sparse_flows[origin][link_id] = flow
+        self.assert_same_flows()
+
+    def test_sparse_keeps_only_links_with_flow(self):
+        sparse_flow = self.sparse_flows[0]
+        sparse_flow[7] = 1.5
+        sparse_flow[3] = 2.5
+        sparse_flow[7] = 4.0
+        self.assertEqual(list(sparse_flow.link_ids), [3, 7])
+        self.sparse.ClearFlow(sparse_flow, 3)
+        self.sparse.ClearFlow(sparse_flow, 11)
+        self.assertEqual(list(sparse_flow.link_ids), [7])
+        self.assertEqual(sparse_flow[3], 0.0)
+
+    def test_dense_store_is_full(self):
+        with self.assertRaises(ValueError):
+            self.dense.CreateBushFlow()
+
+    def test_deep_copy_of_dense_rows(self):
+        self.dense_flows[2][5] = 3.0
+        copied = copy.deepcopy(self.dense)
+        copied.bush_flows[2][5] = 9.0
+        self.assertEqual(copied.flows[2, 5], 9.0)
+        self.assertEqual(self.dense_flows[2][5], 3.0)
+        self.assertEqual(self.dense.GetBushFlowIndex(self.dense_flows[4]), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+""" Parallel Algorithm B """
+import unittest
+
+import src.data.data as data
+from src.algorithms.b.algorithm_b import AlgorithmB
+
+
+class BushWorkerPoolTest(unittest.TestCase):
+    """ One worker and one batch follow the sequential iterations """
+
+    def assert_same_as_sequential(self, city_name: str, iterations: int):
+        (demands, nodes, links, _) = data.import_data_for_city(city_name)
+        sequential = AlgorithmB(
+            nodes.values.tolist(), links.values.tolist(), demands, 1e-14, 0)
+        parallel = AlgorithmB(
+            nodes.values.tolist(), links.values.tolist(), demands, 1e-14, 1)
+        try:
+            for _ in range(iterations):
+                sequential.Iteration()
+                parallel.Iteration()
+                self.assertEqual(parallel.GetGaps(), sequential.GetGaps())
+        finally:
+            parallel.Close()
+
+    def test_braess(self):
+        self.assert_same_as_sequential('Braess', 3)
+
+    def test_nine_nodes(self):
+        self.assert_same_as_sequential('NineNodes', 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+""" Dataset cache """
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.data import cache
+from src.shared.demand_matrix import DemandMatrix
+
+CITY = 'Tiny'
+
+
+def compiled_city():
+    demands = DemandMatrix.FromDense(np.array([[0.0, 4.0], [2.0, 0.0]]))
+    nodes = np.array([[1.0, 0.0, 0.0], [2.0, 1.0, 0.0]])
+    links = np.array([[1.0, 2.0, 100.0, 1.0, 6.0, 0.15, 4.0]])
+    solution = np.array([[1.0, 2.0, 4.0, 7.0]])
+    return (demands, nodes, links, solution)
+
+
+class CacheTest(unittest.TestCase):
+    """ Cache of the compiled TNTP files of a city """
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.city_dir = os.path.join(self.temp_dir.name, CITY)
+        os.makedirs(self.city_dir)
+        for suffix in ('net', 'node', 'trips'):
+            self.write_source(suffix, f'{suffix}\n')
+        self.cache_dir = os.path.join(self.city_dir, cache.CACHE_DIR)
+        self.compile_city = mock.Mock(
+            side_effect=lambda city_name: compiled_city())
+        for patcher in (
+            mock.patch.object(
+                cache, 'get_city_dir', return_value=self.city_dir),
+            mock.patch.object(cache, 'ensure_dataset'),
+            mock.patch.object(cache, 'compile_city', self.compile_city),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_source(self, suffix, text):
+        file_name = os.path.join(self.city_dir, f'{CITY}_{suffix}.tntp')
+        with open(file_name, 'w', encoding='utf-8') as file:
+            file.write(text)
+        return file_name
+
+    def load(self):
+        return cache.load_data_for_city(CITY, use_cache=True)
+
+    def assert_city(self, city):
+        (demands, nodes, links, solution) = city
+        (expected_demands, expected_nodes, expected_links,
+         expected_solution) = compiled_city()
+        np.testing.assert_array_equal(
+            demands.ToDense(), expected_demands.ToDense())
+        np.testing.assert_array_equal(nodes, expected_nodes)
+        np.testing.assert_array_equal(links, expected_links)
+        np.testing.assert_array_equal(solution, expected_solution)
+
+    def test_hit(self):
+        self.assert_city(self.load())
+        city = self.load()
+        self.assertEqual(self.compile_city.call_count, 1)
+        self.assert_city(city)
+        self.assertIsInstance(city[2], np.memmap)
+
+    def test_rebuild_after_size_change(self):
+        self.load()
+        self.write_source('net', 'net with more links\n')
+        self.assert_city(self.load())
+        self.assertEqual(self.compile_city.call_count, 2)
+        self.load()
+        self.assertEqual(self.compile_city.call_count, 2)
+
+    def test_rebuild_after_modification_time_change(self):
+        self.load()
+        file_name = os.path.join(self.city_dir, f'{CITY}_trips.tntp')
+        file_stat = os.stat(file_name)
+        os.utime(
+            file_name,
+            ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 10 ** 9))
+        self.load()
+        self.assertEqual(self.compile_city.call_count, 2)
+
+    def test_rebuild_after_optional_source_appears(self):
+        self.load()
+        self.write_source('flow', 'flow\n')
+        self.load()
+        self.assertEqual(self.compile_city.call_count, 2)
+
+    def test_version_mismatch(self):
+        self.load()
+        version = cache.CACHE_VERSION + 1
+        with mock.patch.object(cache, 'CACHE_VERSION', version):
+            self.assert_city(self.load())
+            self.assertEqual(self.compile_city.call_count, 2)
+            self.load()
+        self.assertEqual(self.compile_city.call_count, 2)
+
+    def test_missing_meta_file(self):
+        self.load()
+        os.remove(os.path.join(self.cache_dir, cache.META_FILE))
+        self.assert_city(self.load())
+        self.assertEqual(self.compile_city.call_count, 2)
+
+    def test_missing_array(self):
+        self.load()
+        os.remove(os.path.join(self.cache_dir, 'links.npy'))
+        self.assert_city(self.load())
+        self.assertEqual(self.compile_city.call_count, 2)
+
+    def test_half_written_cache(self):
+        self.load()
+        self.write_source('net', 'net with more links\n')
+        save = np.save
+        saved = []
+
+        def failing_save(file_name, array):
+            # The disk fills up after the first array
+            if saved:
+                raise OSError("No space left on device")
+            saved.append(file_name)
+            save(file_name, array)
+
+        with mock.patch.object(np, 'save', failing_save):
+            self.assert_city(self.load())
+        self.assertFalse(
+            os.path.exists(os.path.join(self.cache_dir, cache.META_FILE)))
+        self.assert_city(self.load())
+        self.assertEqual(self.compile_city.call_count, 3)
+        self.load()
+        self.assertEqual(self.compile_city.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+""" Gap check schedule """
+import unittest
+
+from src.shared.convergence import GapSchedule
+
+
+def checks(schedule: GapSchedule, gaps, iterations: int):
+    # Iterations with a gap check, gaps[i] is the gap after iteration i
+    checked = []
+    next_check = 0
+    for iteration in range(iterations):
+        if iteration == next_check:
+            checked.append(iteration)
+            next_check = schedule.NextCheck(iteration, gaps[iteration])
+    return checked
+
+
+class GapScheduleTest(unittest.TestCase):
+    """ Iterations after which the gaps are calculated """
+
+    def test_every_iteration_by_default(self):
+        schedule = GapSchedule(1e-6, 'every', 1)
+        gaps = [0.5 ** i for i in range(10)]
+        self.assertEqual(checks(schedule, gaps, 10), list(range(10)))
+
+    def test_every_interval(self):
+        schedule = GapSchedule(1e-6, 'every', 3)
+        gaps = [0.5 ** i for i in range(10)]
+        self.assertEqual(checks(schedule, gaps, 10), [0, 3, 6, 9])
+
+    def test_adaptive_skips_to_the_expected_iteration(self):
+        # Halving gap needs 9 more iterations from 0.5 to 1e-3
+        schedule = GapSchedule(1e-3, 'adaptive', 100)
+        self.assertEqual(schedule.NextCheck(0, 1.0), 1)
+        self.assertEqual(schedule.NextCheck(1, 0.5), 10)
+
+    def test_adaptive_is_limited_by_the_interval(self):
+        schedule = GapSchedule(1e-3, 'adaptive', 4)
+        gaps = [0.5 ** i for i in range(12)]
+        self.assertEqual(checks(schedule, gaps, 12), [0, 1, 5, 9, 10, 11])
+
+    def test_adaptive_without_decrease_checks_again(self):
+        schedule = GapSchedule(1e-3, 'adaptive', 10)
+        schedule.NextCheck(0, 0.5)
+        self.assertEqual(schedule.NextCheck(1, 0.5), 2)
+        self.assertEqual(schedule.NextCheck(2, 0.75), 3)
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            GapSchedule(1e-3, 'sometimes', 1)
+        with self.assertRaises(ValueError):
+            GapSchedule(1e-3, 'every', 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
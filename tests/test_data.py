@@ -0,0 +1,49 @@
+""" Trips file parsing """
+import io
+import unittest
+
+import numpy as np
+
+from src.data.data import read_matrix
+
+TRIPS = (
+    "Origin 1\n"
+    "    1 :      0.0;     2 :    100.0;\n"
+    "Origin 2\n"
+    "    1 :     50.0;\n"
+)
+
+
+class ReadMatrixTest(unittest.TestCase):
+    """ read_matrix with and without complete metadata """
+
+    def test_without_metadata_zones_come_from_origins(self):
+        matrix = read_matrix(io.StringIO(TRIPS))
+        self.assertEqual(matrix.zones, 2)
+        np.testing.assert_array_equal(
+            matrix.ToDense(), [[0.0, 100.0], [50.0, 0.0]])
+
+    def test_metadata_without_end_marker(self):
+        matrix = read_matrix(io.StringIO(
+            "<NUMBER OF ZONES> 3\n"
+            "<TOTAL OD FLOW> 150.0\n"
+            "~ no end marker\n"
+            f"{TRIPS}"
+        ))
+        self.assertEqual(matrix.zones, 3)
+        np.testing.assert_array_equal(
+            matrix.ToDense(),
+            [[0.0, 100.0, 0.0], [50.0, 0.0, 0.0], [0.0, 0.0, 0.0]])
+
+    def test_metadata_with_end_marker(self):
+        matrix = read_matrix(io.StringIO(
+            "<NUMBER OF ZONES> 2\n"
+            "<END OF METADATA>\n\n\n"
+            f"{TRIPS}"
+        ))
+        self.assertEqual(matrix.zones, 2)
+        self.assertEqual(matrix.Total(), 150.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+""" Demand matrix """
+import unittest
+
+import numpy as np
+
+from src.shared.demand_matrix import DemandMatrix
+
+DENSE = np.array([
+    [0.0, 10.0, 0.0, 5.0],
+    [0.0, 0.0, 0.0, 0.0],
+    [7.5, 0.0, 0.0, 2.0],
+    [0.0, 1.0, 3.0, 0.0],
+])
+
+
+class DemandMatrixTest(unittest.TestCase):
+    """ The sparse matrix answers the same as the dense one """
+
+    def setUp(self):
+        self.matrix = DemandMatrix.FromDense(DENSE)
+
+    def test_dense_round_trip(self):
+        np.testing.assert_array_equal(self.matrix.ToDense(), DENSE)
+
+    def test_rows_hold_the_non_zero_demands(self):
+        for origin in range(1, 5):
+            (destinations, demands) = self.matrix.GetRow(origin)
+            row = DENSE[origin - 1]
+            self.assertEqual(destinations, (np.flatnonzero(row) + 1).tolist())
+            self.assertEqual(demands, row[row != 0].tolist())
+
+    def test_demands(self):
+        for origin in range(1, 5):
+            for destination in range(1, 5):
+                self.assertEqual(
+                    self.matrix.GetDemand(origin, destination),
+                    DENSE[origin - 1, destination - 1])
+        self.assertEqual(self.matrix.GetDemand(0, 1), 0.0)
+        self.assertEqual(self.matrix.GetDemand(5, 1), 0.0)
+
+    def test_origins_without_demand_are_skipped(self):
+        self.assertEqual(self.matrix.GetOrigins(), [1, 3, 4])
+        self.assertEqual(self.matrix.Total(), DENSE.sum())
+
+    def test_memory_grows_with_the_non_zero_demands(self):
+        # offsets per zone and a destination and a value per OD pair
+        self.assertEqual(self.matrix.MemoryUsage(), 5 * 8 + 6 * 4 + 6 * 8)
+        zones = 1000
+        sparse = np.zeros((zones, zones))
+        sparse[np.arange(zones), np.arange(zones)[::-1]] = 1.0
+        self.assertLess(
+            DemandMatrix.FromDense(sparse).MemoryUsage(), sparse.nbytes / 100)
+
+    def test_later_rows_and_demands_win(self):
+        matrix = DemandMatrix.FromRows(3, [
+            (1, np.array([2, 3]), np.array([1.0, 2.0])),
+            (2, np.array([1, 1]), np.array([4.0, 6.0])),
+            (1, np.array([3, 2, 3]), np.array([5.0, 0.0, 8.0])),
+        ])
+        np.testing.assert_array_equal(
+            matrix.ToDense(),
+            [[0.0, 0.0, 8.0], [6.0, 0.0, 0.0], [0.0, 0.0, 0.0]])
+
+
+if __name__ == '__main__':
+    unittest.main()
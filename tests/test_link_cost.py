@@ -0,0 +1,69 @@
+""" BPR link cost """
+import unittest
+
+import numpy as np
+
+from src.shared.consts import ZERO_FLOW
+from src.shared.link_cost import bpr_link_cost, bpr_link_costs
+
+FLOWS = [0.0, ZERO_FLOW / 2, ZERO_FLOW, 1e-3, 12.5, 99.0, 250.0, 1234.5]
+
+
+class BprLinkCostTest(unittest.TestCase):
+    """ The vectorized kernel gives the same results as the scalar one """
+
+    def assert_same_as_scalar(self, fft, b, capacity, power, exact=True):
+        flow = np.array(FLOWS)
+        (costs, cost_ders) = bpr_link_costs(
+            flow,
+            np.full(flow.size, fft),
+            np.full(flow.size, b),
+            np.full(flow.size, capacity),
+            np.full(flow.size, power)
+        )
+        expected = np.array(
+            [bpr_link_cost(x, fft, b, capacity, power) for x in FLOWS])
+        if exact:
+            np.testing.assert_array_equal(costs, expected[:, 0])
+            np.testing.assert_array_equal(cost_ders, expected[:, 1])
+        else:
+            np.testing.assert_allclose(costs, expected[:, 0], rtol=1e-14)
+            np.testing.assert_allclose(cost_ders, expected[:, 1], rtol=1e-14)
+
+    def test_power_4(self):
+        self.assert_same_as_scalar(6.0, 0.15, 100.0, 4.0)
+
+    def test_other_powers(self):
+        # pow of numpy and of the math module may round differently
+        for power in (1.0, 2.0, 2.5, 0.5):
+            with self.subTest(power=power):
+                self.assert_same_as_scalar(
+                    6.0, 0.15, 100.0, power, exact=False)
+
+    def test_mixed_powers(self):
+        powers = np.array([4.0, 1.0, 4.0, 2.5, 4.0, 0.5, 4.0, 3.0])
+        flow = np.array(FLOWS)
+        fft = np.linspace(1.0, 8.0, flow.size)
+        b = np.full(flow.size, 0.15)
+        capacity = np.linspace(50.0, 400.0, flow.size)
+        (costs, cost_ders) = bpr_link_costs(flow, fft, b, capacity, powers)
+        for i in range(flow.size):
+            expected = bpr_link_cost(
+                FLOWS[i], fft[i], b[i], capacity[i], powers[i])
+            if powers[i] == 4:
+                self.assertEqual((costs[i], cost_ders[i]), expected)
+            else:
+                np.testing.assert_allclose(
+                    (costs[i], cost_ders[i]), expected, rtol=1e-14)
+
+    def test_power_4_matches_pow(self):
+        (cost, cost_der) = bpr_link_cost(150.0, 6.0, 0.15, 100.0, 4.0)
+        self.assertAlmostEqual(cost, 6.0 * (1 + 0.15 * 1.5 ** 4), places=12)
+        self.assertAlmostEqual(cost_der, 6.0 * 0.15 * 4 * 1.5 ** 3, places=12)
+
+    def test_empty_link_costs_free_flow_time(self):
+        self.assertEqual(bpr_link_cost(0.0, 6.0, 0.15, 100.0, 4.0), (6.0, 0.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
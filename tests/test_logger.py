@@ -0,0 +1,45 @@
+""" Solution comparison """
+import io
+import unittest
+
+import numpy as np
+
+from src.shared.network import Network
+from src.utils.logger import Logger
+
+NODES = [[1], [2], [3]]
+# init, term, capacity, length, free flow time, b, power
+LINKS = [
+    [1, 2, 100.0, 1.0, 1.0, 0.15, 4],
+    [2, 3, 100.0, 1.0, 1.0, 0.15, 4],
+]
+
+
+class SolutionTest(unittest.TestCase):
+    """ Links of the solution that are missing from the network """
+
+    def setUp(self):
+        self.network = Network(NODES, LINKS)
+        self.network.links[0].AddFlow(10.0)
+        # from, to, volume, cost, the 3 -> 1 link does not exist
+        self.solution = np.array([[1, 2, 10.0, 1.0], [3, 1, 5.0, 1.0]])
+
+    def test_missing_link_fails_the_test(self):
+        with self.assertLogs(level='DEBUG') as logs:
+            Logger.TestSolution(self.solution, self.network)
+        self.assertIn(
+            "Link (3_1) is missing from the network.", logs.output[-1])
+
+    def test_missing_link_differs_infinitely(self):
+        file = io.StringIO()
+        Logger.CompareSolutionToFile(self.solution, self.network, file)
+        self.assertEqual(file.getvalue(), "1_2,0.0\n3_1,inf\n")
+
+    def test_missing_link_is_reported(self):
+        with self.assertLogs(level='DEBUG') as logs:
+            Logger.CompareSolution(self.solution, self.network)
+        self.assertIn("DEBUG:root:3_1: missing from the network", logs.output)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+""" PAS pool """
+import io
+import unittest
+from collections import defaultdict
+from contextlib import redirect_stdout
+
+import numpy as np
+
+import src.data.data as data
+from src.algorithms.tapas.pas import Pas
+from src.algorithms.tapas.pas_manager import PasManager
+from src.algorithms.tapas.tapas import TAPAS
+from src.shared.network import Network
+
+
+def create_network(city_name: str) -> Network:
+    (_, nodes, links, _) = data.import_data_for_city(city_name)
+    return Network(nodes.values.tolist(), links.values.tolist())
+
+
+class PasEvictionTest(unittest.TestCase):
+    """ A bounded pool drops the lowest ranked PASs """
+
+    def setUp(self):
+        # Braess links cost 1 + flow, pairs of them differ in cost uniquely
+        self.network = create_network('Braess')
+        self.network.arrays.SetFlows(np.array([0.0, 1.0, 3.0, 7.0, 15.0]))
+
+    def create_manager(self, max_size: int, eviction: str) -> PasManager:
+        return PasManager(self.network, max_size, eviction)
+
+    def add_pas(self, manager: PasManager, cheap_link_id: int,
+                exp_link_id: int, last_move: int = 0) -> Pas:
+        costs = self.network.arrays.GetCostList()
+        pas = Pas(
+            self.network.arrays, [cheap_link_id], [exp_link_id],
+            costs[cheap_link_id], costs[exp_link_id])
+        manager.moveClock = last_move
+        manager.AddPas(pas)
+        return pas
+
+    def test_lru_evicts_the_least_recently_moved(self):
+        manager = self.create_manager(4, 'lru')
+        pas_list = [
+            self.add_pas(manager, 0, link_id, last_move)
+            for (link_id, last_move) in ((1, 5), (2, 1), (3, 7), (4, 3))
+        ]
+        self.assertEqual(manager.pasList, pas_list)
+        new_pas = self.add_pas(manager, 1, 2, 6)
+        self.assertEqual(
+            manager.pasList, [pas_list[0], pas_list[2], pas_list[3], new_pas])
+        self.assertEqual(manager.evictions, 1)
+
+    def test_lru_evicts_a_batch(self):
+        # One over the size and 10% of it
+        manager = self.create_manager(20, 'lru')
+        pas_list = [
+            self.add_pas(manager, last_move % 5, (last_move + 1) % 5, last_move)
+            for last_move in range(20, 0, -1)
+        ]
+        new_pas = self.add_pas(manager, 0, 1, 0)
+        self.assertEqual(manager.pasList, pas_list[:-3] + [new_pas])
+        self.assertEqual(manager.evictions, 3)
+
+    def test_least_effective_evicts_the_smallest_cost_difference(self):
+        manager = self.create_manager(4, 'least_effective')
+        pas_list = [
+            self.add_pas(manager, cheap_link_id, exp_link_id)
+            for (cheap_link_id, exp_link_id) in ((0, 4), (1, 2), (2, 3), (0, 2))
+        ]
+        # Cost differences 15, 2, 4 and 3
+        new_pas = self.add_pas(manager, 3, 4)
+        self.assertEqual(
+            manager.pasList, [pas_list[0], pas_list[2], pas_list[3], new_pas])
+
+    def test_least_effective_prefers_pas_of_fewer_origins(self):
+        manager = self.create_manager(2, 'least_effective')
+        pas_list = [self.add_pas(manager, 0, 1), self.add_pas(manager, 1, 0)]
+        pas_list[0].relevantOrigins[1] = None
+        pas_list[0].relevantOrigins[2] = None
+        # Same cost difference 1, the PAS of no origin goes first
+        new_pas = self.add_pas(manager, 2, 3)
+        self.assertEqual(manager.pasList, [pas_list[0], new_pas])
+
+    def test_new_pas_is_never_evicted(self):
+        for eviction in ('lru', 'least_effective'):
+            with self.subTest(eviction=eviction):
+                manager = self.create_manager(3, eviction)
+                for link_id in (2, 3, 4):
+                    self.add_pas(manager, 0, link_id, 10)
+                # Oldest and least effective PAS
+                new_pas = self.add_pas(manager, 0, 1, 0)
+                self.assertIn(new_pas, manager.pasList)
+                self.assertIs(manager.PasExist(
+                    self.network.links[0], self.network.links[1]), new_pas)
+
+    def test_size_stays_bounded(self):
+        for (max_size, eviction) in ((1, 'lru'), (5, 'least_effective'),
+                                     (12, 'lru')):
+            with self.subTest(max_size=max_size, eviction=eviction):
+                manager = self.create_manager(max_size, eviction)
+                generator = np.random.default_rng(max_size)
+                for last_move in range(60):
+                    (cheap_link_id, exp_link_id) = generator.choice(
+                        5, 2, replace=False).tolist()
+                    pas = self.add_pas(
+                        manager, cheap_link_id, exp_link_id, last_move)
+                    self.assertLessEqual(len(manager.pasList), max_size)
+                    self.assertIs(manager.pasList[-1], pas)
+                self.assertEqual(
+                    manager.GetPoolStats().evictions,
+                    60 - len(manager.pasList))
+
+    def test_unbounded_pool(self):
+        manager = self.create_manager(0, 'lru')
+        for last_move in range(30):
+            self.add_pas(manager, last_move % 5, (last_move + 1) % 5)
+        self.assertEqual(len(manager.pasList), 30)
+        self.assertEqual(manager.evictions, 0)
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            self.create_manager(4, 'random')
+
+
+class PasIndexTest(unittest.TestCase):
+    """ PASs are found by their last links after every pool change """
+
+    def setUp(self):
+        (demands, nodes, links, _) = data.import_data_for_city('NineNodes')
+        with redirect_stdout(io.StringIO()):
+            self.tapas = TAPAS(
+                nodes.values.tolist(), links.values.tolist(), demands, 1e-14)
+            self.tapas.Iteration()
+        self.manager = self.tapas.pasManager
+        self.network = self.tapas.network
+
+    def assert_index_consistent(self):
+        manager = self.manager
+        expected = defaultdict(list)
+        for pas in manager.pasList:
+            key = manager.GetPasKey(pas.GetLastLinkId(0), pas.GetLastLinkId(1))
+            expected[key].append(pas)
+        index = {
+            key: bucket for (key, bucket) in manager.pasIndex.items() if bucket}
+        self.assertEqual(index, dict(expected))
+        # The pool holds the links of the PASs in pasList order
+        costs = manager.linkPool.GetSegmentSums(
+            self.network.arrays.GetCosts())
+        self.assertEqual(len(costs), len(manager.pasList))
+        for (pas, (cost0, cost1)) in zip(manager.pasList, costs.tolist()):
+            pas.RecalculateCosts()
+            self.assertAlmostEqual(
+                min(cost0, cost1), pas.cheapCost, places=9)
+            self.assertAlmostEqual(max(cost0, cost1), pas.expCost, places=9)
+            found = manager.PasExist(
+                self.network.links[pas.GetLastCheapLinkId()],
+                self.network.links[pas.GetLastExpLinkId()])
+            self.assertIsNotNone(found)
+            self.assertEqual(
+                (found.GetLastCheapLinkId(), found.GetLastExpLinkId()),
+                (pas.GetLastCheapLinkId(), pas.GetLastExpLinkId()))
+            self.assertIsNone(manager.PasExist(
+                self.network.links[pas.GetLastExpLinkId()],
+                self.network.links[pas.GetLastExpLinkId()]))
+
+    def test_key_is_symmetric(self):
+        self.assertEqual(PasManager.GetPasKey(3, 8), (3, 8))
+        self.assertEqual(PasManager.GetPasKey(8, 3), (3, 8))
+
+    def test_index_after_iterations(self):
+        self.assertTrue(self.manager.pasList)
+        self.assert_index_consistent()
+        with redirect_stdout(io.StringIO()):
+            for _ in range(3):
+                self.tapas.Iteration()
+                self.assert_index_consistent()
+
+    def test_segment_swap_keeps_the_key(self):
+        pas = self.manager.pasList[0]
+        cheap_link_id = pas.GetLastCheapLinkId()
+        exp_link_id = pas.GetLastExpLinkId()
+        key = self.manager.GetPasKey(cheap_link_id, exp_link_id)
+        # Loading the cheap segment makes it the expensive one
+        flows = self.network.arrays.GetFlows().copy()
+        flows[pas.GetSegment(pas.cheapSegment)] += 1e4
+        self.network.arrays.SetFlows(flows)
+        self.assertIs(
+            self.manager.PasExist(
+                self.network.links[exp_link_id],
+                self.network.links[cheap_link_id]),
+            pas)
+        self.assertEqual(
+            (pas.GetLastCheapLinkId(), pas.GetLastExpLinkId()),
+            (exp_link_id, cheap_link_id))
+        self.assertIn(pas, self.manager.pasIndex[key])
+        self.assertIsNone(self.manager.PasExist(
+            self.network.links[cheap_link_id],
+            self.network.links[exp_link_id]))
+        self.assert_index_consistent()
+
+    def test_index_after_deleting_unused(self):
+        for pas in self.manager.pasList[::2]:
+            pas.flowMovesNumber = -2
+        deleted = self.manager.pasList[::2]
+        self.manager.DeleteUnusedPASAndMoveFlow()
+        for pas in deleted:
+            self.assertNotIn(pas, self.manager.pasList)
+        self.assert_index_consistent()
+
+    def test_index_after_eviction(self):
+        evicted_count = len(self.manager.pasList) - 2
+        self.manager.maxSize = 2
+        self.manager.EvictPas()
+        self.assertEqual(self.manager.evictions, evicted_count)
+        self.assert_index_consistent()
+
+
+if __name__ == '__main__':
+    unittest.main()